@@ -0,0 +1,37 @@
+"""
+Shared Presto query-info parsing for py_scripts/ and visualize/.
+
+units:   precompiled, cached parsers for Duration/DataSize/timestamp strings
+         and the formatters used by every report.
+records: __slots__ record types (QueryInfo, StageStats, TaskStats,
+         PipelineStats, OperatorStats), the operator wall-time breakdown and
+         the loaders read_json(), load_query_info(), load_stages() and
+         load_operators() that every script reads query infos with.
+fingerprint: canonical plan-shape hash, to tell plan changes from engine
+         changes between runs.
+
+The scripts are run from their own directories, so they put the repository
+root on sys.path before importing this package.
+"""
+
+from .units import (
+    DURATION_UNITS, DATA_SIZE_UNITS,
+    parse_duration, duration_to_ms, parse_time_value, parse_data_size, parse_timestamp,
+    format_data_size, format_rows, format_time,
+)
+from .records import (
+    OUTPUT_BLOCKING_OPERATORS, WALL_COMPONENTS,
+    QueryInfo, StageStats, TaskStats, PipelineStats, OperatorStats, task_node, wall_time_breakdown,
+    read_json, load_operators, load_stages, load_query_info,
+)
+from .fingerprint import plan_shape, plan_fingerprint
+
+__all__ = [
+    "DURATION_UNITS", "DATA_SIZE_UNITS",
+    "parse_duration", "duration_to_ms", "parse_time_value", "parse_data_size", "parse_timestamp",
+    "format_data_size", "format_rows", "format_time",
+    "OUTPUT_BLOCKING_OPERATORS", "WALL_COMPONENTS",
+    "QueryInfo", "StageStats", "TaskStats", "PipelineStats", "OperatorStats", "task_node", "wall_time_breakdown",
+    "read_json", "load_operators", "load_stages", "load_query_info",
+    "plan_shape", "plan_fingerprint",
+]
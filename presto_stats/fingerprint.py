@@ -0,0 +1,93 @@
+"""
+Canonical plan-shape fingerprint of a query info.
+
+Two runs of the same query can differ because the optimizer chose another
+plan or because the engine got slower; the fingerprint separates the two.
+It is a hash over the stage plan trees (plan.jsonRepresentation) that keeps
+what defines the plan's shape and drops what changes from run to run:
+
+- kept:    node names (InnerJoin, Aggregate(PARTIAL), ScanFilterProject...),
+           join distribution (REPLICATED/PARTITIONED), exchange partitioning
+           (HASH, ROUND_ROBIN...), scanned table names, stage partitioning,
+           child order (probe before build),
+- dropped: plan node and stage ids (a remote source is replaced by the shape
+           of the stage it reads), estimates, symbol names and schemas, so
+           the same plan at another scale factor has the same fingerprint.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Any, Optional
+
+_TABLE_RE = re.compile(r"tableName=(\w+)|table = (?:[\w:.]+[.:])?(\w+)")
+_PARTITIONING_RE = re.compile(r"^\[([A-Z_]+)\]")
+
+
+def _partitioning(value) -> str:
+    """A stage's partitioning handle as a short name."""
+    if isinstance(value, dict):
+        handle = value.get("connectorHandle", value)
+        if isinstance(handle, dict):
+            return "/".join(str(handle[k]) for k in ("partitioning", "function") if handle.get(k)) or ""
+    return str(value) if value else ""
+
+
+def _node_label(node: Dict[str, Any]) -> str:
+    name = node.get("name", "")
+    identifier = node.get("identifier", "") or ""
+    details = node.get("details", "") or ""
+    attributes = []
+    if "Join" in name:
+        for line in details.splitlines():
+            if line.strip().startswith("Distribution:"):
+                attributes.append(line.split(":", 1)[1].strip())
+    match = _TABLE_RE.search(identifier)
+    if match:
+        attributes.append(match.group(1) or match.group(2))
+    match = _PARTITIONING_RE.match(identifier)
+    if match and "Exchange" in name:
+        attributes.append(match.group(1))
+    return f"{name}[{','.join(attributes)}]" if attributes else name
+
+
+def plan_shape(query_info: Dict[str, Any]) -> Optional[str]:
+    """Canonical text of the plan shape, from the output stage down; None without stage plans."""
+    stages = {}
+    pending = [query_info["outputStage"]] if "outputStage" in query_info else []
+    while pending:
+        stage = pending.pop()
+        plan = stage.get("plan", {})
+        try:
+            tree = json.loads(plan.get("jsonRepresentation") or "null")
+        except (json.JSONDecodeError, TypeError):
+            tree = None
+        stages[str(plan.get("id"))] = (tree, _partitioning(plan.get("partitioning")))
+        pending.extend(stage.get("subStages", []))
+    if not stages or all(tree is None for tree, _ in stages.values()):
+        return None
+
+    shapes = {}
+
+    def stage_shape(stage_id: str, visiting: frozenset) -> str:
+        if stage_id in shapes:
+            return shapes[stage_id]
+        if stage_id not in stages or stage_id in visiting:
+            return "?"
+        tree, partitioning = stages[stage_id]
+        body = node_shape(tree, visiting | {stage_id}) if tree else "?"
+        shapes[stage_id] = f"{{{partitioning}}}{body}" if partitioning else body
+        return shapes[stage_id]
+
+    def node_shape(node: Dict[str, Any], visiting: frozenset) -> str:
+        parts = [node_shape(child, visiting) for child in node.get("children", [])]
+        parts += [f"<{stage_shape(str(source), visiting)}>" for source in node.get("remoteSources", [])]
+        return f"{_node_label(node)}({','.join(parts)})" if parts else _node_label(node)
+
+    return stage_shape(str(query_info["outputStage"].get("plan", {}).get("id")), frozenset())
+
+
+def plan_fingerprint(query_info: Dict[str, Any]) -> str:
+    """16 hex digit hash of plan_shape(); empty string when the query info has no stage plans."""
+    shape = plan_shape(query_info)
+    return hashlib.sha1(shape.encode()).hexdigest()[:16] if shape else ""
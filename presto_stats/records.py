@@ -0,0 +1,273 @@
+"""
+Compact record types for Presto query info JSON and a single loader.
+
+Each record parses its durations, sizes and timestamps once, at load time,
+into plain numbers (nanoseconds, bytes, epoch seconds) held in __slots__
+attributes, so analyses over thousands of operators and tasks do attribute
+access instead of .get chains and repeated string parsing. Every record keeps
+the source dict as .raw for fields not modelled here.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Any, List
+
+from .units import parse_duration, parse_data_size, parse_timestamp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_HOST_RE = re.compile(r"//([^/:]+)")
+
+# Operators whose blocked time is spent waiting for downstream consumers
+# (output buffers full); every other operator blocks waiting for input.
+OUTPUT_BLOCKING_OPERATORS = ("PartitionedOutput", "LocalPartition", "TaskOutput")
+
+WALL_COMPONENTS = ["active", "blocked_input", "blocked_output", "finish"]
+
+
+def _ns(value) -> float:
+    return parse_duration(value) or 0.0
+
+
+def _int(value) -> int:
+    return value if isinstance(value, int) else int(value or 0)
+
+
+def task_node(task: Dict[str, Any]) -> str:
+    """The node a task ran on: nodeId, else the host of its task URI."""
+    if task.get("nodeId"):
+        return task["nodeId"]
+    match = _HOST_RE.search(task.get("taskStatus", {}).get("self", ""))
+    return match.group(1) if match else "unknown"
+
+
+def _stage_id(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return value
+
+
+class OperatorStats:
+    """One entry of queryStats.operatorSummaries."""
+
+    __slots__ = ("stage", "pipeline", "operator_id", "operator_type", "plan_node_id", "total_drivers",
+                 "input_rows", "input_bytes", "raw_input_rows", "raw_input_bytes", "output_rows", "output_bytes",
+                 "add_input_wall_ns", "get_output_wall_ns", "finish_wall_ns", "blocked_wall_ns", "is_blocked_wall_ns",
+                 "add_input_cpu_ns", "get_output_cpu_ns", "finish_cpu_ns",
+                 "peak_user_bytes", "peak_system_bytes", "peak_total_bytes", "spilled_bytes", "raw")
+
+    def __init__(self, op: Dict[str, Any]):
+        self.stage = op.get("stageId")
+        self.pipeline = op.get("pipelineId", 0)
+        self.operator_id = op.get("operatorId")
+        self.operator_type = op.get("operatorType", "Unknown")
+        self.plan_node_id = str(op.get("planNodeId") or "N/A")
+        self.total_drivers = _int(op.get("totalDrivers"))
+        self.input_rows = _int(op.get("inputPositions"))
+        self.input_bytes = _int(op.get("inputDataSizeInBytes"))
+        self.raw_input_rows = _int(op.get("rawInputPositions"))
+        self.raw_input_bytes = _int(op.get("rawInputDataSizeInBytes"))
+        self.output_rows = _int(op.get("outputPositions"))
+        self.output_bytes = _int(op.get("outputDataSizeInBytes"))
+        self.add_input_wall_ns = _ns(op.get("addInputWall"))
+        self.get_output_wall_ns = _ns(op.get("getOutputWall"))
+        self.finish_wall_ns = _ns(op.get("finishWall"))
+        self.blocked_wall_ns = _ns(op.get("blockedWall"))
+        self.is_blocked_wall_ns = _ns(op.get("isBlockedWall"))
+        self.add_input_cpu_ns = _ns(op.get("addInputCpu"))
+        self.get_output_cpu_ns = _ns(op.get("getOutputCpu"))
+        self.finish_cpu_ns = _ns(op.get("finishCpu"))
+        self.peak_user_bytes = _int(op.get("peakUserMemoryReservationInBytes"))
+        self.peak_system_bytes = _int(op.get("peakSystemMemoryReservationInBytes"))
+        self.peak_total_bytes = _int(op.get("peakTotalMemoryReservationInBytes"))
+        self.spilled_bytes = _int(op.get("spilledDataSizeInBytes"))
+        self.raw = op
+
+    @property
+    def key(self) -> tuple:
+        return (self.stage, self.pipeline, self.operator_id)
+
+    @property
+    def cpu_ns(self) -> float:
+        return self.add_input_cpu_ns + self.get_output_cpu_ns + self.finish_cpu_ns
+
+    def wall_breakdown(self) -> Dict[str, float]:
+        """
+        Split the wall time (ns) into active, blocked_input, blocked_output
+        and finish components.
+
+        active is addInput + getOutput. blockedWall and isBlockedWall both
+        measure the operator waiting, so blocked time is the larger of the two
+        rather than their sum, charged to output or input depending on the
+        operator type.
+        """
+        blocked = max(self.blocked_wall_ns, self.is_blocked_wall_ns)
+        on_output = any(name in self.operator_type for name in OUTPUT_BLOCKING_OPERATORS)
+        return {
+            "active": self.add_input_wall_ns + self.get_output_wall_ns,
+            "blocked_input": 0.0 if on_output else blocked,
+            "blocked_output": blocked if on_output else 0.0,
+            "finish": self.finish_wall_ns,
+        }
+
+    @property
+    def wall_ns(self) -> float:
+        """Total wall time: the sum of wall_breakdown(), blocked time counted once."""
+        return sum(self.wall_breakdown().values())
+
+
+class PipelineStats:
+    """One entry of a task's stats.pipelines."""
+
+    __slots__ = ("pipeline_id", "input_pipeline", "output_pipeline", "first_start", "last_start", "last_end",
+                 "total_drivers", "scheduled_ns", "cpu_ns", "blocked_ns", "raw_input_rows", "raw_input_bytes",
+                 "output_rows", "output_bytes", "drivers", "raw")
+
+    def __init__(self, pipeline: Dict[str, Any]):
+        self.pipeline_id = pipeline.get("pipelineId", 0)
+        self.input_pipeline = bool(pipeline.get("inputPipeline"))
+        self.output_pipeline = bool(pipeline.get("outputPipeline"))
+        self.first_start = parse_timestamp(pipeline.get("firstStartTime"))
+        self.last_start = parse_timestamp(pipeline.get("lastStartTime"))
+        self.last_end = parse_timestamp(pipeline.get("lastEndTime"))
+        self.total_drivers = _int(pipeline.get("totalDrivers"))
+        self.scheduled_ns = _int(pipeline.get("totalScheduledTimeInNanos"))
+        self.cpu_ns = _int(pipeline.get("totalCpuTimeInNanos"))
+        self.blocked_ns = _int(pipeline.get("totalBlockedTimeInNanos"))
+        self.raw_input_rows = _int(pipeline.get("rawInputPositions"))
+        self.raw_input_bytes = _int(pipeline.get("rawInputDataSizeInBytes"))
+        self.output_rows = _int(pipeline.get("outputPositions"))
+        self.output_bytes = _int(pipeline.get("outputDataSizeInBytes"))
+        self.drivers = pipeline.get("drivers") or []
+        self.raw = pipeline
+
+
+class TaskStats:
+    """One task of a stage's latestAttemptExecutionInfo.tasks."""
+
+    __slots__ = ("stage", "task_id", "node", "create", "first_start", "last_end", "end", "elapsed_ns",
+                 "raw_input_rows", "raw_input_bytes", "peak_user_bytes", "peak_total_bytes", "peak_node_total_bytes",
+                 "buffered_bytes", "pipelines", "raw")
+
+    def __init__(self, task: Dict[str, Any], stage=None):
+        stats = task.get("stats", {})
+        self.stage = stage
+        self.task_id = task.get("taskId") or task.get("taskStatus", {}).get("taskId", "")
+        self.node = task_node(task)
+        self.create = parse_timestamp(stats.get("createTime"))
+        self.first_start = parse_timestamp(stats.get("firstStartTime"))
+        self.last_end = parse_timestamp(stats.get("lastEndTime"))
+        self.end = parse_timestamp(stats.get("endTime"))
+        if stats.get("elapsedTimeInNanos"):
+            self.elapsed_ns = float(stats["elapsedTimeInNanos"])
+        else:
+            finished = self.end if self.end is not None else self.last_end
+            self.elapsed_ns = (finished - self.create) * 1e9 if self.create is not None and finished is not None else 0.0
+        self.raw_input_rows = _int(stats.get("rawInputPositions"))
+        self.raw_input_bytes = _int(stats.get("rawInputDataSizeInBytes"))
+        self.peak_user_bytes = _int(stats.get("peakUserMemoryInBytes"))
+        self.peak_total_bytes = _int(stats.get("peakTotalMemoryInBytes"))
+        self.peak_node_total_bytes = _int(stats.get("peakNodeTotalMemoryInBytes"))
+        self.buffered_bytes = task.get("outputBuffers", {}).get("totalBufferedBytes")
+        self.pipelines = [PipelineStats(p) for p in stats.get("pipelines", [])]
+        self.raw = task
+
+
+class StageStats:
+    """One stage of the outputStage tree, with its tasks."""
+
+    __slots__ = ("stage_id", "state", "stats", "plan_json", "sub_stages", "tasks", "raw")
+
+    def __init__(self, stage: Dict[str, Any]):
+        info = stage.get("latestAttemptExecutionInfo", {})
+        self.stage_id = _stage_id(stage.get("plan", {}).get("id"))
+        self.state = info.get("state", "UNKNOWN")
+        self.stats = info.get("stats", {})
+        self.plan_json = stage.get("plan", {}).get("jsonRepresentation")
+        self.sub_stages = [_stage_id(s.get("plan", {}).get("id")) for s in stage.get("subStages", [])]
+        self.tasks = [TaskStats(t, self.stage_id) for t in info.get("tasks", [])]
+        self.raw = stage
+
+
+class QueryInfo:
+    """A whole query info: query-level stats, stages (depth first) and operators."""
+
+    __slots__ = ("query_id", "state", "query", "session", "create", "execution_start", "end",
+                 "elapsed_ns", "queued_ns", "resource_waiting_ns", "dispatching_ns", "analysis_ns", "planning_ns",
+                 "execution_ns", "finishing_ns", "cpu_ns", "scheduled_ns",
+                 "peak_user_bytes", "peak_total_bytes", "peak_node_total_bytes", "spilled_bytes",
+                 "stages", "operators", "raw")
+
+    def __init__(self, query_info: Dict[str, Any]):
+        stats = query_info.get("queryStats", {})
+        self.query_id = query_info.get("queryId", "")
+        self.state = query_info.get("state", "UNKNOWN")
+        self.query = query_info.get("query", "") or ""
+        self.session = query_info.get("session", {})
+        self.create = parse_timestamp(stats.get("createTime"))
+        self.execution_start = parse_timestamp(stats.get("executionStartTime"))
+        self.end = parse_timestamp(stats.get("endTime"))
+        self.elapsed_ns = _ns(stats.get("elapsedTime"))
+        self.queued_ns = _ns(stats.get("queuedTime"))
+        self.resource_waiting_ns = _ns(stats.get("resourceWaitingTime"))
+        self.dispatching_ns = _ns(stats.get("dispatchingTime"))
+        self.analysis_ns = _ns(stats.get("analysisTime"))
+        self.planning_ns = _ns(stats.get("totalPlanningTime"))
+        self.execution_ns = _ns(stats.get("executionTime"))
+        self.finishing_ns = _ns(stats.get("finishingTime"))
+        self.cpu_ns = _ns(stats.get("totalCpuTime"))
+        self.scheduled_ns = _ns(stats.get("totalScheduledTime"))
+        self.peak_user_bytes = parse_data_size(stats.get("peakUserMemoryReservation", "")) or 0
+        self.peak_total_bytes = parse_data_size(stats.get("peakTotalMemoryReservation", "")) or 0
+        self.peak_node_total_bytes = parse_data_size(stats.get("peakNodeTotalMemory", "")) or 0
+        self.spilled_bytes = parse_data_size(stats.get("spilledDataSize", "")) or 0
+        self.stages = load_stages(query_info)
+        self.operators = load_operators(query_info)
+        self.raw = query_info
+
+    def tasks(self) -> List[TaskStats]:
+        return [task for stage in self.stages for task in stage.tasks]
+
+
+def wall_time_breakdown(operator) -> Dict[str, float]:
+    """OperatorStats.wall_breakdown() of a record or a raw operator summary."""
+    if not isinstance(operator, OperatorStats):
+        operator = OperatorStats(operator)
+    return operator.wall_breakdown()
+
+
+def load_operators(query_info: Dict[str, Any]) -> List[OperatorStats]:
+    """OperatorStats of every queryStats.operatorSummaries entry."""
+    return [OperatorStats(op) for op in query_info.get("queryStats", {}).get("operatorSummaries", [])]
+
+
+def load_stages(query_info: Dict[str, Any]) -> List[StageStats]:
+    """StageStats of every stage below outputStage, depth first, without the operator summaries."""
+    stages = []
+    pending = [query_info["outputStage"]] if "outputStage" in query_info else []
+    while pending:
+        stage = pending.pop()
+        stages.append(StageStats(stage))
+        pending.extend(reversed(stage.get("subStages", [])))
+    return stages
+
+
+def read_json(path) -> Any:
+    """Load a JSON file, with orjson when it is installed."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_query_info(source) -> QueryInfo:
+    """A QueryInfo from a query info dict or a path to its JSON file."""
+    if isinstance(source, (str, Path)):
+        source = read_json(source)
+    return QueryInfo(source)
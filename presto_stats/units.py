@@ -0,0 +1,147 @@
+"""
+Parsers and formatters for Presto Duration, DataSize and timestamp values.
+
+Duration strings ('49.06us', '80.54ms', '6.24m', '1,5 s') and DataSize
+strings ('1.20GB', '800MB', '0B') repeat heavily within a query info, so the
+parsers use precompiled patterns and cache results per distinct string.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+_DURATION_RE = re.compile(r'^\s*([0-9]+(?:[.,][0-9]*)?|[.,][0-9]+)\s*([a-zA-Zµμ]+)\s*$')
+_DATA_SIZE_RE = re.compile(r'^\s*([0-9]+(?:\.[0-9]*)?|\.[0-9]+)\s*(B|kB|KB|MB|GB|TB|PB)\s*$')
+
+# Nanoseconds per duration unit, with the long forms extract_stats accepted
+DURATION_UNITS = {
+    "ns": 1,
+    "us": 1_000, "µs": 1_000, "μs": 1_000,
+    "ms": 1_000_000, "millisecond": 1_000_000, "milliseconds": 1_000_000,
+    "s": 1_000_000_000, "sec": 1_000_000_000, "second": 1_000_000_000, "seconds": 1_000_000_000,
+    "m": 60 * 1_000_000_000, "min": 60 * 1_000_000_000, "minute": 60 * 1_000_000_000, "minutes": 60 * 1_000_000_000,
+    "h": 3600 * 1_000_000_000, "hr": 3600 * 1_000_000_000, "hour": 3600 * 1_000_000_000, "hours": 3600 * 1_000_000_000,
+    "d": 86400 * 1_000_000_000, "day": 86400 * 1_000_000_000, "days": 86400 * 1_000_000_000,
+}
+
+DATA_SIZE_UNITS = {"B": 1, "kB": 1024, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4, "PB": 1024 ** 5}
+
+
+@lru_cache(maxsize=65536)
+def _duration_parts(text: str):
+    match = _DURATION_RE.match(text)
+    if not match:
+        return None
+    unit = DURATION_UNITS.get(match.group(2).lower())
+    if unit is None:
+        return None
+    return float(match.group(1).replace(",", ".")), unit
+
+
+def parse_duration(value) -> Optional[float]:
+    """Duration string to nanoseconds; None if value is not a duration."""
+    if not isinstance(value, str):
+        return None
+    parts = _duration_parts(value)
+    return parts[0] * parts[1] if parts else None
+
+
+def duration_to_ms(value) -> Optional[float]:
+    """Duration string to milliseconds; None if value is not a duration."""
+    if not isinstance(value, str):
+        return None
+    parts = _duration_parts(value)
+    return parts[0] * (parts[1] / 1_000_000) if parts else None
+
+
+def parse_time_value(time_str) -> float:
+    """Parse time string (e.g., '49.06us', '80.54ms', '6.24m') to nanoseconds; 0.0 if not a duration."""
+    return parse_duration(time_str) or 0.0
+
+
+@lru_cache(maxsize=65536)
+def _data_size(text: str) -> Optional[float]:
+    match = _DATA_SIZE_RE.match(text)
+    if not match:
+        return None
+    return float(match.group(1)) * DATA_SIZE_UNITS[match.group(2)]
+
+
+def parse_data_size(size_str) -> Optional[float]:
+    """Parse a Presto DataSize string ('1.20GB', '800MB', '0B') to bytes; None if not a size."""
+    if isinstance(size_str, (int, float)):
+        return float(size_str)
+    return _data_size(str(size_str))
+
+
+@lru_cache(maxsize=65536)
+def _timestamp(text: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Parse a Presto timestamp (ISO string or epoch millis) to epoch seconds."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000.0
+    return _timestamp(str(value))
+
+
+def format_data_size(bytes_val) -> str:
+    """Format bytes to human-readable size."""
+    if isinstance(bytes_val, str):
+        return bytes_val
+    if bytes_val is None or bytes_val == 0:
+        return "0B"
+    try:
+        size = float(bytes_val)
+    except (ValueError, TypeError):
+        return str(bytes_val)
+
+    units = ["B", "KB", "MB", "GB", "TB", "PB"]
+    for unit in units:
+        if size < 1024:
+            return f"{size:.2f}{unit}"
+        size /= 1024
+    return f"{size:.2f}PB"
+
+
+def format_rows(rows) -> str:
+    """Format row count."""
+    if rows is None or rows == 0:
+        return "0"
+    if isinstance(rows, str):
+        return rows
+    rows = int(rows)
+    if rows < 1000:
+        return str(rows)
+    if rows < 1_000_000:
+        return f"{rows / 1000:.2f}K"
+    if rows < 1_000_000_000:
+        return f"{rows / 1_000_000:.2f}M"
+    return f"{rows / 1_000_000_000:.2f}B"
+
+
+_TIME_UNITS = [
+    (1_000_000_000 * 3600, 'h'),
+    (1_000_000_000 * 60, 'm'),
+    (1_000_000_000, 's'),
+    (1_000_000, 'ms'),
+    (1_000, 'us'),
+    (1, 'ns'),
+]
+
+
+def format_time(nanoseconds: float) -> str:
+    """Format nanoseconds to human-readable time."""
+    if nanoseconds == 0:
+        return "0.00ns"
+    for divisor, unit in _TIME_UNITS:
+        if nanoseconds >= divisor:
+            return f"{nanoseconds / divisor:.2f}{unit}"
+    return f"{nanoseconds:.2f}ns"
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Render a whole set of result figures in one run.
+
+Generalises compare_qtime_with_number_workers.py: instead of one hard-coded
+figure per process launch, a JSON spec lists the figures to draw. Each figure
+names its input result files, the x axis, the field that splits lines into
+series, and optional facets (query, sf, exchange, ...) that expand it into one
+PNG per distinct value combination. Several y values at one x (all queries of
+a configuration, repeated runs) are combined with "aggregate" (mean, median,
+min, max or sum, e.g. sum over queries for suite totals). A figure's
+"output_dir" (relative to --results-dir) overrides the spec's, so one spec can
+write next to the results it plots.
+
+All inputs are loaded once through result_sets.py, the figures are split
+across a process pool, and every worker imports matplotlib a single time with
+the non-interactive Agg backend and reuses one Figure for all its plots.
+
+Spec format:
+    {
+      "defaults": {"y_label": "Execution Time (sec)", "y_scale": 0.001, "dpi": 150},
+      "figures": [
+        {
+          "name": "Q5_exec_time_num_workers_both",
+          "inputs": ["vldb_industry/ex_1_3_4_5_6_7_8.csv"],
+          "x": "workers",
+          "series": "series",
+          "facets": ["query"],
+          "filter": {"status": "SUCCESS"},
+          "series_labels": {"CudfExchange": "Cudf", "HttpExchange": "Http"},
+          "kind": "line",
+          "legend": true,
+          "output_dir": "vldb_industry",
+          "title": "Elapsed Time By Number Workers for Q5 (SF=1000)"
+        }
+      ]
+    }
+
+Usage:
+    python batch_plot.py plot_specs/vldb_figures.json --results-dir ../results -o /tmp/figures
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Any, List
+
+from result_sets import load_results, filter_records, query_sort_key
+
+DEFAULTS = {
+    "y": "time_ms",
+    "y_scale": 0.001,
+    "y_label": "Execution Time (sec)",
+    "kind": "line",
+    "figsize": [10, 6],
+    "dpi": 150,
+    "aggregate": "mean",
+    "log_y": False,
+    "legend": None,
+}
+
+AXIS_LABELS = {
+    "workers": "Number of Workers",
+    "sf": "Scale Factor",
+    "query": "Query",
+    "drivers": "Drivers per Task",
+    "run": "Run",
+    "config": "Configuration",
+}
+
+MARKERS = ['o', 's', '^', 'D', 'v', 'P', 'X', '*']
+
+# Per-process matplotlib state, set up once by _init_worker()
+_FIGURE = None
+_CANVAS_CLASS = None
+
+
+def _sort_key(value):
+    if isinstance(value, str):
+        kind, key = query_sort_key(value)
+        if kind:
+            # Natural order for labels like SF100-1W .. SF1000-8W
+            key = tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', key))
+        return (kind, key)
+    return (0, value) if value is not None else (2, 0)
+
+
+def _aggregate(values: List[float], how: str) -> float:
+    if how == "min":
+        return min(values)
+    if how == "max":
+        return max(values)
+    if how == "sum":
+        return sum(values)
+    if how == "median":
+        ordered = sorted(values)
+        mid = len(ordered) // 2
+        return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+    return sum(values) / len(values)
+
+
+def _format_name(template: str, values: Dict[str, Any]) -> str:
+    safe = {k: ("all" if v is None else v) for k, v in values.items()}
+    try:
+        return template.format(**safe)
+    except KeyError:
+        return template
+
+
+def build_jobs(spec: Dict[str, Any], results_dir: Path, output_dir: Path,
+               figure_dirs: bool = True) -> List[Dict[str, Any]]:
+    """
+    Expand the spec into self-contained plot jobs.
+
+    Input files are loaded once even if several figures share them, and each
+    job carries only the plain x/y lists it needs so it pickles cheaply.
+    With figure_dirs, a figure's own "output_dir" replaces output_dir.
+    """
+    defaults = dict(DEFAULTS, **spec.get("defaults", {}))
+    cache = {}
+    jobs = []
+
+    for figure in spec.get("figures", []):
+        fig_spec = dict(defaults, **figure)
+        records = []
+        for name in fig_spec["inputs"]:
+            path = results_dir / name
+            key = str(path)
+            if key not in cache:
+                cache[key] = load_results([path], root=results_dir)
+            records.extend(cache[key])
+        records = filter_records(records, **fig_spec.get("filter", {}))
+
+        x_key, y_key = fig_spec["x"], fig_spec["y"]
+        series_key = fig_spec.get("series")
+        facets = fig_spec.get("facets", [])
+        series_labels = fig_spec.get("series_labels", {})
+        label_order = list(series_labels)
+        figure_dir = results_dir / figure["output_dir"] if figure_dirs and "output_dir" in figure else output_dir
+
+        groups = {}
+        for record in records:
+            if record.get(x_key) is None or record.get(y_key) is None:
+                continue
+            facet_values = tuple(record.get(f) for f in facets)
+            series_name = record.get(series_key) if series_key else fig_spec.get("label", y_key)
+            points = groups.setdefault(facet_values, {}).setdefault(series_name, {})
+            points.setdefault(record[x_key], []).append(record[y_key] * fig_spec["y_scale"])
+
+        for facet_values, series in sorted(groups.items(), key=lambda kv: [_sort_key(v) for v in kv[0]]):
+            values = dict(zip(facets, facet_values))
+            lines = []
+            # Series listed in series_labels come first, in that order
+            for series_name in sorted(series, key=lambda s: (label_order.index(str(s)) if str(s) in label_order
+                                                             else len(label_order), str(s))):
+                points = series[series_name]
+                xs = sorted(points, key=_sort_key)
+                lines.append({
+                    "label": series_labels.get(str(series_name), str(series_name)),
+                    "x": xs,
+                    "y": [_aggregate(points[x], fig_spec["aggregate"]) for x in xs],
+                })
+            title = _format_name(fig_spec.get("title", fig_spec["name"]), values)
+            file_name = _format_name(fig_spec["name"], values)
+            if facets and file_name == fig_spec["name"]:
+                file_name += "_" + "_".join(f"{k}{'' if v is None else v}" for k, v in values.items())
+            jobs.append({
+                "output": str(figure_dir / f"{file_name}.png"),
+                "title": title,
+                "x_label": fig_spec.get("x_label", AXIS_LABELS.get(x_key, x_key)),
+                "y_label": fig_spec["y_label"],
+                "kind": fig_spec["kind"],
+                "log_y": fig_spec["log_y"],
+                "legend": fig_spec["legend"],
+                "figsize": fig_spec["figsize"],
+                "dpi": fig_spec["dpi"],
+                "lines": lines,
+            })
+    return jobs
+
+
+def _init_worker():
+    """Import matplotlib once per worker with a non-interactive backend."""
+    global _FIGURE, _CANVAS_CLASS
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    _FIGURE = Figure()
+    _CANVAS_CLASS = FigureCanvasAgg
+    _CANVAS_CLASS(_FIGURE)
+
+
+def render_job(job: Dict[str, Any]) -> str:
+    """Draw one job onto the worker's shared Figure and save it."""
+    if _FIGURE is None:
+        _init_worker()
+    fig = _FIGURE
+    fig.clear()
+    fig.set_size_inches(*job["figsize"])
+    ax = fig.add_subplot(1, 1, 1)
+
+    all_x = []
+    if job["kind"] == "bar":
+        categories = []
+        for line in job["lines"]:
+            for x in line["x"]:
+                if x not in categories:
+                    categories.append(x)
+        width = 0.8 / max(len(job["lines"]), 1)
+        for i, line in enumerate(job["lines"]):
+            positions = [categories.index(x) + i * width for x in line["x"]]
+            ax.bar(positions, line["y"], width=width, label=line["label"])
+        ax.set_xticks([i + width * (len(job["lines"]) - 1) / 2 for i in range(len(categories))])
+        ax.set_xticklabels([str(c) for c in categories], rotation=45 if len(categories) > 8 else 0)
+    else:
+        for i, line in enumerate(job["lines"]):
+            if job["kind"] == "scatter":
+                ax.scatter(line["x"], line["y"], marker=MARKERS[i % len(MARKERS)], label=line["label"])
+            else:
+                ax.plot(line["x"], line["y"], marker=MARKERS[i % len(MARKERS)], linewidth=2, label=line["label"])
+            all_x.extend(line["x"])
+        if all_x and all(isinstance(x, (int, float)) for x in all_x):
+            ax.set_xticks(sorted(set(all_x)))
+        elif len(set(all_x)) > 8:
+            ax.tick_params(axis="x", labelrotation=45)
+
+    if job["log_y"]:
+        ax.set_yscale("log")
+    if job["legend"] or (job["legend"] is None and len(job["lines"]) > 1):
+        ax.legend()
+    ax.set_xlabel(job["x_label"], fontsize=12)
+    ax.set_ylabel(job["y_label"], fontsize=12)
+    ax.set_title(job["title"], fontsize=14)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(job["output"], dpi=job["dpi"])
+    return job["output"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render every figure described by a plot spec in one run",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s plot_specs/vldb_figures.json
+  %(prog)s plot_specs/vldb_figures.json --results-dir ../results -o /tmp/figs -j 8
+  %(prog)s plot_specs/vldb_figures.json --list
+        """
+    )
+    parser.add_argument("spec", help="Path to the JSON plot spec")
+    parser.add_argument("--results-dir", default=str(Path(__file__).resolve().parent.parent / "results"),
+                        help="Directory spec inputs are relative to (default: ../results)")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Directory for all PNG files (default: each figure's or the spec's 'output_dir' under "
+                             "--results-dir, or the current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--list", action="store_true", help="Only list the figures that would be written")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.spec) as f:
+        spec = json.load(f)
+
+    results_dir = Path(args.results_dir)
+    if args.output_dir:
+        output_dir = Path(args.output_dir)
+    elif "output_dir" in spec:
+        output_dir = results_dir / spec["output_dir"]
+    else:
+        output_dir = Path(".")
+    jobs = build_jobs(spec, results_dir, output_dir, figure_dirs=not args.output_dir)
+
+    if not jobs:
+        print("ERROR: spec produced no figures (check inputs and filters)", file=sys.stderr)
+        sys.exit(1)
+
+    if args.list:
+        for job in jobs:
+            print(f"{job['output']}  ({len(job['lines'])} series) {job['title']}")
+        return
+
+    for directory in {Path(job["output"]).parent for job in jobs}:
+        directory.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(args.jobs, len(jobs)))
+    if workers == 1:
+        _init_worker()
+        written = [render_job(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with Pool(workers, initializer=_init_worker) as pool:
+            written = pool.map(render_job, jobs, chunksize=chunksize)
+
+    for path in written:
+        print(f"Graph saved to: {path}")
+    print(f"✓ Rendered {len(written)} figures with {workers} process(es) in "
+          f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Build a self-contained static HTML performance dashboard from results/.
+
+All result CSVs are parsed with result_sets.py and the aggregates the
+dashboard needs are precomputed into a compact, dictionary-encoded JSON:
+
+  * every successful measurement (query, sf, workers, drivers, exchange,
+    environment, engine, run, time)
+  * per series (query/sf/workers/drivers/exchange/environment/engine):
+    latest vs best time, flagged when the two runs recorded different plan
+    fingerprints
+  * ex/nex speedups for every pair found by ex_nex_report.py
+
+The JSON is written next to the HTML and also embedded into it, so the page
+opens straight from disk (file://) with no server; filtering happens in the
+browser.
+
+Rebuilds are incremental: parsed records are cached per file keyed by mtime
+and size in <output_dir>/dashboard_cache.json, so adding one new run only
+parses that file before the (cheap) aggregation step.
+
+Excel workbooks under excel/ are not read; export a sheet to CSV under
+results/ to include it.
+
+Usage:
+    python build_dashboard.py [results_dir] [-o dashboard]
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+from result_sets import RECORD_KEYS, find_result_files, load_result_file, query_sort_key
+from ex_nex_report import discover_pairs, compare_records
+
+CACHE_VERSION = 5
+CACHE_NAME = "dashboard_cache.json"
+
+
+def load_cache(cache_path: Path) -> Dict[str, Any]:
+    if not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def refresh_records(root: Path, cache_path: Path) -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
+    """
+    Return {relative path: records} for every result file, re-parsing only
+    files whose mtime or size changed since the cached build.
+    """
+    cached = load_cache(cache_path)
+    files = {}
+    parsed = 0
+    for path in find_result_files(root):
+        rel = str(path.relative_to(root))
+        stat = path.stat()
+        entry = cached.get(rel)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            files[rel] = entry
+            continue
+        records = load_result_file(path, root=root)
+        files[rel] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "rows": [[r[k] for k in RECORD_KEYS] for r in records],
+        }
+        parsed += 1
+
+    if parsed or set(files) != set(cached):
+        with open(cache_path, "w") as f:
+            json.dump({"version": CACHE_VERSION, "files": files}, f, separators=(",", ":"))
+
+    records_by_file = {
+        rel: [dict(zip(RECORD_KEYS, row)) for row in entry["rows"]]
+        for rel, entry in files.items()
+    }
+    return records_by_file, parsed
+
+
+class _Dictionary:
+    """Dictionary-encodes repeated strings to keep the embedded JSON small."""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def __call__(self, value) -> int:
+        if value not in self.index:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+        return self.index[value]
+
+
+def _series_key(record: Dict[str, Any]) -> tuple:
+    return (record["query"], record["sf"], record["workers"], record["drivers"], record["exchange"],
+            record["environment"], record["engine"])
+
+
+def _order_key(record: Dict[str, Any]) -> tuple:
+    return (record["created"] or "", record["run"] or "")
+
+
+def build_data(root: Path, records_by_file: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Precompute everything the dashboard renders."""
+    queries, runs, labels = _Dictionary(), _Dictionary(), _Dictionary()
+    columns = {name: [] for name in ("q", "sf", "w", "dr", "x", "env", "eng", "run", "ms", "date")}
+    series = {}
+
+    for rel in sorted(records_by_file):
+        for record in records_by_file[rel]:
+            if record["query"] is None or record["time_ms"] is None or record["status"] != "SUCCESS":
+                continue
+            columns["q"].append(queries(record["query"]))
+            columns["sf"].append(record["sf"])
+            columns["w"].append(record["workers"])
+            columns["dr"].append(record["drivers"])
+            columns["x"].append(labels(record["exchange"]))
+            columns["env"].append(labels(record["environment"]))
+            columns["eng"].append(labels(record["engine"]))
+            columns["run"].append(runs(rel))
+            columns["ms"].append(round(record["time_ms"]))
+            columns["date"].append((record["created"] or "")[:10] or None)
+            series.setdefault(_series_key(record), []).append(record)
+
+    summary = []
+    for key, records in series.items():
+        ordered = sorted(records, key=_order_key)
+        latest = ordered[-1]
+        best = min(records, key=lambda r: r["time_ms"])
+        plan_changed = bool(latest["plan"] and best["plan"] and latest["plan"] != best["plan"])
+        summary.append([
+            queries(key[0]), key[1], key[2], key[3], labels(key[4]), labels(key[5]), labels(key[6]),
+            round(latest["time_ms"]), runs(latest["source"]),
+            round(best["time_ms"]), runs(best["source"]), len(records), int(plan_changed),
+        ])
+    summary.sort(key=lambda row: (query_sort_key(queries.values[row[0]]), row[1] or 0, row[2] or 0, row[3] or 0))
+
+    pairs, _ = discover_pairs(root)
+    speedups = []
+    for pair in pairs:
+        report = compare_records(pair["label"],
+                                 records_by_file.get(str(pair["ex"].relative_to(root)), []),
+                                 records_by_file.get(str(pair["nex"].relative_to(root)), []))
+        speedups.append({
+            "pair": report["label"],
+            "sf": report["sf"],
+            "workers": report["workers"],
+            "total": report["total_speedup"] and round(report["total_speedup"], 3),
+            "geomean": report["geomean_speedup"] and round(report["geomean_speedup"], 3),
+            "queries": {row["query"]: round(row["speedup"], 3) for row in report["rows"] if row["speedup"]},
+        })
+
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "queries": queries.values,
+        "runs": runs.values,
+        "labels": labels.values,
+        "points": columns,
+        "series_fields": ["q", "sf", "w", "dr", "x", "env", "eng", "latest_ms", "latest_run", "best_ms", "best_run", "n", "plan_changed"],
+        "series": summary,
+        "speedups": speedups,
+    }
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Presto GPU Benchmark Dashboard</title>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Arial, sans-serif; color: #333; background: #f5f5f5; margin: 0; }
+        .container { max-width: 1400px; margin: 0 auto; padding: 20px; }
+        header, section { background: white; border-radius: 4px; padding: 15px 20px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
+        h1 { font-size: 22px; margin: 0 0 8px 0; }
+        h2 { font-size: 16px; margin: 0 0 12px 0; padding-bottom: 8px; border-bottom: 2px solid #3498db; }
+        .filters { display: flex; flex-wrap: wrap; gap: 12px; align-items: flex-end; }
+        .filters label { font-size: 12px; color: #666; display: flex; flex-direction: column; gap: 4px; }
+        select { min-width: 110px; padding: 3px; }
+        table { border-collapse: collapse; font-size: 12px; width: 100%; }
+        th, td { border-bottom: 1px solid #eee; padding: 4px 8px; text-align: right; font-family: monospace; }
+        th { background: #f5f5f5; position: sticky; top: 0; cursor: pointer; }
+        td.text, th.text { text-align: left; font-family: inherit; }
+        .worse { color: #e74c3c; font-weight: bold; }
+        .scroll { max-height: 520px; overflow-y: auto; }
+        .meta { color: #999; font-size: 12px; }
+        svg.spark { vertical-align: middle; }
+    </style>
+</head>
+<body>
+<div class="container">
+    <header>
+        <h1>Presto GPU Benchmark Dashboard</h1>
+        <div class="meta" id="meta"></div>
+        <div class="filters" id="filters"></div>
+    </header>
+    <section>
+        <h2>Latest vs Best per Series</h2>
+        <div class="scroll"><table id="series"></table></div>
+    </section>
+    <section>
+        <h2>Exchange vs No Exchange Speedups (nex / ex)</h2>
+        <div class="scroll"><table id="speedups"></table></div>
+    </section>
+</div>
+<script id="dashboard-data" type="application/json">__DATA__</script>
+<script>
+const D = JSON.parse(document.getElementById('dashboard-data').textContent);
+const F = {q: '', sf: '', w: '', dr: '', x: '', env: '', eng: ''};
+const label = i => D.labels[i] === null ? '-' : D.labels[i];
+const fmt = ms => ms >= 1000 ? (ms / 1000).toFixed(2) + 's' : ms + 'ms';
+
+function options(values) {
+    return ['<option value="">all</option>'].concat(values.map(v => `<option value="${v}">${v}</option>`)).join('');
+}
+function distinct(col, map) {
+    const seen = new Set(D.points[col].map(v => map ? map(v) : (v === null ? '-' : v)));
+    return Array.from(seen).sort((a, b) => (parseInt(String(a).replace(/\\D/g, '')) || 0) - (parseInt(String(b).replace(/\\D/g, '')) || 0) || String(a).localeCompare(String(b)));
+}
+function buildFilters() {
+    const defs = [['q', 'Query', v => D.queries[v]], ['sf', 'Scale Factor'], ['w', 'Workers'], ['dr', 'Drivers'],
+                  ['x', 'Exchange', label], ['env', 'Environment', label], ['eng', 'Engine', label]];
+    document.getElementById('filters').innerHTML = defs.map(([k, name, map]) =>
+        `<label>${name}<select data-key="${k}">${options(distinct(k, map))}</select></label>`).join('');
+    document.querySelectorAll('#filters select').forEach(s => s.addEventListener('change', e => {
+        F[e.target.dataset.key] = e.target.value; render();
+    }));
+}
+function keep(q, sf, w, dr, x, env, eng) {
+    return (!F.q || D.queries[q] === F.q) && (!F.sf || String(sf === null ? '-' : sf) === F.sf) &&
+           (!F.w || String(w === null ? '-' : w) === F.w) && (!F.dr || String(dr === null ? '-' : dr) === F.dr) &&
+           (!F.x || label(x) === F.x) && (!F.env || label(env) === F.env) && (!F.eng || label(eng) === F.eng);
+}
+function sparkline(values) {
+    if (values.length < 2) return '';
+    const max = Math.max(...values), min = Math.min(...values), span = (max - min) || 1;
+    const pts = values.map((v, i) => `${(i * 80 / (values.length - 1)).toFixed(1)},${(18 - (v - min) * 16 / span).toFixed(1)}`);
+    return `<svg class="spark" width="82" height="20"><polyline fill="none" stroke="#3498db" stroke-width="1.5" points="${pts.join(' ')}"/></svg>`;
+}
+function trends() {
+    const P = D.points, t = new Map();
+    for (let i = 0; i < P.ms.length; i++) {
+        const k = [P.q[i], P.sf[i], P.w[i], P.dr[i], P.x[i], P.env[i], P.eng[i]].join('|');
+        if (!t.has(k)) t.set(k, []);
+        t.get(k).push([P.date[i] || '', D.runs[P.run[i]], P.ms[i]]);
+    }
+    t.forEach(v => v.sort((a, b) => a[0].localeCompare(b[0]) || a[1].localeCompare(b[1])));
+    return t;
+}
+const TRENDS = trends();
+function render() {
+    const rows = D.series.filter(r => keep(...r.slice(0, 7)));
+    document.getElementById('series').innerHTML =
+        '<thead><tr><th class="text">Query</th><th>SF</th><th>Workers</th><th>Drivers</th><th class="text">Exchange</th><th class="text">Env</th><th class="text">Engine</th>' +
+        '<th>Latest</th><th>Best</th><th>Latest/Best</th><th>Runs</th><th class="text">Trend</th><th class="text">Latest Run</th><th class="text">Best Run</th></tr></thead><tbody>' +
+        rows.map(r => {
+            const ratio = r[7] / r[9];
+            const trend = TRENDS.get(r.slice(0, 7).join('|')).map(p => p[2]);
+            return `<tr><td class="text">${D.queries[r[0]]}</td><td>${r[1] ?? '-'}</td><td>${r[2] ?? '-'}</td><td>${r[3] ?? '-'}</td>` +
+                   `<td class="text">${label(r[4])}</td><td class="text">${label(r[5])}</td><td class="text">${label(r[6])}</td>` +
+                   `<td>${fmt(r[7])}</td><td>${fmt(r[9])}</td>` +
+                   `<td class="${ratio > 1.1 ? 'worse' : ''}">${ratio.toFixed(2)}` +
+                   `${r[12] ? ' <span class="worse" title="latest and best runs used different plan shapes">&ne; plan</span>' : ''}</td><td>${r[11]}</td><td class="text">${sparkline(trend)}</td>` +
+                   `<td class="text">${D.runs[r[8]]}</td><td class="text">${D.runs[r[10]]}</td></tr>`;
+        }).join('') + '</tbody>';
+
+    const qs = D.queries.slice().sort((a, b) => parseInt(a.slice(1)) - parseInt(b.slice(1)))
+                 .filter(q => !F.q || q === F.q);
+    const pairs = D.speedups.filter(p => (!F.sf || p.sf.split(',').includes(F.sf)) && (!F.w || p.workers.split(',').includes(F.w)));
+    const color = s => !s ? '' : s >= 1 ? `background: rgb(${Math.round(255 - Math.min(Math.log(s) / Math.log(4), 1) * 155)},235,${Math.round(255 - Math.min(Math.log(s) / Math.log(4), 1) * 155)})`
+                                        : `background: rgb(245,${Math.round(255 + Math.max(Math.log(s) / Math.log(4), -1) * 155)},${Math.round(255 + Math.max(Math.log(s) / Math.log(4), -1) * 155)})`;
+    document.getElementById('speedups').innerHTML =
+        '<thead><tr><th class="text">Pair</th><th>SF</th><th>Workers</th>' + qs.map(q => `<th>${q}</th>`).join('') +
+        '<th>Total</th><th>Geomean</th></tr></thead><tbody>' +
+        pairs.map(p => `<tr><td class="text">${p.pair}</td><td>${p.sf}</td><td>${p.workers}</td>` +
+            qs.map(q => `<td style="${color(p.queries[q])}">${p.queries[q] ? p.queries[q].toFixed(2) : ''}</td>`).join('') +
+            `<td style="${color(p.total)}"><b>${p.total ? p.total.toFixed(2) : ''}</b></td>` +
+            `<td style="${color(p.geomean)}"><b>${p.geomean ? p.geomean.toFixed(2) : ''}</b></td></tr>`).join('') + '</tbody>';
+}
+document.getElementById('meta').textContent =
+    `${D.points.ms.length} measurements from ${D.runs.length} result files, generated ${D.generated}`;
+buildFilters();
+render();
+</script>
+</body>
+</html>
+"""
+
+
+def write_dashboard(data: Dict[str, Any], output_dir: Path) -> Path:
+    encoded = json.dumps(data, separators=(",", ":"))
+    with open(output_dir / "dashboard_data.json", "w") as f:
+        f.write(encoded)
+    html_path = output_dir / "index.html"
+    with open(html_path, "w") as f:
+        # '</' must not appear inside the embedded <script> block
+        f.write(HTML_TEMPLATE.replace("__DATA__", encoded.replace("</", "<\\/")))
+    return html_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a static, self-contained HTML dashboard over all benchmark results",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ../results -o dashboard
+  %(prog)s ../results -o dashboard --full     # ignore the cache and re-parse everything
+        """
+    )
+    parser.add_argument("results_dir", nargs="?",
+                        default=str(Path(__file__).resolve().parent.parent / "results"),
+                        help="Directory searched recursively for result CSVs (default: ../results)")
+    parser.add_argument("-o", "--output-dir", default="dashboard",
+                        help="Directory for index.html, dashboard_data.json and the cache (default: dashboard)")
+    parser.add_argument("--full", action="store_true", help="Ignore the cache and re-parse every file")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    root = Path(args.results_dir)
+    if not root.is_dir():
+        print(f"ERROR: results directory not found: {root}", file=sys.stderr)
+        sys.exit(1)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = output_dir / CACHE_NAME
+    if args.full and cache_path.exists():
+        cache_path.unlink()
+
+    records_by_file, parsed = refresh_records(root, cache_path)
+    data = build_data(root, records_by_file)
+    html_path = write_dashboard(data, output_dir)
+
+    print(f"✓ Dashboard written to {html_path} ({len(records_by_file)} files, {parsed} re-parsed, "
+          f"{len(data['points']['ms'])} measurements) in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
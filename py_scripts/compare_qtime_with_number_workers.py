@@ -1,8 +1,13 @@
 import sys
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
 # Create a graph mapping execution time with number of workers from a CSV file
 # CSV format expected: Num Workers, CudfExchange(sec), HttpExchange(sec)
+# For many figures at once use batch_plot.py with a plot spec instead.
+
+DEFAULT_TITLE = 'Elapsed Time By Number Workers for Q5 (SF=1000)'
 
 
 def read_csv_data(filename):
@@ -39,7 +44,8 @@ def read_csv_data(filename):
     return workers, cudf_times, http_times, http_workers
 
 
-def create_plot(workers, cudf_times, http_times, http_workers, output_file, cudf_only=False):
+def create_plot(workers, cudf_times, http_times, http_workers, output_file, cudf_only=False,
+                title=DEFAULT_TITLE):
     """Create and save the execution time vs workers plot."""
     plt.figure(figsize=(10, 6))
 
@@ -54,7 +60,7 @@ def create_plot(workers, cudf_times, http_times, http_workers, output_file, cudf
 
     plt.xlabel('Number of Workers', fontsize=12)
     plt.ylabel('Execution Time (sec)', fontsize=12)
-    plt.title('Elapsed Time By Number Workers for Q5 (SF=1000)', fontsize=14)
+    plt.title(title, fontsize=14)
     plt.grid(True, alpha=0.3)
     plt.xticks(workers)
     plt.tight_layout()
@@ -65,13 +71,14 @@ def create_plot(workers, cudf_times, http_times, http_workers, output_file, cudf
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python compare_qtime_with_number_workers.py <input CSV> [output PNG] [--cudf-only]")
+        print("Usage: python compare_qtime_with_number_workers.py <input CSV> [output PNG] [--cudf-only] [--title=<title>]")
         print("Example: python compare_qtime_with_number_workers.py results/data.csv output.png")
         print("         python compare_qtime_with_number_workers.py results/data.csv output.png --cudf-only")
         sys.exit(1)
 
     input_csv = sys.argv[1]
     cudf_only = '--cudf-only' in sys.argv
+    title = next((arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--title=')), DEFAULT_TITLE)
 
     # Filter out flags from argv for positional args
     positional_args = [arg for arg in sys.argv[2:] if not arg.startswith('--')]
@@ -92,7 +99,7 @@ def main():
     if cudf_only:
         print("Mode: CudfExchange only")
 
-    create_plot(workers, cudf_times, http_times, http_workers, output_file, cudf_only)
+    create_plot(workers, cudf_times, http_times, http_workers, output_file, cudf_only, title)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Cost-efficiency metrics for benchmark results: GPU-seconds and dollars per query.
+
+Raw elapsed time favours whatever setup throws the most GPUs at a query. This
+script applies a per-environment cost model (cost_environments.json) to any
+result set loaded through result_sets.py. Each environment prices one or more
+engines (gpu, cpu) by the hardware unit a worker occupies (a GPU, a core):
+
+    units         = workers * units_per_worker
+    unit_seconds  = elapsed_seconds * units          (GPU-seconds for gpu)
+    dollars       = elapsed_hours * (units * unit_hour_usd + fixed_hour_usd)
+
+Per query it reports unit-seconds and dollars; per suite (one result file at
+one scale factor, worker count and engine) the totals, queries per dollar and
+suite runs per dollar. Suites are then ranked by performance per dollar and
+summarised by environment, engine, exchange mode and worker count, so sizing
+decisions can rest on throughput per dollar, not only latency.
+
+Environment, engine and worker count come from the result (file name or
+columns) or from --environment / --engine / --workers; results where one of
+them cannot be derived are skipped with a warning rather than costed with a
+guess. Rankings only compare suites over a common query set: by default the
+queries shared by every suite that ran at least half as many queries as the
+largest one (--queries overrides); suites missing part of it are listed but
+not ranked. Rates in cost_environments.json are editable defaults, not quotes.
+
+Usage:
+    python cost_model.py ../results/ex_aws_nvidia_sf100.csv ../results/ex_nvidia_sally_cuda2510.csv --workers 8
+    python cost_model.py ../results --sf 100 -o costs
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Set
+
+from result_sets import load_results, filter_records, normalize_query, query_sort_key
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent / "cost_environments.json"
+
+
+def load_cost_config(path) -> Dict[str, Any]:
+    with open(path) as f:
+        config = json.load(f)
+    if "environments" not in config or not config["environments"]:
+        raise ValueError(f"{path}: no environments defined")
+    for name, env in config["environments"].items():
+        if not env.get("engines"):
+            raise ValueError(f"{path}: environment '{name}' defines no engines")
+    return config
+
+
+def apply_cost_model(records: List[Dict[str, Any]], config: Dict[str, Any], environment: str = None,
+                     engine: str = None, workers: int = None) -> List[Dict[str, Any]]:
+    """
+    Return successful records extended with units, unit_seconds and dollars.
+
+    environment and engine override what the records carry, workers only
+    fills in records without a worker count; records for which one of them
+    is still unknown are skipped with one warning per result file.
+    """
+    environments = config["environments"]
+    costed = []
+    skipped = {}
+    for record in records:
+        if record["time_ms"] is None or record["status"] != "SUCCESS":
+            continue
+        env_name = environment or record["environment"]
+        env = environments.get(env_name)
+        engine_name = engine or record["engine"]
+        if engine_name is None and env is not None and len(env["engines"]) == 1:
+            engine_name = next(iter(env["engines"]))
+        record_workers = record["workers"] or workers
+        if env_name is None:
+            reason = "no environment in the file name (use --environment)"
+        elif env is None:
+            reason = f"no cost model for environment '{env_name}'"
+        elif engine_name is None:
+            reason = "no engine in the file name (use --engine)"
+        elif engine_name not in env["engines"]:
+            reason = f"environment '{env_name}' has no cost model for engine '{engine_name}'"
+        elif not record_workers:
+            reason = "no worker count in the result (use --workers)"
+        else:
+            reason = None
+        if reason:
+            skipped.setdefault(record["source"], reason)
+            continue
+        rates = env["engines"][engine_name]
+        units = record_workers * rates.get("units_per_worker", 1)
+        seconds = record["time_ms"] / 1000
+        costed.append(dict(
+            record,
+            cost_environment=env_name,
+            cost_engine=engine_name,
+            cost_workers=record_workers,
+            hardware=rates.get("hardware", ""),
+            unit=rates.get("unit", engine_name),
+            units=units,
+            unit_seconds=seconds * units,
+            dollars=seconds / 3600 * (units * rates["unit_hour_usd"] + env.get("fixed_hour_usd", 0.0)),
+        ))
+    for source, reason in sorted(skipped.items()):
+        print(f"✗ Skipping {source}: {reason}", file=sys.stderr)
+    return costed
+
+
+def suite_key(record: Dict[str, Any]):
+    """A suite is one result file at one scale factor, worker count and engine."""
+    return (record["source"], record["sf"], record["cost_workers"], record["cost_engine"])
+
+
+def common_queries(costed: List[Dict[str, Any]]) -> Set[str]:
+    """
+    Queries shared by every suite that ran at least half as many queries as
+    the largest suite, so 22-query suites are not ranked against the
+    single-query ones (ex_Q5_*) and one failed query doesn't drop a suite.
+    """
+    per_suite = {}
+    for record in costed:
+        per_suite.setdefault(suite_key(record), set()).add(record["query"])
+    if not per_suite:
+        return set()
+    largest = max(len(queries) for queries in per_suite.values())
+    comparable = [queries for queries in per_suite.values() if len(queries) * 2 >= largest]
+    return set.intersection(*comparable)
+
+
+def suite_summary(costed: List[Dict[str, Any]], queries: Set[str]) -> List[Dict[str, Any]]:
+    """
+    Aggregate per suite run over `queries` and rank by queries per dollar.
+
+    Wide files holding several configurations (tpch-sfx00-wx.csv) split into
+    one suite per configuration. Suites that didn't run every query in
+    `queries` are kept with ranked=False after the ranked ones.
+    """
+    suites = {}
+    for record in costed:
+        suite = suites.setdefault(suite_key(record), {
+            "key": suite_key(record),
+            "suite": record["source"],
+            "environment": record["cost_environment"],
+            "engine": record["cost_engine"],
+            "unit": record["unit"],
+            "exchange": record["exchange"],
+            "workers": record["cost_workers"],
+            "units": record["units"],
+            "sf": record["sf"] if record["sf"] is not None else "",
+            "covered": set(),
+            "queries": 0,
+            "time_s": 0.0,
+            "unit_seconds": 0.0,
+            "dollars": 0.0,
+        })
+        if record["query"] not in queries:
+            continue
+        suite["covered"].add(record["query"])
+        suite["queries"] += 1
+        suite["time_s"] += record["time_ms"] / 1000
+        suite["unit_seconds"] += record["unit_seconds"]
+        suite["dollars"] += record["dollars"]
+
+    summary = []
+    for suite in suites.values():
+        suite["ranked"] = bool(queries) and suite["covered"] >= queries
+        suite["coverage"] = f"{len(suite.pop('covered'))}/{len(queries)}"
+        suite["queries_per_dollar"] = suite["queries"] / suite["dollars"] if suite["dollars"] else None
+        suite["suites_per_dollar"] = 1 / suite["dollars"] if suite["dollars"] else None
+        summary.append(suite)
+    summary.sort(key=lambda s: (not s["ranked"], -(s["queries_per_dollar"] or 0)))
+    return summary
+
+
+def group_summary(compared: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    """Queries per dollar and unit-seconds per query grouped by one record field."""
+    groups = {}
+    for record in compared:
+        group = groups.setdefault(record[key], {"group": record[key], "queries": 0,
+                                                 "dollars": 0.0, "unit_seconds": 0.0})
+        group["queries"] += 1
+        group["dollars"] += record["dollars"]
+        group["unit_seconds"] += record["unit_seconds"]
+    result = []
+    for group in groups.values():
+        group["queries_per_dollar"] = group["queries"] / group["dollars"] if group["dollars"] else None
+        group["unit_seconds_per_query"] = group["unit_seconds"] / group["queries"]
+        result.append(group)
+    result.sort(key=lambda g: -(g["queries_per_dollar"] or 0))
+    return result
+
+
+def write_query_csv(costed: List[Dict[str, Any]], queries: Set[str], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["suite", "environment", "engine", "hardware", "exchange", "query", "sf", "workers",
+                         "unit", "units", "time_s", "unit_seconds", "dollars", "compared"])
+        for r in sorted(costed, key=lambda r: (r["source"], query_sort_key(r["query"]))):
+            writer.writerow([r["source"], r["cost_environment"], r["cost_engine"], r["hardware"],
+                             r["exchange"] or "", r["query"], r["sf"] or "", r["cost_workers"], r["unit"],
+                             r["units"], f"{r['time_ms'] / 1000:.3f}", f"{r['unit_seconds']:.2f}",
+                             f"{r['dollars']:.5f}", int(r["query"] in queries)])
+
+
+def write_suite_csv(summary: List[Dict[str, Any]], output_path: Path) -> None:
+    fields = ["rank", "suite", "environment", "engine", "exchange", "sf", "workers", "unit", "units",
+              "coverage", "queries", "time_s", "unit_seconds", "dollars", "queries_per_dollar", "suites_per_dollar"]
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for rank, s in enumerate(summary, 1):
+            writer.writerow([rank if s["ranked"] else "", s["suite"], s["environment"], s["engine"],
+                             s["exchange"] or "", s["sf"], s["workers"], s["unit"], s["units"], s["coverage"],
+                             s["queries"], f"{s['time_s']:.2f}", f"{s['unit_seconds']:.1f}", f"{s['dollars']:.4f}",
+                             f"{s['queries_per_dollar']:.1f}" if s["queries_per_dollar"] else "",
+                             f"{s['suites_per_dollar']:.2f}" if s["suites_per_dollar"] else ""])
+
+
+def print_ranking(summary: List[Dict[str, Any]], queries: Set[str],
+                  groups: Dict[str, List[Dict[str, Any]]]) -> None:
+    print(f"Compared over {len(queries)} queries: {','.join(sorted(queries, key=query_sort_key))}")
+    print(f"{'#':>3}  {'Suite':<50} {'Env':<10} {'Eng':<4} {'SF':>6} {'W':>3} {'Units':>8} {'Q':>5} "
+          f"{'Time(s)':>9} {'Unit-s':>9} {'$':>8} {'Q/$':>8}")
+    for rank, s in enumerate(summary, 1):
+        if s["ranked"]:
+            print(f"{rank:>3}  {s['suite'][:50]:<50} {s['environment']:<10} {s['engine']:<4} {s['sf']:>6} "
+                  f"{s['workers']:>3} {str(s['units']) + ' ' + s['unit']:>8} {s['queries']:>5} {s['time_s']:>9.1f} "
+                  f"{s['unit_seconds']:>9.0f} {s['dollars']:>8.3f} {s['queries_per_dollar']:>8.0f}")
+    unranked = [s for s in summary if not s["ranked"]]
+    if unranked:
+        print("\nNot ranked (missing part of the common query set):")
+        for s in unranked:
+            print(f"  {s['suite'][:50]:<50} {s['environment']:<10} {s['engine']:<4} {s['sf']:>6} "
+                  f"{s['workers']:>3}  {s['coverage']} queries")
+    for key, rows in groups.items():
+        print(f"\nBy {key}:")
+        for g in rows:
+            print(f"  {str(g['group']):<14} queries={g['queries']:>4}  unit-s/query={g['unit_seconds_per_query']:>8.1f}  "
+                  f"queries/$={g['queries_per_dollar']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="GPU-seconds, dollars per query/suite and performance-per-dollar rankings",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ../results/ex_aws_nvidia_sf100.csv ../results/ex_nvidia_sally_cuda2510.csv --workers 8
+  %(prog)s ../results --sf 100 -o costs
+  %(prog)s ../results/velox_testing --environment sally --engine gpu --config my_rates.json
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Result CSV files or directories")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG),
+                        help="Cost model JSON (default: cost_environments.json next to this script)")
+    parser.add_argument("--environment", help="Force one environment for all inputs")
+    parser.add_argument("--engine", choices=["gpu", "cpu"], help="Force one engine for all inputs")
+    parser.add_argument("--workers", type=int, help="Worker count for inputs that don't record one")
+    parser.add_argument("--queries", help="Comma-separated query set to rank over (default: common queries)")
+    parser.add_argument("--sf", type=int, help="Only include this scale factor")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_queries.csv and <prefix>_suites.csv")
+
+    args = parser.parse_args()
+
+    try:
+        config = load_cost_config(args.config)
+    except (OSError, ValueError, json.JSONDecodeError) as e:
+        print(f"ERROR: cannot load cost model: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    records = []
+    for path in args.inputs:
+        root = Path(path) if Path(path).is_dir() else Path(path).parent
+        records.extend(load_results([path], root=root))
+    records = filter_records(records, sf=args.sf)
+    records = [r for r in records if r["query"] is not None]
+    costed = apply_cost_model(records, config, args.environment, args.engine, args.workers)
+    if not costed:
+        print("ERROR: no successful query results to cost", file=sys.stderr)
+        sys.exit(1)
+
+    if args.queries:
+        queries = {normalize_query(q) for q in args.queries.split(",")} - {None}
+    else:
+        queries = common_queries(costed)
+    summary = suite_summary(costed, queries)
+    ranked = {s["key"] for s in summary if s["ranked"]}
+    compared = [r for r in costed if r["query"] in queries and suite_key(r) in ranked]
+    groups = {key: group_summary(compared, key)
+              for key in ("cost_environment", "cost_engine", "exchange", "cost_workers")}
+    print_ranking(summary, queries, groups)
+
+    if args.output_prefix:
+        write_query_csv(costed, queries, Path(f"{args.output_prefix}_queries.csv"))
+        write_suite_csv(summary, Path(f"{args.output_prefix}_suites.csv"))
+        print(f"✓ Wrote {args.output_prefix}_queries.csv and {args.output_prefix}_suites.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
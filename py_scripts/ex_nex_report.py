@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Discover every exchange/no-exchange result pair and report per-query speedups.
+
+Result files follow a naming convention: an ex_* file and a nex_* file with the
+same suffix hold the same suite run with and without the cudf exchange, e.g.
+
+    results/ex_4_workers_sf100.csv              <-> results/nex_4_workers_sf100.csv
+    results/vldb/ex_opt_sf1000_..._cuda2510.csv <-> results/vldb/nex_opt_sf1000_..._cuda2510.csv
+    results/velox_testing/ex_sf1000_wo8_dr1/    <-> results/velox_testing/nex_sf1000_wo8_dr1/
+
+Instead of handing each pair to calculate_diff.py, this script finds all of
+them (recursively), joins the rows on query, scale factor and worker count,
+and writes one consolidated table:
+
+  * speedup = nex time / ex time  (> 1 means the exchange run is faster)
+  * per pair: summed times of the common queries, total speedup, geometric mean
+
+Outputs a long CSV (one row per pair and query), a wide CSV (one row per pair)
+and an HTML page with the wide table rendered as a heatmap.
+
+Usage:
+    python ex_nex_report.py [results_dir] [-o ex_nex_report]
+"""
+
+import argparse
+import csv
+import html
+import math
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
+
+from result_sets import find_result_files, load_result_file, query_sort_key
+
+
+def _counterpart(path: Path, root: Path) -> Optional[Tuple[Path, str]]:
+    """Return (nex path, pair label) for an ex_* result file, or None."""
+    rel = path.relative_to(root)
+    parts = list(rel.parts)
+    # The first ex_ component decides: a file name or a per-run directory
+    for i, part in enumerate(parts):
+        if part.startswith("ex_"):
+            parts[i] = "n" + part
+            label_parts = list(rel.parts)
+            label_parts[i] = part[len("ex_"):]
+            label = "/".join(label_parts)
+            if label.endswith(".csv"):
+                label = label[:-len(".csv")]
+            return root.joinpath(*parts), label
+    return None
+
+
+def discover_pairs(root: Path) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Find ex/nex pairs under root. Returns (pairs, unpaired relative paths)."""
+    files = find_result_files(root)
+    file_set = set(files)
+    pairs = []
+    paired = set()
+
+    for path in files:
+        match = _counterpart(path, root)
+        if match is None:
+            continue
+        nex_path, label = match
+        if nex_path in file_set:
+            pairs.append({"label": label, "ex": path, "nex": nex_path})
+            paired.update((path, nex_path))
+
+    unpaired = []
+    for path in files:
+        name = str(path.relative_to(root))
+        if path not in paired and any(p.startswith(("ex_", "nex_")) for p in path.relative_to(root).parts):
+            unpaired.append(name)
+    return pairs, unpaired
+
+
+def _index(records: List[Dict[str, Any]]) -> Dict[tuple, float]:
+    """Index successful records by (query, sf, workers), averaging repeats."""
+    grouped = {}
+    for record in records:
+        if record["query"] is None or record["time_ms"] is None or record["status"] != "SUCCESS":
+            continue
+        key = (record["query"], record["sf"], record["workers"])
+        grouped.setdefault(key, []).append(record["time_ms"])
+    return {key: sum(times) / len(times) for key, times in grouped.items()}
+
+
+def _plans(records: List[Dict[str, Any]]) -> Dict[tuple, set]:
+    """Plan fingerprints of successful records by (query, sf, workers), where the runs recorded one."""
+    plans = {}
+    for record in records:
+        if record["query"] is None or record["status"] != "SUCCESS" or not record.get("plan"):
+            continue
+        plans.setdefault((record["query"], record["sf"], record["workers"]), set()).add(record["plan"])
+    return plans
+
+
+def geometric_mean(values: List[float]) -> Optional[float]:
+    """Geometric mean of positive values, None if there are none."""
+    values = [v for v in values if v > 0]
+    if not values:
+        return None
+    return math.exp(sum(math.log(v) for v in values) / len(values))
+
+
+def compare_records(label: str, ex_records: List[Dict[str, Any]],
+                    nex_records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Join the records of one pair on (query, sf, workers) and compute speedups."""
+    ex_times = _index(ex_records)
+    nex_times = _index(nex_records)
+    ex_plans = _plans(ex_records)
+    nex_plans = _plans(nex_records)
+
+    rows = []
+    for key in sorted(set(ex_times) & set(nex_times), key=lambda k: (query_sort_key(k[0]), k[1] or 0, k[2] or 0)):
+        ex_ms, nex_ms = ex_times[key], nex_times[key]
+        rows.append({
+            "query": key[0], "sf": key[1], "workers": key[2],
+            "ex_ms": ex_ms, "nex_ms": nex_ms,
+            "speedup": nex_ms / ex_ms if ex_ms > 0 else None,
+            # None when either side has no fingerprint; a change means the times compare different plans
+            "plan_changed": ex_plans[key] != nex_plans[key] if key in ex_plans and key in nex_plans else None,
+        })
+
+    # Files pair by name; flag the ones whose sf/worker columns don't line up
+    ex_configs = {(k[1], k[2]) for k in ex_times}
+    nex_configs = {(k[1], k[2]) for k in nex_times}
+
+    ex_total = sum(r["ex_ms"] for r in rows)
+    nex_total = sum(r["nex_ms"] for r in rows)
+    sfs = sorted({r["sf"] for r in rows if r["sf"] is not None})
+    workers = sorted({r["workers"] for r in rows if r["workers"] is not None})
+    return {
+        "label": label,
+        "sf": ",".join(str(s) for s in sfs),
+        "workers": ",".join(str(w) for w in workers),
+        "rows": rows,
+        "ex_only": sorted({k[0] for k in ex_times} - {k[0] for k in nex_times}, key=query_sort_key),
+        "nex_only": sorted({k[0] for k in nex_times} - {k[0] for k in ex_times}, key=query_sort_key),
+        "mismatched": ex_configs != nex_configs,
+        "plan_changed": sorted({r["query"] for r in rows if r["plan_changed"]}, key=query_sort_key),
+        "ex_total_ms": ex_total,
+        "nex_total_ms": nex_total,
+        "total_speedup": nex_total / ex_total if ex_total > 0 else None,
+        "geomean_speedup": geometric_mean([r["speedup"] for r in rows if r["speedup"]]),
+    }
+
+
+def compare_pair(pair: Dict[str, Any], root: Path) -> Dict[str, Any]:
+    """Load one discovered pair and compare it."""
+    report = compare_records(pair["label"],
+                             load_result_file(pair["ex"], root=root),
+                             load_result_file(pair["nex"], root=root))
+    report["ex"] = str(pair["ex"].relative_to(root))
+    report["nex"] = str(pair["nex"].relative_to(root))
+    return report
+
+
+def _fmt(value, digits=2) -> str:
+    return "" if value is None else f"{value:.{digits}f}"
+
+
+def write_long_csv(reports: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["pair", "query", "sf", "workers", "ex_ms", "nex_ms", "speedup", "diff_percent",
+                         "plan_changed"])
+        for report in reports:
+            for row in report["rows"]:
+                diff = int((row["nex_ms"] - row["ex_ms"]) / row["nex_ms"] * 100) if row["nex_ms"] else ""
+                plan_changed = "" if row["plan_changed"] is None else ("yes" if row["plan_changed"] else "no")
+                writer.writerow([report["label"], row["query"], row["sf"], row["workers"],
+                                 f"{row['ex_ms']:.0f}", f"{row['nex_ms']:.0f}", _fmt(row["speedup"], 3), diff,
+                                 plan_changed])
+
+
+def _query_columns(reports: List[Dict[str, Any]]) -> List[str]:
+    queries = {row["query"] for report in reports for row in report["rows"]}
+    return sorted(queries, key=query_sort_key)
+
+
+def _pair_speedups(report: Dict[str, Any]) -> Dict[str, float]:
+    """Per-query speedup for the wide table (geometric mean over sf/worker rows)."""
+    by_query = {}
+    for row in report["rows"]:
+        if row["speedup"]:
+            by_query.setdefault(row["query"], []).append(row["speedup"])
+    return {q: geometric_mean(values) for q, values in by_query.items()}
+
+
+def write_wide_csv(reports: List[Dict[str, Any]], output_path: Path) -> None:
+    queries = _query_columns(reports)
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["pair", "sf", "workers"] + queries +
+                        ["ex_total_ms", "nex_total_ms", "total_speedup", "geomean_speedup"])
+        for report in reports:
+            speedups = _pair_speedups(report)
+            writer.writerow([report["label"], report["sf"], report["workers"]] +
+                            [_fmt(speedups.get(q)) for q in queries] +
+                            [f"{report['ex_total_ms']:.0f}", f"{report['nex_total_ms']:.0f}",
+                             _fmt(report["total_speedup"], 3), _fmt(report["geomean_speedup"], 3)])
+
+
+def heat_color(speedup: Optional[float], limit: float = 4.0) -> str:
+    """Map a speedup to a red (slower) / white / green (faster) background."""
+    if not speedup:
+        return "#f5f5f5"
+    scaled = max(-1.0, min(1.0, math.log(speedup) / math.log(limit)))
+    if scaled >= 0:
+        shade = int(255 - scaled * 155)
+        return f"rgb({shade}, 235, {shade})"
+    shade = int(255 + scaled * 155)
+    return f"rgb(245, {shade}, {shade})"
+
+
+def write_html(reports: List[Dict[str, Any]], unpaired: List[str], output_path: Path) -> None:
+    queries = _query_columns(reports)
+    header_cells = "".join(f"<th>{q}</th>" for q in queries)
+    body = []
+    for report in reports:
+        speedups = _pair_speedups(report)
+        plan_mark = ' <span class="warn" title="plan shape differs between ex and nex">&ne;</span>'
+        cells = "".join(
+            f'<td style="background:{heat_color(speedups.get(q))}">{_fmt(speedups.get(q))}'
+            f'{plan_mark if q in report["plan_changed"] else ""}</td>'
+            for q in queries
+        )
+        warn = ' <span class="warn" title="sf/worker columns differ between ex and nex">!</span>' \
+            if report["mismatched"] else ""
+        body.append(
+            f'<tr><td class="pair" title="{html.escape(report["ex"])} vs {html.escape(report["nex"])}">'
+            f'{html.escape(report["label"])}{warn}</td><td>{report["sf"]}</td><td>{report["workers"]}</td>{cells}'
+            f'<td>{report["ex_total_ms"] / 1000:.1f}</td><td>{report["nex_total_ms"] / 1000:.1f}</td>'
+            f'<td style="background:{heat_color(report["total_speedup"])}"><b>{_fmt(report["total_speedup"])}</b></td>'
+            f'<td style="background:{heat_color(report["geomean_speedup"])}"><b>{_fmt(report["geomean_speedup"])}</b></td></tr>'
+        )
+    unpaired_html = "".join(f"<li>{html.escape(name)}</li>" for name in unpaired)
+
+    page = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Exchange vs No Exchange Speedups</title>
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Arial, sans-serif; color: #333; margin: 20px; }}
+        h1 {{ font-size: 22px; }}
+        table {{ border-collapse: collapse; font-size: 12px; }}
+        th, td {{ border: 1px solid #ddd; padding: 4px 6px; text-align: right; font-family: monospace; }}
+        th {{ background: #f5f5f5; position: sticky; top: 0; }}
+        td.pair {{ text-align: left; font-family: inherit; white-space: nowrap; }}
+        .warn {{ color: #e74c3c; font-weight: bold; }}
+        .note {{ color: #666; font-size: 13px; margin: 10px 0; }}
+    </style>
+</head>
+<body>
+    <h1>Exchange vs No Exchange Speedups</h1>
+    <div class="note">Speedup = no-exchange time / exchange time; green means the exchange run is faster.
+    Totals cover the queries present in both runs. <span class="warn">&ne;</span> marks queries whose plan
+    shape differs between the two runs, so the speedup compares different plans.</div>
+    <table>
+        <thead><tr><th>Pair</th><th>SF</th><th>Workers</th>{header_cells}<th>Ex Total (s)</th><th>Nex Total (s)</th><th>Total</th><th>Geomean</th></tr></thead>
+        <tbody>
+{chr(10).join(body)}
+        </tbody>
+    </table>
+    <h2>Unpaired result files</h2>
+    <ul>{unpaired_html}</ul>
+</body>
+</html>
+"""
+    with open(output_path, "w") as f:
+        f.write(page)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pair ex_*/nex_* result files and report per-query speedups",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ../results
+  %(prog)s ../results -o /tmp/ex_nex
+        """
+    )
+    parser.add_argument("results_dir", nargs="?",
+                        default=str(Path(__file__).resolve().parent.parent / "results"),
+                        help="Directory searched recursively for result CSVs (default: ../results)")
+    parser.add_argument("-o", "--output-prefix", default="ex_nex_report",
+                        help="Prefix for the _long.csv, _wide.csv and .html outputs (default: ex_nex_report)")
+
+    args = parser.parse_args()
+    root = Path(args.results_dir)
+    if not root.is_dir():
+        print(f"ERROR: results directory not found: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    pairs, unpaired = discover_pairs(root)
+    if not pairs:
+        print("ERROR: no ex_*/nex_* pairs found", file=sys.stderr)
+        sys.exit(1)
+
+    reports = [compare_pair(pair, root) for pair in pairs]
+
+    prefix = args.output_prefix
+    write_long_csv(reports, Path(f"{prefix}_long.csv"))
+    write_wide_csv(reports, Path(f"{prefix}_wide.csv"))
+    write_html(reports, unpaired, Path(f"{prefix}.html"))
+
+    for report in reports:
+        note = "  (sf/workers differ)" if report["mismatched"] else ""
+        if report["plan_changed"]:
+            note += f"  (plan changed: {','.join(report['plan_changed'])})"
+        print(f"{report['label']:<60} queries={len(report['rows']):>2}  "
+              f"total={_fmt(report['total_speedup'])}x  geomean={_fmt(report['geomean_speedup'])}x{note}")
+    if unpaired:
+        print(f"Unpaired: {', '.join(unpaired)}")
+    print(f"✓ Wrote {prefix}_long.csv, {prefix}_wide.csv and {prefix}.html", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
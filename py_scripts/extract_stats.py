@@ -1,8 +1,13 @@
+import argparse
 import requests
 import csv
 import sys
 import re
 import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from presto_stats import load_query_info, plan_fingerprint, read_json
 
 # List your fields here. Use dot notation for nested lookups.
 COOKED_NAMES= [
@@ -18,6 +23,10 @@ FIELD_NAMES = [
     "state"
 ]
 
+# Appended after FIELD_NAMES with --fetch-plans or --plans-from; the list
+# endpoint carries no plans, so it needs the detailed query infos
+PLAN_FIELD = "planFingerprint"
+
 
 def time_to_ms(time_str):
     # Remove spaces and handle comma as decimal separator
@@ -64,23 +73,22 @@ def get_value(obj, field_name):
             return ""
     return val
 
-def get_query(elem):
+def get_query(query):
     """
     Return the TPC-H query from the comment in the query text, None of doesn't exist
     """
-    query_string = get_value(elem,"query")
-    match = re.search(r'TPCH\s+(\w+)', query_string)
+    match = re.search(r'TPCH\s+(\w+)', query.query)
     if match:
         return match.group(1)  # the word after TPCH
     return None
 
 
 
-def get_scale_factor(elem):
+def get_scale_factor(query):
     """
     Return the scale factor used for the query, this is extracted from  the schema
     """
-    schema_string = get_value(elem, "session.schema")
+    schema_string = query.session.get("schema") or ""
     match = re.search(r'(\w+)_parquet', schema_string)
     if match:
         return match.group(1)  # the word after TPCH
@@ -89,26 +97,69 @@ def get_scale_factor(elem):
         return match.group(1)  # the word after TPCH
     return None
 
-def get_elapsed_time(elem):
-    query_time = get_value(elem,"queryStats.elapsedTime")
+def get_elapsed_time(query):
+    query_time = query.raw.get("queryStats", {}).get("elapsedTime")
+    if not query_time:
+        raise ValueError(f"No elapsed time for {query.query_id}")
+    # Converted from the string as before, not query.elapsed_ns, so the
+    # truncated millisecond values in existing CSVs stay the same
     time_in_ms = time_to_ms(query_time)
     return str(int(time_in_ms))
 
 def get_cooked_row(elem):
-    query_name = get_query(elem)
-    scale_factor = get_scale_factor(elem)
-    query_time = get_elapsed_time(elem)
+    query = load_query_info(elem)
+    query_name = get_query(query)
+    scale_factor = get_scale_factor(query)
+    query_time = get_elapsed_time(query)
 
     if query_name is None or scale_factor is None or query_time is None:
         return None
 
     return(query_name, scale_factor,query_time)
 
-def extract_records(json_array, field_names):
+def load_saved_plans(directory):
+    """
+    queryId -> plan fingerprint for the detailed query infos saved in
+    `directory` (get_last_presto_query.py --detailed --output-prefix ...)
+    """
+    plans = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            query_info = read_json(path)
+        except (OSError, ValueError) as e:
+            print(f"✗ Skipping {path}: {e}", file=sys.stderr)
+            continue
+        if isinstance(query_info, dict) and query_info.get("queryId") and "outputStage" in query_info:
+            plans[query_info["queryId"]] = plan_fingerprint(query_info)
+    print(f"✓ Loaded {len(plans)} plan fingerprints from {directory}", file=sys.stderr)
+    return plans
+
+def get_plan_fingerprint(elem, url=None, saved_plans=None):
+    """
+    Plan-shape fingerprint from the saved query infos, else from the detailed
+    query info at <url><queryId>; "" (reported on stderr) if neither has it
+    """
+    query_id = get_value(elem, "queryId")
+    if not query_id:
+        return ""
+    if saved_plans is not None and query_id in saved_plans:
+        return saved_plans[query_id]
+    if url is None:
+        print(f"No plan fingerprint for {query_id}: not among the saved query infos", file=sys.stderr)
+        return ""
+    try:
+        return plan_fingerprint(fetch_json(url.rstrip("/") + "/" + query_id))
+    except (requests.RequestException, ValueError) as e:
+        print(f"No plan fingerprint for {query_id}: {e}", file=sys.stderr)
+        return ""
+
+def extract_records(json_array, field_names, url=None, saved_plans=None):
     """
     For each element in the JSON array, pull out all fields
     listed in `field_names` (including nested ones).
-    Returns a list of tuples matching the order in `field_names`.
+    Returns a list of tuples matching the order in `field_names`,
+    followed by the plan fingerprint when `url` (fetch each detailed
+    query info) or `saved_plans` (from load_saved_plans) is given.
     """
     records = []
     for elem in json_array:
@@ -118,6 +169,8 @@ def extract_records(json_array, field_names):
             print ("Dropping " + str(row))
             continue
         query_row = get_cooked_row(elem) + row
+        if url is not None or saved_plans is not None:
+            query_row += (get_plan_fingerprint(elem, url, saved_plans),)
         records.append(query_row)
 
     records.sort()    
@@ -134,14 +187,22 @@ def write_csv(records, field_names, output_path):
 
         
 def main():
-    # Default URL and output file – override via CLI if desired
-    url = "http://sally:19300/v1/query/"
-    output_csv = "query_stats.csv"
-
-    if len(sys.argv) >= 2:
-        url = sys.argv[1]
-    if len(sys.argv) >= 3:
-        output_csv = sys.argv[2]
+    parser = argparse.ArgumentParser(description="Extract per-query times from a Presto coordinator into a CSV")
+    parser.add_argument("url", nargs="?", default="http://sally:19300/v1/query/",
+                        help="Query list endpoint (default: http://sally:19300/v1/query/)")
+    parser.add_argument("output_csv", nargs="?", default="query_stats.csv",
+                        help="Output CSV (default: query_stats.csv)")
+    plans = parser.add_mutually_exclusive_group()
+    plans.add_argument("--fetch-plans", action="store_true",
+                       help=f"Add a {PLAN_FIELD} column, fetching each query's detailed info (one GET per query)")
+    plans.add_argument("--plans-from", metavar="DIR",
+                       help=f"Add a {PLAN_FIELD} column from detailed query infos already saved in DIR "
+                            "(get_last_presto_query.py --detailed --output-prefix)")
+    args = parser.parse_args()
+    url = args.url
+    output_csv = args.output_csv
+    saved_plans = load_saved_plans(args.plans_from) if args.plans_from else None
+    with_plans = args.fetch_plans or saved_plans is not None
 
     try:
         data = fetch_json(url)
@@ -150,8 +211,8 @@ def main():
             sys.exit(1)
 
         try:
-            records = extract_records(data, FIELD_NAMES)
-            write_csv(records, COOKED_NAMES + FIELD_NAMES, output_csv)
+            records = extract_records(data, FIELD_NAMES, url if args.fetch_plans else None, saved_plans)
+            write_csv(records, COOKED_NAMES + FIELD_NAMES + ([PLAN_FIELD] if with_plans else []), output_csv)
             print(f"✅ Wrote {len(records)} records to {output_csv}")
         except:
             traceback.print_exc()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Bisect a range of builds to find the first one where a query got slower.
+
+Given an ordered list of revisions (velox commits, dated image tags such as
+rapidsai-update:20251217, ...) with a known good and a known bad end, the
+driver repeatedly builds, deploys and benchmarks the midpoint on a focused
+query subset and decides good/bad with a one-sided Mann-Whitney U test
+against the samples of the good revision.
+
+The three steps are hooks (a BisectHooks subclass) so they can be swapped out
+or stubbed in tests; build and deploy default to doing nothing:
+
+    build(rev)                         -> None   (raise on failure)
+    deploy(rev)                        -> None   (raise on failure)
+    run_benchmark(rev, queries, reps)  -> {"Q9": [ms, ms, ...], ...}
+
+CommandHooks runs user-supplied shell commands with {rev}, {queries},
+{repeat} and {output} substituted; the benchmark command must write a result
+CSV in any layout result_sets.py understands (e.g. extract_stats.py output).
+A custom hooks class can be loaded with --hooks file.py:ClassName.
+
+With n runs per revision the exact test cannot go below p = 1 / C(2n, n)
+(0.05 for --repeat 3), so repeat/alpha combinations that can never show a
+regression are rejected up front. The --log file records the queries and
+repeat count with the samples and is only resumed when both match.
+
+Usage:
+    python perf_bisect.py --good bb6ba2381 --bad 4f0e2c1aa --repo ~/velox \\
+        --build-cmd "cd ~/velox && git checkout {rev} && make release" \\
+        --deploy-cmd "../bin/docker/stop_all_workers.sh && ../bin/docker/start_all_workers.sh" \\
+        --bench-cmd "./run_suite.sh {queries} {repeat} {output}" \\
+        --queries Q9,Q18 --repeat 5
+"""
+
+import argparse
+import abc
+import importlib.util
+import itertools
+import json
+import math
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from result_sets import load_result_file, normalize_query
+
+
+class BisectHooks(abc.ABC):
+    """Base hooks; subclass for anything other than shell commands."""
+
+    def build(self, rev: str) -> None:
+        pass
+
+    def deploy(self, rev: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    def run_benchmark(self, rev: str, queries: Sequence[str], repeat: int) -> Dict[str, List[float]]:
+        """Times in ms per query, `repeat` samples each."""
+
+
+class CommandHooks(BisectHooks):
+    """Hooks that shell out to user-supplied build, deploy and benchmark commands."""
+
+    def __init__(self, build_cmd: Optional[str], deploy_cmd: Optional[str], bench_cmd: str):
+        self.build_cmd = build_cmd
+        self.deploy_cmd = deploy_cmd
+        self.bench_cmd = bench_cmd
+
+    @staticmethod
+    def _run(template: str, **values) -> None:
+        command = template.format(**values)
+        print(f"[*] $ {command}", file=sys.stderr)
+        subprocess.run(command, shell=True, check=True)
+
+    def build(self, rev: str) -> None:
+        if self.build_cmd:
+            self._run(self.build_cmd, rev=rev)
+
+    def deploy(self, rev: str) -> None:
+        if self.deploy_cmd:
+            self._run(self.deploy_cmd, rev=rev)
+
+    def run_benchmark(self, rev: str, queries: Sequence[str], repeat: int) -> Dict[str, List[float]]:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / f"bisect_{rev.replace('/', '_').replace(':', '_')}.csv"
+            self._run(self.bench_cmd, rev=rev, queries=",".join(queries), repeat=repeat, output=output)
+            samples = {q: [] for q in queries}
+            for record in load_result_file(output):
+                if record["query"] in samples and record["time_ms"] is not None and record["status"] == "SUCCESS":
+                    samples[record["query"]].append(record["time_ms"])
+        return samples
+
+
+def load_hooks(spec: str, args) -> BisectHooks:
+    """Load 'path/to/file.py:ClassName' and instantiate it with the parsed args."""
+    path, _, class_name = spec.partition(":")
+    module_spec = importlib.util.spec_from_file_location(Path(path).stem, path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return getattr(module, class_name or "Hooks")(args)
+
+
+def mann_whitney_greater(candidate: List[float], baseline: List[float]) -> float:
+    """
+    One-sided Mann-Whitney U test p-value for 'candidate is slower than baseline'.
+
+    Uses the exact permutation distribution for small samples (the usual case:
+    a handful of repetitions per revision) and the tie-corrected normal
+    approximation otherwise.
+    """
+    n1, n2 = len(candidate), len(baseline)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+
+    pooled = sorted((v, i < n1) for i, v in enumerate(list(candidate) + list(baseline)))
+    ranks = [0.0] * len(pooled)
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        i = j + 1
+    rank_sum = sum(r for r, (_, is_candidate) in zip(ranks, pooled) if is_candidate)
+    u_stat = rank_sum - n1 * (n1 + 1) / 2
+
+    if math.comb(n1 + n2, n1) <= 50_000:
+        count = total = 0
+        for combo in itertools.combinations(ranks, n1):
+            total += 1
+            if sum(combo) - n1 * (n1 + 1) / 2 >= u_stat - 1e-9:
+                count += 1
+        return count / total
+
+    mean_u = n1 * n2 / 2
+    tie_counts = {}
+    for value, _ in pooled:
+        tie_counts[value] = tie_counts.get(value, 0) + 1
+    n = n1 + n2
+    tie_term = sum(t ** 3 - t for t in tie_counts.values()) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+    z = (u_stat - mean_u - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def min_p_value(n1: int, n2: int) -> float:
+    """Smallest p-value mann_whitney_greater can return for these sample sizes."""
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    if math.comb(n1 + n2, n1) <= 50_000:
+        return 1 / math.comb(n1 + n2, n1)
+    return 0.0
+
+
+def min_repeat(alpha: float) -> int:
+    """Fewest runs per revision for which a regression can be significant at alpha."""
+    repeat = 1
+    while min_p_value(repeat, repeat) >= alpha:
+        repeat += 1
+    return repeat
+
+
+def judge(candidate: Dict[str, List[float]], baseline: Dict[str, List[float]],
+          alpha: float, min_slowdown: float) -> Dict[str, dict]:
+    """Per-query verdicts of a candidate revision against the good baseline."""
+    verdicts = {}
+    for query, base in baseline.items():
+        cand = candidate.get(query, [])
+        if not cand or not base:
+            verdicts[query] = {"regressed": False, "p": None, "ratio": None, "note": "no samples"}
+            continue
+        ratio = statistics.median(cand) / statistics.median(base)
+        p_value = mann_whitney_greater(cand, base)
+        verdicts[query] = {
+            "regressed": p_value < alpha and ratio >= 1 + min_slowdown,
+            "p": p_value,
+            "ratio": ratio,
+        }
+    return verdicts
+
+
+class Bisector:
+    """Drives the bisection and remembers every measured revision."""
+
+    def __init__(self, revisions: List[str], hooks: BisectHooks, queries: List[str],
+                 repeat: int = 5, alpha: float = 0.05, min_slowdown: float = 0.05,
+                 log_path: Optional[Path] = None):
+        if not 0 < alpha < 1:
+            raise ValueError(f"alpha must be between 0 and 1, got {alpha}")
+        if min_p_value(repeat, repeat) >= alpha:
+            raise ValueError(f"with {repeat} runs per revision the smallest possible p-value is "
+                             f"{min_p_value(repeat, repeat):.4f}, so nothing can be significant at "
+                             f"alpha={alpha}; use --repeat {min_repeat(alpha)} or more")
+        self.revisions = revisions
+        self.hooks = hooks
+        self.queries = queries
+        self.repeat = repeat
+        self.alpha = alpha
+        self.min_slowdown = min_slowdown
+        self.log_path = log_path
+        self.samples = {}
+        if log_path and log_path.exists():
+            with open(log_path) as f:
+                log = json.load(f)
+            if log.get("queries") != queries or log.get("repeat") != repeat:
+                raise ValueError(f"{log_path} was recorded with queries {log.get('queries')} and repeat "
+                                 f"{log.get('repeat')}, not {queries} and {repeat}; "
+                                 f"remove it or pass another --log")
+            self.samples = log.get("samples", {})
+            print(f"[*] Resuming with {len(self.samples)} measured revisions from {log_path}", file=sys.stderr)
+
+    def _save(self) -> None:
+        if self.log_path:
+            with open(self.log_path, "w") as f:
+                json.dump({"revisions": self.revisions, "queries": self.queries, "repeat": self.repeat,
+                           "samples": self.samples}, f, indent=2)
+
+    def measure(self, rev: str) -> Dict[str, List[float]]:
+        if rev not in self.samples:
+            print(f"[*] Building, deploying and benchmarking {rev}", file=sys.stderr)
+            self.hooks.build(rev)
+            self.hooks.deploy(rev)
+            self.samples[rev] = self.hooks.run_benchmark(rev, self.queries, self.repeat)
+            self._save()
+        return self.samples[rev]
+
+    def is_bad(self, rev: str) -> Dict[str, dict]:
+        baseline = self.measure(self.revisions[0])
+        return judge(self.measure(rev), baseline, self.alpha, self.min_slowdown)
+
+    def run(self) -> dict:
+        """Return the first bad revision and the verdict trail."""
+        steps = []
+        bad_verdicts = self.is_bad(self.revisions[-1])
+        steps.append((self.revisions[-1], bad_verdicts))
+        if not any(v["regressed"] for v in bad_verdicts.values()):
+            return {"first_bad": None, "steps": steps,
+                    "message": "bad revision is not measurably slower than good; nothing to bisect"}
+
+        low, high = 0, len(self.revisions) - 1  # revisions[low] good, revisions[high] bad
+        while high - low > 1:
+            mid = (low + high) // 2
+            verdicts = self.is_bad(self.revisions[mid])
+            steps.append((self.revisions[mid], verdicts))
+            regressed = any(v["regressed"] for v in verdicts.values())
+            print(f"[{'✗' if regressed else '✓'}] {self.revisions[mid]} is {'bad' if regressed else 'good'} "
+                  f"({high - low - 1} revisions left in range)", file=sys.stderr)
+            if regressed:
+                high = mid
+            else:
+                low = mid
+
+        return {"first_bad": self.revisions[high], "last_good": self.revisions[low], "steps": steps,
+                "message": f"first bad revision: {self.revisions[high]}"}
+
+
+def resolve_revisions(args) -> List[str]:
+    """Ordered list good..bad (inclusive) from a file or a git repository."""
+    if args.revisions_file:
+        with open(args.revisions_file) as f:
+            revisions = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        if args.good not in revisions or args.bad not in revisions:
+            raise ValueError("--good and --bad must both appear in the revisions file")
+        return revisions[revisions.index(args.good):revisions.index(args.bad) + 1]
+
+    output = subprocess.run(
+        ["git", "-C", args.repo, "rev-list", "--reverse", "--first-parent", f"{args.good}..{args.bad}"],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return [args.good] + [line[:12] for line in output.split()]
+
+
+def format_report(result: dict) -> str:
+    lines = []
+    for rev, verdicts in result["steps"]:
+        for query, verdict in verdicts.items():
+            ratio = f"{verdict['ratio']:.3f}x" if verdict.get("ratio") else "n/a"
+            p_value = f"{verdict['p']:.4f}" if verdict.get("p") is not None else "n/a"
+            lines.append(f"  {rev:<20} {query:<5} ratio={ratio:<8} p={p_value:<8} "
+                         f"{'REGRESSED' if verdict['regressed'] else 'ok'}")
+    lines.append(result["message"])
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bisect builds for a performance regression with a statistical test",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --good bb6ba2381 --bad 4f0e2c1aa --repo ~/velox --bench-cmd "..." --queries Q9
+  %(prog)s --good 20251120 --bad 20251217 --revisions-file image_tags.txt \\
+      --deploy-cmd "IMG_VER={rev} ../bin/docker/start_all_workers.sh" --bench-cmd "..." --queries Q5,Q9
+        """
+    )
+    parser.add_argument("--good", required=True, help="Known good revision")
+    parser.add_argument("--bad", required=True, help="Known bad revision")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--repo", help="Git repository to list revisions good..bad from")
+    source.add_argument("--revisions-file", help="File with one revision per line, oldest first")
+    parser.add_argument("--build-cmd", help="Shell command to build {rev}")
+    parser.add_argument("--deploy-cmd", help="Shell command to deploy {rev} to the workers")
+    parser.add_argument("--bench-cmd", help="Shell command running {queries} {repeat} times, writing a result CSV to {output}")
+    parser.add_argument("--hooks", help="Custom hooks as file.py:ClassName (instead of the *-cmd options)")
+    parser.add_argument("--queries", required=True, help="Comma separated query subset, e.g. Q9,Q18")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query and revision (default: 5)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level (default: 0.05)")
+    parser.add_argument("--min-slowdown", type=float, default=0.05,
+                        help="Minimum median slowdown counted as a regression (default: 0.05 = 5%%)")
+    parser.add_argument("--log", default="bisect_log.json",
+                        help="JSON file recording samples so an interrupted bisect can resume (default: bisect_log.json)")
+
+    args = parser.parse_args()
+
+    if args.hooks:
+        hooks = load_hooks(args.hooks, args)
+    elif args.bench_cmd:
+        hooks = CommandHooks(args.build_cmd, args.deploy_cmd, args.bench_cmd)
+    else:
+        parser.error("either --bench-cmd or --hooks is required")
+
+    queries = [normalize_query(q) or q for q in args.queries.split(",")]
+    try:
+        revisions = resolve_revisions(args)
+    except (ValueError, subprocess.CalledProcessError) as e:
+        print(f"ERROR: cannot resolve revisions: {e}", file=sys.stderr)
+        sys.exit(1)
+    if len(revisions) < 2:
+        print("ERROR: need at least a good and a bad revision", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"[*] Bisecting {len(revisions)} revisions (~{math.ceil(math.log2(len(revisions)))} steps) "
+          f"on {','.join(queries)}", file=sys.stderr)
+    try:
+        bisector = Bisector(revisions, hooks, queries, repeat=args.repeat, alpha=args.alpha,
+                            min_slowdown=args.min_slowdown, log_path=Path(args.log) if args.log else None)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        result = bisector.run()
+    except subprocess.CalledProcessError as e:
+        print(f"ERROR: hook command failed ({e.returncode}): {e.cmd}", file=sys.stderr)
+        sys.exit(1)
+
+    print(format_report(result))
+    sys.exit(0 if result["first_bad"] else 2)
+
+
+if __name__ == "__main__":
+    main()
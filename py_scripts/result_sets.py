@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Shared loader for the benchmark result files kept under results/.
+
+The results directory holds several CSV layouts that grew over time:
+
+  * extract_stats.py output      queryName,scaleFactor,timeMillsecs,...[,worker(s)],state[,planFingerprint]
+  * convert_json_to_csv.py output Query Name,Avg Time (seconds),...,Status
+  * whitespace tables             Num Workers, CudfExchange(sec), HttpExchange(sec)
+  * wide per-run tables           ,Q01,Q02,...,TOTAL  with row labels like SF100-1W
+  * headerless per-run tables     times_sf1-800_1000_1-8_8_workers_*.csv, one row of
+                                  Q1..Q22 times per configuration named by the file
+  * benchmark harness exports     sep=, header followed by query_file,...,wall_ms,...
+
+load_result_file() turns any of them into a flat list of records (plain dicts)
+with the same keys, filling scale factor, workers, drivers, exchange mode,
+engine (gpu/cpu) and revision from the file and directory names where the CSV
+itself doesn't say; what the names don't carry stays None.
+"plan" is the plan-shape fingerprint (presto_stats.fingerprint) for files
+that recorded one, else None. "config" is the row label of the per-run tables
+(SF100-1W) and "series" the column label of whitespace tables (CudfExchange);
+"exchange" only ever holds the ex/nex mode of the run.
+"""
+
+import csv
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+RECORD_KEYS = [
+    "source", "run", "query", "sf", "workers", "drivers", "config", "series",
+    "exchange", "environment", "engine", "revision", "time_ms", "status", "created", "plan",
+]
+
+# Filename conventions, e.g. ex_4_workers_sf100_velox_bb6ba2381.csv,
+# velox_testing/ex_sf1000_wo8_dr1/benchmark_result.csv,
+# ex_sf1000_nvidia_sally_q9_fix_2drivers_25_12_03.csv
+# A count directly after another number (ex_Q5_1_2_6_8_workers, sf1-800) is a
+# list or range of values, not the run's single value.
+_SF_RE = re.compile(r'(?:^|[_-])sf(\d+)(k?)(?=[_-]|$)(?!-\d)', re.IGNORECASE)
+_WORKERS_RE = re.compile(r'(?:(?:^|(?<!\d)_)(\d+)_workers|(?:^|_)wo(\d+))(?=_|$)', re.IGNORECASE)
+_GPUS_RE = re.compile(r'(?:^|_)(one|\d+)gpus?(?=_|$)', re.IGNORECASE)
+_DRIVERS_RE = re.compile(r'(?:^|_)(?:(\d+)drivers|dr(\d+)|(\d+)drv)(?=_|$)', re.IGNORECASE)
+_REVISION_RE = re.compile(r'velox_([0-9a-f]{7,40}|\d{4}-\d{2}-\d{2})', re.IGNORECASE)
+_QUERY_RE = re.compile(r'^Q?(\d{1,2})$', re.IGNORECASE)
+_QUERY_FILE_RE = re.compile(r'query_(\d{1,2})\.sql$')
+_WIDE_ROW_RE = re.compile(r'^SF(\d+)-(\d+)W$', re.IGNORECASE)
+_SERIES_RE = re.compile(r'([A-Za-z]+)\s*\((sec|ms)\)')
+_TIMES_RE = re.compile(r'^times_sf([\d_-]+?)_workers', re.IGNORECASE)
+
+ENVIRONMENTS = ["cloudsally", "aws", "sally"]
+
+# File name tokens naming the execution engine; cuda2510 style tokens count as gpu
+ENGINE_TOKENS = {
+    "gpu": ("nvidia", "cudf", "gpu", "cuda"),
+    "cpu": ("cpu", "java"),
+}
+
+
+def _engine_from_tokens(tokens) -> Optional[str]:
+    for engine, markers in ENGINE_TOKENS.items():
+        if any(token.startswith(marker) for token in tokens for marker in markers):
+            return engine
+    return None
+
+
+def _workers_from_label(label: str) -> Optional[int]:
+    workers = _first_int(_WORKERS_RE.search(label))
+    if workers is not None:
+        return workers
+    # Single-node runs named by GPU count (..._OneGPU), one worker per GPU
+    match = _GPUS_RE.search(label)
+    if not match:
+        return None
+    return 1 if match.group(1).lower() == "one" else int(match.group(1))
+
+
+def normalize_query(name) -> Optional[str]:
+    """Normalize 'Q5', 'q05', '5' or 'query_05.sql' to 'Q5'."""
+    if name is None:
+        return None
+    name = str(name).strip()
+    match = _QUERY_FILE_RE.search(name) or _QUERY_RE.match(name)
+    if not match:
+        return None
+    return f"Q{int(match.group(1))}"
+
+
+def query_sort_key(name: str):
+    """Sort key placing Q2 before Q10."""
+    match = _QUERY_RE.match(name or "")
+    return (0, int(match.group(1))) if match else (1, name or "")
+
+
+def parse_sf(value) -> Optional[int]:
+    """Parse a scale factor from 'sf100', 'SF1000', '100' or a schema name."""
+    if value is None:
+        return None
+    match = re.search(r'(\d+)', str(value))
+    return int(match.group(1)) if match else None
+
+
+def _first_int(match) -> Optional[int]:
+    if not match:
+        return None
+    for group in match.groups():
+        if group is not None:
+            return int(group)
+    return None
+
+
+def _sf_from_label(label: str) -> Optional[int]:
+    match = _SF_RE.search(label)
+    if not match:
+        return None
+    return int(match.group(1)) * (1000 if match.group(2) else 1)
+
+
+def metadata_from_path(path) -> Dict[str, Any]:
+    """
+    Derive run metadata from a result file path.
+
+    The directory name is used for harness exports whose file name is generic
+    (benchmark_result.csv), otherwise the file stem carries the information.
+    """
+    path = Path(path)
+    names = [path.stem]
+    if path.stem.startswith("benchmark_result") or path.parent.name.startswith(("ex_", "nex_")):
+        names.insert(0, path.parent.name)
+    label = "_".join(names)
+    first = names[0]
+
+    exchange = None
+    if first.startswith("nex_"):
+        exchange = "nex"
+    elif first.startswith("ex_"):
+        exchange = "ex"
+
+    tokens = set(label.lower().split("_"))
+    environment = next((env for env in ENVIRONMENTS if env in tokens), None)
+    engine = _engine_from_tokens(tokens)
+
+    revision = _REVISION_RE.search(label)
+    return {
+        "run": label,
+        "exchange": exchange,
+        "sf": _sf_from_label(label),
+        "workers": _workers_from_label(label),
+        "drivers": _first_int(_DRIVERS_RE.search(label)),
+        "environment": environment,
+        "engine": engine,
+        "revision": revision.group(1) if revision else None,
+    }
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _record(meta: Dict[str, Any], source: str, **fields) -> Dict[str, Any]:
+    record = dict.fromkeys(RECORD_KEYS)
+    record.update(meta)
+    record["source"] = source
+    for key, value in fields.items():
+        if value is not None:
+            record[key] = value
+    if record["status"] is None:
+        record["status"] = "SUCCESS"
+    return record
+
+
+def _read_extract_stats(rows, header, meta, source):
+    col = {name: i for i, name in enumerate(header)}
+    workers_col = col.get("workers", col.get("worker"))
+    records = []
+    for row in rows:
+        if len(row) < 3:
+            continue
+        time_ms = _to_float(row[col["timeMillsecs"]])
+        if time_ms is None:
+            continue
+        state = row[col["state"]] if "state" in col and col["state"] < len(row) else None
+        created = row[col["queryStats.createTime"]] if "queryStats.createTime" in col else None
+        workers = int(row[workers_col]) if workers_col is not None and row[workers_col].strip() else None
+        plan = row[col["planFingerprint"]] if "planFingerprint" in col and col["planFingerprint"] < len(row) else None
+        records.append(_record(
+            meta, source,
+            query=normalize_query(row[col["queryName"]]),
+            sf=parse_sf(row[col["scaleFactor"]]),
+            workers=workers,
+            time_ms=time_ms,
+            status="SUCCESS" if state in (None, "", "FINISHED") else state,
+            created=created or None,
+            plan=plan or None,
+        ))
+    return records
+
+
+def _read_benchmark_csv(rows, header, meta, source, statistic="Avg"):
+    col = {name.split(" (")[0].split(" Time")[0]: i for i, name in enumerate(header)}
+    records = []
+    for row in rows:
+        if not row:
+            continue
+        status = row[col["Status"]] if "Status" in col else "SUCCESS"
+        seconds = _to_float(row[col.get(statistic, 1)])
+        records.append(_record(
+            meta, source,
+            query=normalize_query(row[0]),
+            time_ms=seconds * 1000 if seconds is not None else None,
+            status="SUCCESS" if status == "SUCCESS" else "FAILED",
+        ))
+    return records
+
+
+def _read_wide(rows, header, meta, source):
+    records = []
+    for row in rows:
+        if not row:
+            continue
+        match = _WIDE_ROW_RE.match(row[0].strip())
+        for name, value in zip(header[1:], row[1:]):
+            query = normalize_query(name)
+            time_ms = _to_float(value)
+            if query is None or time_ms is None:
+                continue
+            records.append(_record(
+                meta, source,
+                query=query,
+                sf=int(match.group(1)) if match else None,
+                workers=int(match.group(2)) if match else None,
+                config=row[0].strip() or None,
+                time_ms=time_ms,
+            ))
+    return records
+
+
+def _expand_counts(items: List[str], step: int) -> List[int]:
+    values = []
+    for item in items:
+        lo, _, hi = item.partition("-")
+        if not hi:
+            values.append(int(lo))
+            continue
+        lo, hi = int(lo), int(hi)
+        # SF ranges are written in hundreds: sf1-800 is SF100..SF800
+        start = lo * step if lo < step else lo
+        values.extend(range(start, hi + 1, step))
+    return values
+
+
+def configs_from_name(stem: str) -> Optional[List[tuple]]:
+    """
+    (sf, workers) per row for headerless per-run tables, from names like
+    times_sf1-800_1000_1-8_8_workers (SF100..SF800 on 1..8 workers, then
+    SF1000 on 8): the first half of the items are scale factors, the second
+    half the matching worker counts. None if the name doesn't follow it.
+    """
+    match = _TIMES_RE.match(stem)
+    if not match:
+        return None
+    items = match.group(1).split("_")
+    if len(items) % 2:
+        return None
+    half = len(items) // 2
+    try:
+        sfs = _expand_counts(items[:half], 100)
+        workers = _expand_counts(items[half:], 1)
+    except ValueError:
+        return None
+    return list(zip(sfs, workers)) if len(sfs) == len(workers) else None
+
+
+def _read_headerless(rows, meta, source, configs):
+    """Rows of Q1..Qn times, one per configuration in `configs`."""
+    rows = [row for row in rows if row]
+    if configs is not None and len(configs) != len(rows):
+        print(f"Skipping {source}: {len(rows)} rows but the name describes {len(configs)} configurations",
+              file=sys.stderr)
+        return []
+    records = []
+    for i, row in enumerate(rows):
+        sf, workers = configs[i] if configs else (None, None)
+        for column, value in enumerate(row, 1):
+            time_ms = _to_float(value)
+            if time_ms is None:
+                continue
+            records.append(_record(
+                meta, source,
+                query=f"Q{column}",
+                sf=sf,
+                workers=workers,
+                config=f"SF{sf}-{workers}W" if configs else f"row{i + 1}",
+                time_ms=time_ms,
+            ))
+    return records
+
+
+def _read_harness(rows, header, meta, source):
+    col = {name: i for i, name in enumerate(header)}
+    records = []
+    for row in rows:
+        if len(row) < len(header):
+            continue
+        time_ms = _to_float(row[col["wall_ms"]])
+        succeeded = row[col["succeeded"]] if "succeeded" in col else "1"
+        records.append(_record(
+            meta, source,
+            query=normalize_query(row[col["query_file"]]),
+            time_ms=time_ms,
+            status="SUCCESS" if succeeded == "1" else "FAILED",
+            created=row[col["start_time"]].replace(" ", "T") if "start_time" in col else None,
+        ))
+    return records
+
+
+def _read_whitespace_table(lines, meta, source):
+    """Read compare_qtime_with_number_workers.py style tables."""
+    header = lines[0]
+    x_key = "sf" if header.lower().startswith("scale factor") else "workers"
+    series = [m.group(1) for m in _SERIES_RE.finditer(header)]
+    scale = [1000.0 if m.group(2) == "sec" else 1.0 for m in _SERIES_RE.finditer(header)]
+    # Columns are different exchange implementations, so the file's ex/nex
+    # prefix only describes single-series tables
+    if len(series) > 1:
+        meta = dict(meta, exchange=None)
+    records = []
+    for line in lines[1:]:
+        parts = line.replace(",", " ").split()
+        if len(parts) < 2:
+            continue
+        try:
+            x_value = int(parts[0])
+        except ValueError:
+            print(f"Skipping invalid row: {line}", file=sys.stderr)
+            continue
+        for name, factor, value in zip(series, scale, parts[1:]):
+            time_value = _to_float(value)
+            if time_value is None:
+                continue
+            records.append(_record(
+                meta, source,
+                series=name,
+                time_ms=time_value * factor,
+                **{x_key: x_value},
+            ))
+    return records
+
+
+def load_result_file(path, root=None, statistic: str = "Avg") -> List[Dict[str, Any]]:
+    """
+    Read one result file into a list of records.
+
+    Args:
+        path: CSV file in any of the layouts listed in the module docstring
+        root: Directory the 'source' field is made relative to (default: none)
+        statistic: Column used for harness CSVs with Avg/Min/Max/Median columns
+
+    Files that match none of the known layouts yield an empty list.
+    """
+    path = Path(path)
+    source = str(path.relative_to(root)) if root else str(path)
+    meta = metadata_from_path(path)
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        lines = [line.rstrip("\r\n") for line in f if line.strip()]
+    if lines and lines[0].startswith("sep="):
+        lines = lines[1:]
+    if not lines:
+        return []
+
+    header_line = lines[0]
+    if "," not in header_line or "(sec)" in header_line:
+        if _SERIES_RE.search(header_line):
+            return _read_whitespace_table(lines, meta, source)
+        return []
+
+    rows = list(csv.reader(lines))
+    header = [h.strip() for h in rows[0]]
+    body = rows[1:]
+
+    if all(_to_float(h) is not None for h in header):
+        return _read_headerless(rows, meta, source, configs_from_name(path.stem))
+
+    if "timeMillsecs" in header:
+        return _read_extract_stats(body, header, meta, source)
+    if header[0] == "Query Name":
+        return _read_benchmark_csv(body, header, meta, source, statistic)
+    if "query_file" in header and "wall_ms" in header:
+        return _read_harness(body, header, meta, source)
+    if header[0] == "" and any(normalize_query(h) for h in header[1:]):
+        return _read_wide(body, header, meta, source)
+    return []
+
+
+def find_result_files(root) -> List[Path]:
+    """Return every CSV under root, sorted for stable output."""
+    return sorted(Path(root).rglob("*.csv"))
+
+
+def load_results(paths, root=None, statistic: str = "Avg") -> List[Dict[str, Any]]:
+    """Load several files (or directories, searched recursively) into one record list."""
+    records = []
+    for path in paths:
+        path = Path(path)
+        files = find_result_files(path) if path.is_dir() else [path]
+        for file_path in files:
+            records.extend(load_result_file(file_path, root=root, statistic=statistic))
+    return records
+
+
+def filter_records(records: List[Dict[str, Any]], **criteria) -> List[Dict[str, Any]]:
+    """Keep records whose fields equal the given values (lists/sets mean 'any of')."""
+    result = []
+    for record in records:
+        keep = True
+        for key, wanted in criteria.items():
+            if wanted is None:
+                continue
+            value = record.get(key)
+            if isinstance(wanted, (list, tuple, set)):
+                if value not in wanted:
+                    keep = False
+                    break
+            elif value != wanted:
+                keep = False
+                break
+        if keep:
+            result.append(record)
+    return result
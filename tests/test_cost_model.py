@@ -0,0 +1,37 @@
+"""Cost the checked-in velox_testing runs end to end."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "py_scripts"))
+
+from cost_model import DEFAULT_CONFIG, apply_cost_model, common_queries, load_cost_config, suite_summary
+from result_sets import find_result_files, load_results
+
+VELOX_TESTING = ROOT / "results" / "velox_testing"
+
+
+def test_costs_every_velox_testing_run(capsys):
+    records = load_results([VELOX_TESTING], root=VELOX_TESTING)
+    records = [r for r in records if r["query"] is not None]
+    costed = apply_cost_model(records, load_cost_config(DEFAULT_CONFIG), "sally", "gpu")
+
+    assert "Skipping" not in capsys.readouterr().err
+    assert {r["source"] for r in costed} == {r["source"] for r in records}
+    assert len({r["source"] for r in costed}) == len(find_result_files(VELOX_TESTING))
+    assert all(r["units"] == r["workers"] and r["dollars"] > 0 for r in costed)
+
+    summary = suite_summary(costed, common_queries(costed))
+    assert summary and all(s["ranked"] for s in summary)
+
+
+def test_cli_ranks_velox_testing():
+    result = subprocess.run(
+        [sys.executable, "cost_model.py", str(VELOX_TESTING), "--environment", "sally", "--engine", "gpu"],
+        cwd=ROOT / "py_scripts", capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert "Skipping" not in result.stderr
+    assert "ex_sf1000_wo8_dr1/benchmark_result.csv" in result.stdout
@@ -0,0 +1,83 @@
+"""Drive perf_bisect.Bisector with fake hooks instead of builds and benchmarks."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "py_scripts"))
+
+from perf_bisect import BisectHooks, Bisector, mann_whitney_greater, min_repeat
+
+REVISIONS = [f"r{i:02d}" for i in range(16)]
+
+
+class FakeHooks(BisectHooks):
+    """Q9 gets 30% slower from `first_bad` on; Q1 never changes."""
+
+    def __init__(self, first_bad=None):
+        self.first_bad = first_bad
+        self.benchmarked = []
+
+    def run_benchmark(self, rev, queries, repeat):
+        self.benchmarked.append(rev)
+        slow = self.first_bad is not None and REVISIONS.index(rev) >= REVISIONS.index(self.first_bad)
+        jitter = [(i * 7 % 5) - 2 for i in range(repeat)]
+        return {
+            "Q1": [500.0 + j for j in jitter],
+            "Q9": [(1300.0 if slow else 1000.0) + j for j in jitter],
+        }
+
+
+@pytest.mark.parametrize("first_bad", ["r01", "r09", "r15"])
+def test_finds_synthetic_regression(first_bad):
+    hooks = FakeHooks(first_bad)
+    result = Bisector(REVISIONS, hooks, ["Q1", "Q9"], repeat=5).run()
+
+    assert result["first_bad"] == first_bad
+    assert result["last_good"] == REVISIONS[REVISIONS.index(first_bad) - 1]
+    # good and bad ends plus log2(16) midpoints, each measured once
+    assert len(hooks.benchmarked) == len(set(hooks.benchmarked)) <= 2 + 4
+
+
+def test_no_regression_between_ends():
+    result = Bisector(REVISIONS, FakeHooks(), ["Q1", "Q9"], repeat=5).run()
+
+    assert result["first_bad"] is None
+    assert len(result["steps"]) == 1
+
+
+def test_rejects_repeat_that_cannot_reach_alpha():
+    # C(6, 3) = 20 orderings: the exact test bottoms out at p = 0.05
+    assert mann_whitney_greater([4, 5, 6], [1, 2, 3]) == pytest.approx(0.05)
+    with pytest.raises(ValueError, match="--repeat 4"):
+        Bisector(REVISIONS, FakeHooks(), ["Q9"], repeat=3, alpha=0.05)
+    assert min_repeat(0.01) == 5
+
+
+def test_hooks_must_implement_run_benchmark():
+    class NoBenchmark(BisectHooks):
+        pass
+
+    with pytest.raises(TypeError):
+        NoBenchmark()
+
+
+def test_resume_reuses_matching_log(tmp_path):
+    log = tmp_path / "bisect_log.json"
+    Bisector(REVISIONS, FakeHooks("r09"), ["Q1", "Q9"], repeat=5, log_path=log).run()
+
+    hooks = FakeHooks("r09")
+    result = Bisector(REVISIONS, hooks, ["Q1", "Q9"], repeat=5, log_path=log).run()
+
+    assert result["first_bad"] == "r09"
+    assert hooks.benchmarked == []
+
+
+@pytest.mark.parametrize("queries, repeat", [(["Q9"], 5), (["Q1", "Q9"], 6)])
+def test_resume_rejects_log_from_other_run(tmp_path, queries, repeat):
+    log = tmp_path / "bisect_log.json"
+    Bisector(REVISIONS, FakeHooks("r09"), ["Q1", "Q9"], repeat=5, log_path=log).run()
+
+    with pytest.raises(ValueError, match="remove it or pass another --log"):
+        Bisector(REVISIONS, FakeHooks("r09"), queries, repeat=repeat, log_path=log)
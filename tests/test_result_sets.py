@@ -0,0 +1,43 @@
+"""Run metadata parsed from the result file naming schemes under results/."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "py_scripts"))
+
+from result_sets import configs_from_name, load_result_file, metadata_from_path
+
+RESULTS = ROOT / "results"
+
+
+@pytest.mark.parametrize("path, sf, workers, drivers", [
+    ("velox_testing/ex_sf1000_wo8_dr1/benchmark_result.csv", 1000, 8, 1),
+    ("velox_testing/ex_sf10000_wo8_dr1/benchmark_result.csv", 10000, 8, 1),
+    ("velox_testing/ex_sf1000_wo1_dr1_single_node_execution/benchmark_result.csv", 1000, 1, 1),
+    ("ex_4_workers_sf100_velox_bb6ba2381.csv", 100, 4, None),
+    ("nex_8_workers_sf100_velox_2025-09-09.csv", 100, 8, None),
+])
+def test_single_run_names(path, sf, workers, drivers):
+    meta = metadata_from_path(RESULTS / path)
+
+    assert (meta["sf"], meta["workers"], meta["drivers"]) == (sf, workers, drivers)
+
+
+@pytest.mark.parametrize("name", ["ex_Q5_1_2_6_8_workers.csv", "nex_Q5_1_2_4_8_workers.csv"])
+def test_worker_lists_are_read_from_the_table(name):
+    # The name lists the worker counts swept; each row carries its own
+    assert metadata_from_path(RESULTS / "vldb" / name)["workers"] is None
+    records = load_result_file(RESULTS / "vldb" / name)
+    assert sorted(r["workers"] for r in records) == [1, 2, 4, 8]
+
+
+def test_headerless_times_configs():
+    stem = "times_sf1-800_1000_1-8_8_workers_sally_final_avg"
+
+    assert metadata_from_path(RESULTS / "vldb" / f"{stem}.csv")["workers"] is None
+    configs = configs_from_name(stem)
+    assert configs[0] == (100, 1)
+    assert configs[-1] == (1000, 8)
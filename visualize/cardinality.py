@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Estimated versus actual cardinality per plan node.
+
+Every stage's plan.jsonRepresentation carries the optimizer's estimates for
+each plan node (outputRowCount, totalSize), and operatorSummaries carries the
+rows the operators implementing that node actually produced. This module
+joins the two on (stage, planNodeId) and reports per node
+
+- estimated and actual output rows,
+- the misestimation factor (actual / estimated; below 1 is an overestimate),
+- the node's role: join, aggregation, or the probe/build input of a join.
+
+Nodes off by more than --threshold (10x by default) in either direction are
+flagged, join inputs and aggregations first, since a bad join order or the
+wrong build side is what makes the slow GPU plans slow. Per join it also
+compares the actual build and probe rows: a join whose build input turned out
+larger than its probe input is flagged as a wrong build side, unless the
+estimates also had the build side larger (a deliberate choice, e.g. a
+replicated build).
+
+Used by query_plan_visualize.py --cardinality; over a suite:
+
+    python cardinality.py query_infos/ --threshold 10 -o cardinality
+"""
+
+import argparse
+import csv
+import html
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from plan_graph import PlanGraph, is_partitioned_output
+from presto_stats import OperatorStats, load_stages, format_rows, read_json
+
+DEFAULT_THRESHOLD = 10.0
+
+# Roles in flag order: misestimated join inputs and aggregations matter most
+ROLES = ["build input", "probe input", "join", "aggregation", "other"]
+
+# Operators sharing a plan node id whose output is not the node's output
+_NOT_NODE_OUTPUT = ("HashJoinBuild", "HashBuild", "TaskOutput")
+
+
+def _estimate(value) -> Optional[float]:
+    """An estimate as float; None for missing or NaN (unknown) estimates."""
+    try:
+        value = float(value)
+    except (ValueError, TypeError):
+        return None
+    return None if math.isnan(value) or math.isinf(value) else value
+
+
+def plan_nodes(query_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every plan node of every stage with its parsed estimates, parents before children."""
+    nodes = []
+    for stage in load_stages(query_info):
+        try:
+            root = json.loads(stage.plan_json or "{}")
+        except (json.JSONDecodeError, TypeError):
+            continue
+        pending = [(root, None, 0)]
+        while pending:
+            node, parent, child_index = pending.pop()
+            if not node.get("id"):
+                continue
+            # Fused nodes (ScanFilterProject) list one estimate per plan node, the output last
+            estimates = node.get("estimates") or [{}]
+            children = node.get("children", [])
+            nodes.append({
+                "stage": stage.stage_id,
+                "node": str(node["id"]),
+                "name": node.get("name", ""),
+                "identifier": node.get("identifier", ""),
+                "details": node.get("details", ""),
+                "parent": parent,
+                "child_index": child_index,
+                "children": [str(c.get("id")) for c in children],
+                "estimated_rows": _estimate(estimates[-1].get("outputRowCount")),
+                "estimated_bytes": _estimate(estimates[-1].get("totalSize")),
+            })
+            pending.extend(reversed([(c, str(node["id"]), i) for i, c in enumerate(children)]))
+    return nodes
+
+
+def is_join(name: str) -> bool:
+    return "Join" in name
+
+
+def join_distribution(details: str) -> str:
+    """REPLICATED/PARTITIONED from a join node's details, if the plan printed it."""
+    for line in (details or "").splitlines():
+        if line.strip().startswith("Distribution:"):
+            return line.split(":", 1)[1].strip()
+    return ""
+
+
+def node_output_rows(ops: List[OperatorStats]) -> Optional[int]:
+    """
+    Actual output rows of a plan node: outputPositions of the last operator
+    implementing it, ignoring join builds and task outputs, which share the
+    node id without producing its output.
+    """
+    candidates = [op for op in ops
+                  if not op.operator_type.endswith(_NOT_NODE_OUTPUT) and not is_partitioned_output(op.operator_type)]
+    if not candidates:
+        return None
+    last = max(candidates, key=lambda op: (op.operator_id or 0, -op.pipeline))
+    return last.output_rows
+
+
+def misestimation(estimated: Optional[float], actual: Optional[int]) -> Optional[float]:
+    """actual / estimated with both floored at one row; None when either is unknown."""
+    if estimated is None or actual is None:
+        return None
+    return max(actual, 1) / max(estimated, 1.0)
+
+
+def _error(factor: Optional[float]) -> float:
+    """Misestimation in either direction as a factor >= 1."""
+    if factor is None:
+        return 0.0
+    return max(factor, 1.0 / factor)
+
+
+def analyze_cardinality(query_info: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+                        name: str = "") -> Dict[str, Any]:
+    """Per plan node estimates against actual rows, flagged nodes and per join build/probe checks."""
+    graph = PlanGraph(query_info)
+    nodes = plan_nodes(query_info)
+    by_key = {(n["stage"], n["node"]): n for n in nodes}
+
+    for n in nodes:
+        ops = graph.node_ops.get((n["stage"], n["node"]), [])
+        n["actual_rows"] = node_output_rows(ops)
+        first = min(ops, key=lambda op: (op.pipeline, op.operator_id or 0)) if ops else None
+        n["key"] = (n["stage"], first.pipeline, first.operator_id) if first else None
+        parent = by_key.get((n["stage"], n["parent"]))
+        if parent and is_join(parent["name"]):
+            n["role"] = "build input" if n["child_index"] == 1 else "probe input"
+        elif is_join(n["name"]):
+            n["role"] = "join"
+        elif n["name"].startswith("Aggregate"):
+            n["role"] = "aggregation"
+        else:
+            n["role"] = "other"
+
+    joins = []
+    for n in nodes:
+        if not is_join(n["name"]):
+            continue
+        # Join inputs without operators of their own: fall back to the join operators' input rows
+        ops = graph.node_ops.get((n["stage"], n["node"]), [])
+        build_op_rows = sum(op.input_rows for op in ops
+                            if op.operator_type.endswith(("HashJoinBuild", "HashBuild"))) if ops else None
+        probe_op_rows = sum(op.input_rows for op in ops
+                            if op.operator_type.endswith(("HashJoinProbe", "HashProbe", "LookupJoin"))) if ops else None
+        sides = [by_key.get((n["stage"], child)) for child in n["children"][:2]]
+        if len(sides) < 2 or None in sides:
+            continue
+        probe, build = sides
+        if probe["actual_rows"] is None and probe_op_rows:
+            probe["actual_rows"] = probe_op_rows
+        if build["actual_rows"] is None and build_op_rows:
+            build["actual_rows"] = build_op_rows
+        wrong_build = (probe["actual_rows"] is not None and build["actual_rows"] is not None
+                       and build["actual_rows"] > probe["actual_rows"]
+                       and (probe["estimated_rows"] is None or build["estimated_rows"] is None
+                            or build["estimated_rows"] <= probe["estimated_rows"]))
+        joins.append({
+            "stage": n["stage"],
+            "node": n["node"],
+            "name": n["name"],
+            "identifier": n["identifier"],
+            "distribution": join_distribution(n["details"]),
+            "key": n["key"],
+            "probe_estimated_rows": probe["estimated_rows"],
+            "probe_actual_rows": probe["actual_rows"],
+            "build_estimated_rows": build["estimated_rows"],
+            "build_actual_rows": build["actual_rows"],
+            "estimated_rows": n["estimated_rows"],
+            "actual_rows": n["actual_rows"],
+            "wrong_build_side": wrong_build,
+        })
+
+    for n in nodes:
+        n["factor"] = misestimation(n["estimated_rows"], n["actual_rows"])
+        n["flagged"] = _error(n["factor"]) > threshold
+    flagged = sorted((n for n in nodes if n["flagged"]), key=lambda n: (ROLES.index(n["role"]), -_error(n["factor"])))
+    compared = [n for n in nodes if n["factor"] is not None]
+    return {
+        "query": name or query_info.get("queryId", ""),
+        "threshold": threshold,
+        "nodes": nodes,
+        "compared": len(compared),
+        "flagged": flagged,
+        "joins": joins,
+        "max_error": max((_error(n["factor"]) for n in compared), default=0.0),
+    }
+
+
+def format_factor(factor: Optional[float]) -> str:
+    if factor is None:
+        return "N/A"
+    if factor >= 1:
+        return f"{factor:.1f}x under"
+    return f"{1 / factor:.1f}x over"
+
+
+def _node_label(n: Dict[str, Any]) -> str:
+    label = f'{html.escape(n["name"])} (node {html.escape(n["node"])})'
+    if n.get("key"):
+        stage_id, pipeline_id, operator_id = n["key"]
+        return f'<a href="#stage-{stage_id}-p{pipeline_id}-op-{operator_id}">{label}</a>'
+    return f'<a href="#stage-{n["stage"]}">{label}</a>'
+
+
+def _rows(value) -> str:
+    return "N/A" if value is None else format_rows(value)
+
+
+def cardinality_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    node_rows = ""
+    for n in result["flagged"]:
+        node_rows += (f'<tr><td>Stage {n["stage"]}</td><td>{_node_label(n)}</td><td>{n["role"]}</td>'
+                      f'<td style="text-align: right;">{_rows(n["estimated_rows"])}</td>'
+                      f'<td style="text-align: right;">{_rows(n["actual_rows"])}</td>'
+                      f'<td style="text-align: right;">{format_factor(n["factor"])}</td></tr>\n')
+    join_rows = ""
+    for j in result["joins"]:
+        verdict = '<span style="color: #e74c3c;">wrong build side</span>' if j["wrong_build_side"] else ""
+        join_rows += (f'<tr><td>Stage {j["stage"]}</td><td>{_node_label(j)} {html.escape(j["identifier"])}</td>'
+                      f'<td>{html.escape(j["distribution"])}</td>'
+                      f'<td style="text-align: right;">{_rows(j["probe_estimated_rows"])} / {_rows(j["probe_actual_rows"])}</td>'
+                      f'<td style="text-align: right;">{_rows(j["build_estimated_rows"])} / {_rows(j["build_actual_rows"])}</td>'
+                      f'<td style="text-align: right;">{_rows(j["estimated_rows"])} / {_rows(j["actual_rows"])}</td>'
+                      f'<td>{verdict}</td></tr>\n')
+    return f"""
+            <div class="operator-summary cardinality">
+                <div class="operator-summary-title">Cardinality Estimates: {len(result['flagged'])} of {result['compared']}
+                    plan nodes off by more than {result['threshold']:.0f}x</div>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Stage</th><th>Plan Node</th><th>Role</th><th style="text-align: right;">Estimated Rows</th>
+                        <th style="text-align: right;">Actual Rows</th><th style="text-align: right;">Misestimate</th></tr></thead>
+                    <tbody>
+{node_rows}                    </tbody>
+                </table>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Stage</th><th>Join</th><th>Distribution</th>
+                        <th style="text-align: right;">Probe est / actual</th><th style="text-align: right;">Build est / actual</th>
+                        <th style="text-align: right;">Output est / actual</th><th></th></tr></thead>
+                    <tbody>
+{join_rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_nodes_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "stage", "plan_node_id", "name", "role", "estimated_rows", "actual_rows",
+                         "estimated_bytes", "factor", "flagged"])
+        for r in results:
+            for n in r["nodes"]:
+                writer.writerow([r["query"], n["stage"], n["node"], n["name"], n["role"],
+                                 "" if n["estimated_rows"] is None else n["estimated_rows"],
+                                 "" if n["actual_rows"] is None else n["actual_rows"],
+                                 "" if n["estimated_bytes"] is None else n["estimated_bytes"],
+                                 "" if n["factor"] is None else f"{n['factor']:.4f}",
+                                 "yes" if n["flagged"] else "no"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Optimizer row estimates against actual rows per plan node",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s query.json
+  %(prog)s query_infos/ --threshold 100 -o cardinality
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Flag nodes misestimated by more than this factor (default: {DEFAULT_THRESHOLD:.0f})")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_nodes.csv")
+    args = parser.parse_args()
+
+    results = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                query_info = read_json(json_path)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+                continue
+            if "outputStage" not in query_info:
+                print(f"✗ Skipping {json_path}: not a query info (no outputStage)", file=sys.stderr)
+                continue
+            results.append(analyze_cardinality(query_info, args.threshold, json_path.stem))
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    for r in results:
+        print(f"{r['query']}: {len(r['flagged'])} of {r['compared']} plan nodes off by more than "
+              f"{r['threshold']:.0f}x (worst {r['max_error']:.1f}x)")
+        for n in r["flagged"]:
+            print(f"  stage {str(n['stage']):>3} node {n['node']:>5} {n['name'][:28]:<28} {n['role']:<12} "
+                  f"est {_rows(n['estimated_rows']):>9} actual {_rows(n['actual_rows']):>9}  {format_factor(n['factor'])}")
+        for j in r["joins"]:
+            if j["wrong_build_side"]:
+                print(f"  stage {j['stage']} join node {j['node']}: build {_rows(j['build_actual_rows'])} rows > "
+                      f"probe {_rows(j['probe_actual_rows'])} rows (estimated {_rows(j['build_estimated_rows'])} vs "
+                      f"{_rows(j['probe_estimated_rows'])}) - wrong build side")
+
+    if args.output_prefix:
+        write_nodes_csv(results, Path(f"{args.output_prefix}_nodes.csv"))
+        print(f"✓ Wrote {args.output_prefix}_nodes.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
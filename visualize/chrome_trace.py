@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Chrome Trace Event / Perfetto export of a query's distributed execution.
+
+Converts a detailed query info (with task and pipeline stats) into the
+Chrome Trace Event JSON format, which ui.perfetto.dev and chrome://tracing
+load as a zoomable timeline:
+
+- one process per worker node, one thread track per task with a slice for
+  the task (labelled with its stage) and one track per task pipeline with
+  the pipeline's first start to last end,
+- counter tracks per node for the peak memory and output-buffered bytes of
+  the tasks running on it (task stats only carry peaks and final values, so
+  each task contributes its peak for as long as it runs),
+- flow arrows along the inter-stage edges of the operator graph, from each
+  sending task's pipeline to the receiving stage's task on the same node (or
+  its first task).
+
+Timestamps are microseconds since the query was created.
+
+Used by query_plan_visualize.py --trace; standalone:
+
+    python chrome_trace.py query.json -o query.trace.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from plan_graph import PlanGraph
+from presto_stats import load_stages, parse_timestamp, read_json
+
+# Thread ids: task tracks are TASK_TID_STRIDE apart, their pipeline tracks follow them
+TASK_TID_STRIDE = 1000
+
+
+def _task_window(task):
+    """(start, end) of a task in epoch seconds, from task times or its pipelines; None if unknown."""
+    start = task.first_start if task.first_start is not None else task.create
+    end = task.last_end if task.last_end is not None else task.end
+    if start is None or end is None:
+        starts = [p.first_start for p in task.pipelines if p.first_start is not None]
+        ends = [p.last_end for p in task.pipelines if p.last_end is not None]
+        if not starts or not ends:
+            return None
+        start, end = min(starts), max(ends)
+    return start, max(end, start)
+
+
+def build_trace(query_info: Dict[str, Any], name: str = "") -> Dict[str, Any]:
+    """Trace Event JSON for one query info."""
+    stages = load_stages(query_info)
+    windows = {}
+    for stage in stages:
+        for index, task in enumerate(stage.tasks):
+            window = _task_window(task)
+            if window is not None:
+                windows[(stage.stage_id, index)] = window
+    origin = parse_timestamp(query_info.get("queryStats", {}).get("createTime"))
+    if origin is None:
+        origin = min((w[0] for w in windows.values()), default=0.0)
+
+    def us(t):
+        return round((t - origin) * 1e6, 3)
+
+    events = []
+    pids = {}
+    slices = {}  # (stage, pipeline) -> [(node, pid, tid, start, end)]
+    counters = {}  # node -> [(time, memory delta, buffered delta)]
+    tid = 0
+    for stage in stages:
+        for index, task in enumerate(stage.tasks):
+            if (stage.stage_id, index) not in windows:
+                continue
+            start, end = windows[(stage.stage_id, index)]
+            if task.node not in pids:
+                pids[task.node] = len(pids) + 1
+                events.append({"ph": "M", "name": "process_name", "pid": pids[task.node], "tid": 0,
+                               "args": {"name": f"Node {task.node}"}})
+            pid = pids[task.node]
+            tid += TASK_TID_STRIDE
+            task_id = task.task_id or f"{stage.stage_id}.{index}"
+            events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": f"Task {task_id}"}})
+            events.append({"ph": "M", "name": "thread_sort_index", "pid": pid, "tid": tid, "args": {"sort_index": tid}})
+            events.append({"ph": "X", "name": f"Stage {stage.stage_id}", "cat": "task", "pid": pid, "tid": tid,
+                           "ts": us(start), "dur": round((end - start) * 1e6, 3),
+                           "args": {"task": task_id, "stage": stage.stage_id, "state": stage.state,
+                                    "peak_user_bytes": task.peak_user_bytes,
+                                    "peak_total_bytes": task.peak_total_bytes,
+                                    "buffered_bytes": task.buffered_bytes}})
+            counters.setdefault(task.node, []).extend([
+                (start, task.peak_total_bytes or task.peak_user_bytes, task.buffered_bytes or 0),
+                (end, -(task.peak_total_bytes or task.peak_user_bytes), -(task.buffered_bytes or 0)),
+            ])
+            for pipeline in task.pipelines:
+                if pipeline.first_start is None or pipeline.last_end is None:
+                    slices.setdefault((stage.stage_id, pipeline.pipeline_id), []).append((task.node, pid, tid, start, end))
+                    continue
+                pipeline_tid = tid + 1 + pipeline.pipeline_id
+                events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": pipeline_tid,
+                               "args": {"name": f"Task {task_id} pipeline {pipeline.pipeline_id}"}})
+                events.append({"ph": "M", "name": "thread_sort_index", "pid": pid, "tid": pipeline_tid,
+                               "args": {"sort_index": pipeline_tid}})
+                p_end = max(pipeline.last_end, pipeline.first_start)
+                events.append({"ph": "X", "name": f"Stage {stage.stage_id} Pipeline {pipeline.pipeline_id}",
+                               "cat": "pipeline", "pid": pid, "tid": pipeline_tid, "ts": us(pipeline.first_start),
+                               "dur": round((p_end - pipeline.first_start) * 1e6, 3),
+                               "args": {"drivers": pipeline.total_drivers, "scheduled_ns": pipeline.scheduled_ns,
+                                        "cpu_ns": pipeline.cpu_ns, "blocked_ns": pipeline.blocked_ns,
+                                        "raw_input_rows": pipeline.raw_input_rows,
+                                        "output_rows": pipeline.output_rows}})
+                slices.setdefault((stage.stage_id, pipeline.pipeline_id), []).append(
+                    (task.node, pid, pipeline_tid, pipeline.first_start, p_end))
+
+    for node, changes in counters.items():
+        memory = buffered = 0
+        for t, memory_delta, buffered_delta in sorted(changes, key=lambda c: (c[0], c[1] > 0)):
+            memory += memory_delta
+            buffered += buffered_delta
+            events.append({"ph": "C", "name": "Memory (task peaks)", "pid": pids[node], "ts": us(t),
+                           "args": {"bytes": memory}})
+            events.append({"ph": "C", "name": "Buffered bytes", "pid": pids[node], "ts": us(t),
+                           "args": {"bytes": buffered}})
+
+    flow_id = 0
+    graph = PlanGraph(query_info)
+    linked = set()
+    for src_key, links in sorted(graph.links.items(), key=lambda kv: str(kv[0])):
+        for dst_key, direction in links:
+            if direction != "forward" or src_key[0] == dst_key[0] or (src_key[:2], dst_key[:2]) in linked:
+                continue
+            linked.add((src_key[:2], dst_key[:2]))
+            senders = slices.get(src_key[:2], [])
+            receivers = slices.get(dst_key[:2], [])
+            if not receivers:
+                continue
+            for node, pid, src_tid, src_start, src_end in senders:
+                receiver = next((r for r in receivers if r[0] == node), receivers[0])
+                _, dst_pid, dst_tid, dst_start, dst_end = receiver
+                flow_id += 1
+                flow_ts = min(max(dst_start, src_start), dst_end)
+                name = f"Stage {src_key[0]} -> Stage {dst_key[0]}"
+                events.append({"ph": "s", "id": flow_id, "name": name, "cat": "exchange", "pid": pid,
+                               "tid": src_tid, "ts": us(src_start)})
+                events.append({"ph": "f", "bp": "e", "id": flow_id, "name": name, "cat": "exchange",
+                               "pid": dst_pid, "tid": dst_tid, "ts": us(flow_ts)})
+
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"query": name or query_info.get("queryId", ""), "queryId": query_info.get("queryId", "")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a query info as Chrome Trace Event JSON for Perfetto")
+    parser.add_argument("input", help="Path to query plan JSON file")
+    parser.add_argument("-o", "--output", help="Output trace JSON (default: <input>.trace.json)")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    trace = build_trace(read_json(input_path), input_path.stem)
+    slices = sum(1 for e in trace["traceEvents"] if e["ph"] == "X")
+    if not slices:
+        print("ERROR: no task or pipeline timestamps in query info", file=sys.stderr)
+        sys.exit(1)
+    output_path = Path(args.output) if args.output else input_path.parent / f"{input_path.stem}.trace.json"
+    with open(output_path, "w") as f:
+        json.dump(trace, f)
+    flows = sum(1 for e in trace["traceEvents"] if e["ph"] == "s")
+    print(f"✓ Wrote {output_path}: {slices} slices, {flows} flows; open in https://ui.perfetto.dev", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Critical-path analysis for Presto query infos.
+
+Summed operator wall time says where work is spent, not what the query waits
+for: a scan spread over 96 drivers can burn more wall time than a single-task
+final aggregation that sits on the latency path. This module combines
+
+- the intra-stage plan tree (build/local-exchange sinks feed the pipeline
+  implementing the same plan node),
+- the inter-stage operator links from plan_graph.PlanGraph,
+- pipeline start/end times from the task-level pipeline stats,
+
+into a DAG of pipelines and walks the last-arriving predecessor back from the
+output pipeline. Each pipeline on the path is charged the wall-clock time it
+alone kept the query running (its end minus the later of its own start and its
+critical predecessor's end), split across its operators by active wall time.
+Without task-level timing the path falls back to the longest chain of
+per-driver active operator time.
+
+Used by query_plan_visualize.py --critical-path; can also run standalone:
+
+    python critical_path.py query.json
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from plan_graph import PlanGraph, stage_id_of
+from presto_stats import OperatorStats, load_stages, parse_time_value, format_time, read_json
+
+
+def active_wall_ns(operator: OperatorStats) -> float:
+    """Wall time an operator spent doing work (blocked time excluded)."""
+    breakdown = operator.wall_breakdown()
+    return breakdown["active"] + breakdown["finish"]
+
+
+def collect_pipeline_times(query_info: Dict[str, Any]) -> Dict[tuple, tuple]:
+    """(stage, pipeline) -> (first start, last end) in epoch seconds over all tasks."""
+    times = {}
+    for stage in load_stages(query_info):
+        for task in stage.tasks:
+            for pipeline in task.pipelines:
+                start, end = pipeline.first_start, pipeline.last_end
+                if start is None or end is None:
+                    continue
+                key = (stage.stage_id, pipeline.pipeline_id)
+                if key in times:
+                    times[key] = (min(times[key][0], start), max(times[key][1], end))
+                else:
+                    times[key] = (start, end)
+    return times
+
+
+def build_pipeline_graph(query_info: Dict[str, Any]) -> tuple:
+    """
+    Return (pipelines, predecessors).
+
+    pipelines maps (stage, pipeline) to its OperatorStats sorted by operatorId;
+    predecessors maps each pipeline to the set of pipelines it waits on.
+    """
+    graph = PlanGraph(query_info)
+    pipelines = graph.pipeline_ops
+    predecessors = {key: set() for key in pipelines}
+
+    # Inter-stage: PartitionedOutput -> Exchange edges
+    for src, links in graph.links.items():
+        for dest, direction in links:
+            if direction == "forward" and dest[:2] in predecessors and src[:2] != dest[:2]:
+                predecessors[dest[:2]].add(src[:2])
+
+    # Intra-stage: a pipeline's sink (HashJoinBuild, LocalPartition, ...) feeds the
+    # other pipeline of the same stage that implements the same plan node
+    for key, ops in pipelines.items():
+        sink_node = ops[-1].plan_node_id
+        if sink_node in ("", "N/A"):
+            continue
+        for op in graph.node_ops.get((key[0], sink_node), []):
+            other = (key[0], op.pipeline)
+            if other != key:
+                predecessors[other].add(key)
+
+    return pipelines, predecessors
+
+
+def _operator_entries(ops: List[OperatorStats], pipeline_ns: float) -> List[Dict[str, Any]]:
+    """Split a pipeline's critical time across its operators by active wall time."""
+    actives = [active_wall_ns(op) for op in ops]
+    total = sum(actives)
+    entries = []
+    for op, active in zip(ops, actives):
+        share = active / total if total else 1 / len(ops)
+        entries.append({
+            "key": op.key,
+            "operator": op.operator_type,
+            "plan_node_id": op.plan_node_id,
+            "active_wall_ns": active,
+            "critical_ns": pipeline_ns * share,
+        })
+    return entries
+
+
+def _timed_path(pipelines, predecessors, times, output_stage) -> List[tuple]:
+    """Walk the last-arriving predecessor back from the output stage's last pipeline."""
+    candidates = [k for k in times if k[0] == output_stage] or list(times)
+    sink = max(candidates, key=lambda k: times[k][1])
+    path = []
+    current, seen = sink, set()
+    while current is not None and current not in seen:
+        seen.add(current)
+        start, end = times[current]
+        timed_preds = [p for p in predecessors.get(current, ()) if p in times and p not in seen]
+        critical_pred = max(timed_preds, key=lambda p: times[p][1]) if timed_preds else None
+        ready = max(start, times[critical_pred][1]) if critical_pred else start
+        path.append((current, max(0.0, end - ready) * 1e9))
+        current = critical_pred
+    path.reverse()
+    return path
+
+
+def _untimed_path(pipelines, predecessors) -> List[tuple]:
+    """Longest chain of per-driver active time when no task timing is available."""
+    weights = {}
+    for key, ops in pipelines.items():
+        drivers = max((op.total_drivers or 1 for op in ops), default=1)
+        weights[key] = sum(active_wall_ns(op) for op in ops) / drivers
+
+    best, choice = {}, {}
+
+    def longest(key, visiting):
+        if key in best:
+            return best[key]
+        visiting.add(key)
+        preds = [p for p in predecessors.get(key, ()) if p not in visiting]
+        pred = max(preds, key=lambda p: longest(p, visiting)) if preds else None
+        best[key] = weights[key] + (best[pred] if pred is not None else 0.0)
+        choice[key] = pred
+        visiting.discard(key)
+        return best[key]
+
+    for key in pipelines:
+        longest(key, set())
+    current = max(best, key=best.get)
+    path = []
+    while current is not None:
+        path.append((current, weights[current]))
+        current = choice[current]
+    path.reverse()
+    return path
+
+
+def compute_critical_path(query_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute the critical path of a query info.
+
+    Returns a dict with 'operators' (source to sink, each with critical_ns and
+    share of execution time), 'pipelines', 'path_ns', 'execution_ns' and
+    'timed' (False when the per-driver fallback was used). Without an
+    executionTime the query's elapsedTime is used.
+    """
+    pipelines, predecessors = build_pipeline_graph(query_info)
+    if not pipelines:
+        return {"operators": [], "pipelines": [], "path_ns": 0.0, "execution_ns": 0.0, "timed": False}
+
+    times = {k: v for k, v in collect_pipeline_times(query_info).items() if k in pipelines}
+    timed = bool(times)
+    output_stage = stage_id_of(query_info["outputStage"]) if "outputStage" in query_info else None
+    path = _timed_path(pipelines, predecessors, times, output_stage) if timed else _untimed_path(pipelines, predecessors)
+
+    query_stats = query_info.get("queryStats", {})
+    execution_ns = parse_time_value(query_stats.get("executionTime") or query_stats.get("elapsedTime") or "0ns")
+    path_ns = sum(ns for _, ns in path)
+    execution_ns = execution_ns or path_ns
+
+    operators = []
+    for key, ns in path:
+        for entry in _operator_entries(pipelines[key], ns):
+            entry["share"] = entry["critical_ns"] / execution_ns if execution_ns else 0.0
+            operators.append(entry)
+
+    return {
+        "operators": operators,
+        "pipelines": [{"key": key, "critical_ns": ns} for key, ns in path],
+        "path_ns": path_ns,
+        "execution_ns": execution_ns,
+        "timed": timed,
+    }
+
+
+def critical_keys(result: Dict[str, Any]) -> set:
+    return {entry["key"] for entry in result["operators"]}
+
+
+def critical_path_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header, ranked by share of execution time."""
+    if not result["operators"]:
+        return ""
+    basis = "pipeline timing" if result["timed"] else "per-driver active time (no task timing in JSON)"
+    rows = ""
+    for entry in sorted(result["operators"], key=lambda e: -e["critical_ns"]):
+        stage_id, pipeline_id, operator_id = entry["key"]
+        anchor = f"stage-{stage_id}-p{pipeline_id}-op-{operator_id}"
+        rows += f"""
+                <tr>
+                    <td><a href="#{anchor}">{entry['operator']}</a></td>
+                    <td>[{stage_id}, {pipeline_id}, {operator_id}]</td>
+                    <td>{entry['plan_node_id']}</td>
+                    <td>{format_time(entry['critical_ns'])}</td>
+                    <td>{entry['share'] * 100:.1f}%</td>
+                </tr>"""
+    chain = " → ".join(f"S{k[0]}/P{k[1]}" for k in (p["key"] for p in result["pipelines"]))
+    coverage = result["path_ns"] / result["execution_ns"] * 100 if result["execution_ns"] else 0.0
+    return f"""
+            <div class="operator-summary critical-path">
+                <div class="operator-summary-title">Critical Path</div>
+                <p class="critical-chain">{chain} &mdash; {format_time(result['path_ns'])}
+                    ({coverage:.1f}% of execution time, based on {basis})</p>
+                <table class="operator-summary-table">
+                    <thead>
+                        <tr>
+                            <th>Operator</th>
+                            <th>[Stage, Pipeline, Op]</th>
+                            <th>Plan Node</th>
+                            <th>Critical Time</th>
+                            <th>% of Execution</th>
+                        </tr>
+                    </thead>
+                    <tbody>{rows}
+                    </tbody>
+                </table>
+            </div>"""
+
+
+def print_critical_path(result: Dict[str, Any]) -> None:
+    print(f"Critical path: {format_time(result['path_ns'])} of {format_time(result['execution_ns'])} execution "
+          f"({'pipeline timing' if result['timed'] else 'per-driver fallback'})", file=sys.stderr)
+    for entry in sorted(result["operators"], key=lambda e: -e["critical_ns"]):
+        if entry["share"] < 0.01:
+            continue
+        print(f"  {entry['share'] * 100:5.1f}%  {format_time(entry['critical_ns']):>10}  "
+              f"{entry['operator']} {list(entry['key'])}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: critical_path.py <query_json>", file=sys.stderr)
+        sys.exit(1)
+    print_critical_path(compute_critical_path(read_json(sys.argv[1])))
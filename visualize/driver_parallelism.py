@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Driver, split and pipeline-parallelism utilisation.
+
+The stage boxes show queued/running/completed driver counts, and the worker
+configs set task.max-drivers-per-task, but neither says whether the drivers
+were busy. This module reads the per-task pipeline stats of every stage and
+reports per pipeline:
+
+- drivers (splits, for source pipelines) per task and in total,
+- split size: raw input bytes per driver, with min/median/max over tasks
+  (per driver when the query info carries driver detail),
+- average parallelism: driver scheduled time divided by the pipeline's
+  wall-clock window in each task, i.e. how many drivers ran at once,
+- utilisation: average parallelism over the configured drivers per task.
+
+A pipeline is flagged as
+- under-split when its tasks get fewer drivers than the configured maximum,
+  so some driver slots can never be used,
+- under-utilised when it had enough drivers but ran on average less than
+  half of the configured drivers at once (blocked or serialized),
+- over-split when each task runs many times more drivers than the maximum
+  over splits smaller than 1MB, so per-split overhead dominates.
+
+Under-split and under-utilised only apply to pipelines that can scale:
+source pipelines, and intermediate pipelines running more than one driver
+per task. Output pipelines and single-driver intermediate ones (a final
+aggregation behind a local gather) run one driver by plan.
+
+The configured drivers per task come from --max-drivers, the session
+properties, a generated worker config.properties or the file name (dr2,
+2drivers), in that order. A parallelism profile over time (running drivers
+per stage, in buckets over the query's run) is included for plotting.
+
+Used by query_plan_visualize.py --drivers; over a suite:
+
+    python driver_parallelism.py ex_q9_2drivers.json ex_q9_4drivers.json -o drivers
+"""
+
+import argparse
+import csv
+import json
+import re
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import load_stages, format_data_size, format_time, read_json
+
+UNDER_UTILISED = 0.5
+OVER_SPLIT_FACTOR = 16
+SMALL_SPLIT_BYTES = 1024 ** 2
+PROFILE_BUCKETS = 50
+
+_DRIVERS_RE = re.compile(r'(?:^|_)(?:(\d+)drivers|dr(\d+)|(\d+)drv)(?=_|$)', re.IGNORECASE)
+
+
+def configured_drivers(query_info: Dict[str, Any], name: str = "", worker_config: Path = None) -> Optional[int]:
+    """Drivers per task from the session, a worker config.properties or the file name."""
+    session = query_info.get("session", {})
+    for properties in [session.get("systemProperties", {})] + list(session.get("catalogProperties", {}).values()):
+        for key, value in (properties or {}).items():
+            if key.endswith("max_drivers_per_task"):
+                try:
+                    return int(value)
+                except (ValueError, TypeError):
+                    pass
+    if worker_config:
+        files = sorted(worker_config.rglob("config.properties")) if worker_config.is_dir() else [worker_config]
+        for path in files:
+            with open(path) as f:
+                for line in f:
+                    key, _, value = line.strip().partition("=")
+                    if key.strip() == "task.max-drivers-per-task" and value.strip().isdigit():
+                        return int(value.strip())
+    match = _DRIVERS_RE.search(name or "")
+    if match:
+        return int(next(g for g in match.groups() if g))
+    return None
+
+
+def _task_pipelines(query_info: Dict[str, Any]):
+    """Yield (stage, PipelineStats) for every pipeline of every task."""
+    for stage in load_stages(query_info):
+        for task in stage.tasks:
+            for pipeline in task.pipelines:
+                yield stage.stage_id, pipeline
+
+
+def analyze_parallelism(query_info: Dict[str, Any], max_drivers: int = None, name: str = "") -> Dict[str, Any]:
+    """Per pipeline driver counts, split sizes, average parallelism and flags."""
+    pipelines = {}
+    for stage_id, pipeline in _task_pipelines(query_info):
+        entry = pipelines.setdefault((stage_id, pipeline.pipeline_id), {
+            "stage": stage_id, "pipeline": pipeline.pipeline_id,
+            "source": pipeline.input_pipeline, "output": pipeline.output_pipeline, "tasks": 0, "drivers": [],
+            "split_bytes": [], "parallelism": [], "scheduled_ns": 0.0,
+        })
+        start, end = pipeline.first_start, pipeline.last_end
+        entry["tasks"] += 1
+        entry["drivers"].append(pipeline.total_drivers)
+        entry["scheduled_ns"] += pipeline.scheduled_ns
+        if pipeline.drivers:
+            entry["split_bytes"].extend(d.get("rawInputDataSizeInBytes", 0) or 0 for d in pipeline.drivers)
+        elif pipeline.total_drivers:
+            entry["split_bytes"].append(pipeline.raw_input_bytes / pipeline.total_drivers)
+        if start is not None and end is not None and end > start:
+            entry["parallelism"].append(pipeline.scheduled_ns / ((end - start) * 1e9))
+
+    rows = []
+    for entry in pipelines.values():
+        drivers_per_task = statistics.mean(entry["drivers"]) if entry["drivers"] else 0.0
+        parallelism = statistics.mean(entry["parallelism"]) if entry["parallelism"] else None
+        split_median = statistics.median(entry["split_bytes"]) if entry["split_bytes"] else None
+        flags = []
+        utilisation = None
+        scalable = entry["source"] or (not entry["output"] and max(entry["drivers"], default=0) > 1)
+        if max_drivers:
+            if parallelism is not None:
+                utilisation = parallelism / max_drivers
+            if scalable and drivers_per_task < max_drivers:
+                flags.append("under-split")
+            elif scalable and utilisation is not None and utilisation < UNDER_UTILISED:
+                flags.append("under-utilised")
+            if (entry["source"] and drivers_per_task > OVER_SPLIT_FACTOR * max_drivers
+                    and split_median is not None and split_median < SMALL_SPLIT_BYTES):
+                flags.append("over-split")
+        rows.append({
+            "stage": entry["stage"],
+            "pipeline": entry["pipeline"],
+            "source": entry["source"],
+            "tasks": entry["tasks"],
+            "drivers_total": sum(entry["drivers"]),
+            "drivers_per_task": drivers_per_task,
+            "split_bytes_min": min(entry["split_bytes"]) if entry["split_bytes"] else None,
+            "split_bytes_median": split_median,
+            "split_bytes_max": max(entry["split_bytes"]) if entry["split_bytes"] else None,
+            "scheduled_ns": entry["scheduled_ns"],
+            "parallelism": parallelism,
+            "utilisation": utilisation,
+            "flags": flags,
+        })
+    rows.sort(key=lambda r: ((0, r["stage"]) if isinstance(r["stage"], int) else (1, str(r["stage"])), r["pipeline"]))
+    return {
+        "query": name or query_info.get("queryId", ""),
+        "max_drivers": max_drivers,
+        "pipelines": rows,
+        "profile": parallelism_profile(query_info),
+    }
+
+
+def parallelism_profile(query_info: Dict[str, Any], buckets: int = PROFILE_BUCKETS) -> Dict[str, Any]:
+    """
+    Running drivers per stage over time: each task pipeline's average
+    parallelism is spread evenly over its window and summed per bucket.
+    """
+    windows = [(stage_id, p.first_start, p.last_end, p.scheduled_ns / ((p.last_end - p.first_start) * 1e9))
+               for stage_id, p in _task_pipelines(query_info)
+               if p.first_start is not None and p.last_end is not None and p.last_end > p.first_start]
+    if not windows:
+        return {"start": 0.0, "bucket_s": 0.0, "stages": {}}
+    origin = min(w[1] for w in windows)
+    bucket_s = (max(w[2] for w in windows) - origin) / buckets or 1e-9
+    stages = {}
+    for stage_id, start, end, level in windows:
+        series = stages.setdefault(stage_id, [0.0] * buckets)
+        first = min(int((start - origin) / bucket_s), buckets - 1)
+        last = min(int((end - origin) / bucket_s), buckets - 1)
+        for b in range(first, last + 1):
+            lo = max(start, origin + b * bucket_s)
+            hi = min(end, origin + (b + 1) * bucket_s)
+            if hi > lo:
+                series[b] += level * (hi - lo) / bucket_s
+    return {"start": origin, "bucket_s": bucket_s, "stages": stages}
+
+
+def _fmt(value, fmt="{:.2f}") -> str:
+    return fmt.format(value) if value is not None else "N/A"
+
+
+def _size(value) -> str:
+    return format_data_size(value) if value is not None else "N/A"
+
+
+def parallelism_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    rows = ""
+    for r in result["pipelines"]:
+        flags = ", ".join(r["flags"]) or "&mdash;"
+        rows += (f'<tr><td><a href="#stage-{r["stage"]}">Stage {r["stage"]}</a> / Pipeline {r["pipeline"]}'
+                 f'{" (source)" if r["source"] else ""}</td>'
+                 f'<td style="text-align: center;">{r["tasks"]}</td>'
+                 f'<td style="text-align: right;">{r["drivers_total"]} / {r["drivers_per_task"]:.1f}</td>'
+                 f'<td style="text-align: right;">{_size(r["split_bytes_min"])} / {_size(r["split_bytes_median"])} / '
+                 f'{_size(r["split_bytes_max"])}</td>'
+                 f'<td style="text-align: right;">{format_time(r["scheduled_ns"])}</td>'
+                 f'<td style="text-align: right;">{_fmt(r["parallelism"])}</td>'
+                 f'<td style="text-align: right;">{_fmt(r["utilisation"] * 100 if r["utilisation"] is not None else None, "{:.0f}%")}</td>'
+                 f'<td>{flags}</td></tr>\n')
+    configured = result["max_drivers"] if result["max_drivers"] else "unknown"
+    return f"""
+            <div class="operator-summary driver-parallelism">
+                <div class="operator-summary-title">Driver Parallelism (configured drivers per task: {configured})</div>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Pipeline</th><th style="text-align: center;">Tasks</th>
+                        <th style="text-align: right;">Drivers Total / Per Task</th>
+                        <th style="text-align: right;">Split Size Min / Median / Max</th>
+                        <th style="text-align: right;">Scheduled</th><th style="text-align: right;">Avg Parallelism</th>
+                        <th style="text-align: right;">Utilisation</th><th>Flags</th></tr></thead>
+                    <tbody>
+{rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_pipelines_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "max_drivers", "stage", "pipeline", "source", "tasks", "drivers_total",
+                         "drivers_per_task", "split_bytes_min", "split_bytes_median", "split_bytes_max",
+                         "scheduled_ms", "avg_parallelism", "utilisation", "flags"])
+        for r in results:
+            for p in r["pipelines"]:
+                writer.writerow([r["query"], r["max_drivers"] or "", p["stage"], p["pipeline"], int(p["source"]),
+                                 p["tasks"], p["drivers_total"], f"{p['drivers_per_task']:.2f}",
+                                 p["split_bytes_min"] if p["split_bytes_min"] is not None else "",
+                                 p["split_bytes_median"] if p["split_bytes_median"] is not None else "",
+                                 p["split_bytes_max"] if p["split_bytes_max"] is not None else "",
+                                 f"{p['scheduled_ns'] / 1e6:.3f}", _fmt(p["parallelism"], "{:.3f}").replace("N/A", ""),
+                                 _fmt(p["utilisation"], "{:.3f}").replace("N/A", ""), ";".join(p["flags"])])
+
+
+def write_profile_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    """Running drivers per stage and time bucket, one row per bucket."""
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "stage", "time_s", "running_drivers"])
+        for r in results:
+            profile = r["profile"]
+            for stage_id, series in profile["stages"].items():
+                for b, level in enumerate(series):
+                    writer.writerow([r["query"], stage_id, f"{b * profile['bucket_s']:.3f}", f"{level:.3f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Driver, split and pipeline-parallelism utilisation against the configured drivers per task",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ex_sf1000_q9_2drivers.json ex_sf1000_q9_4drivers.json
+  %(prog)s query_infos/ --max-drivers 4 -o drivers
+  %(prog)s query.json --worker-config ../configs/worker_configs/
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("--max-drivers", type=int, help="Configured task.max-drivers-per-task (overrides detection)")
+    parser.add_argument("--worker-config", help="Generated worker config.properties or directory of them")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_pipelines.csv and <prefix>_profile.csv")
+    args = parser.parse_args()
+
+    worker_config = Path(args.worker_config) if args.worker_config else None
+    results = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                query_info = read_json(json_path)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+                continue
+            if "queryStats" not in query_info:
+                print(f"✗ Skipping {json_path}: not a query info (no queryStats)", file=sys.stderr)
+                continue
+            max_drivers = args.max_drivers or configured_drivers(query_info, json_path.stem, worker_config)
+            results.append(analyze_parallelism(query_info, max_drivers, json_path.stem))
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    for r in results:
+        print(f"{r['query']} (drivers per task: {r['max_drivers'] or 'unknown'})")
+        print(f"  {'Pipeline':<10} {'Tasks':>5} {'Drv/task':>8} {'Split median':>12} {'Avg par':>7} {'Util':>5}  Flags")
+        for p in r["pipelines"]:
+            util = f"{p['utilisation'] * 100:.0f}%" if p["utilisation"] is not None else "N/A"
+            print(f"  {str(p['stage']) + '/' + str(p['pipeline']):<10} {p['tasks']:>5} {p['drivers_per_task']:>8.1f} "
+                  f"{_size(p['split_bytes_median']):>12} {_fmt(p['parallelism']):>7} {util:>5}  {', '.join(p['flags'])}")
+
+    if args.output_prefix:
+        write_pipelines_csv(results, Path(f"{args.output_prefix}_pipelines.csv"))
+        write_profile_csv(results, Path(f"{args.output_prefix}_profile.csv"))
+        print(f"✓ Wrote {args.output_prefix}_pipelines.csv and {args.output_prefix}_profile.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Exchange throughput analysis: cudf exchange versus HTTP exchange.
+
+End-to-end times (5.4s cudf exchange vs 73s HTTP exchange for Q5) do not say
+whether the network or the operators around it are the limit. This module
+takes every stage edge found by plan_graph.PlanGraph, from the
+PartitionedOutput/cudfPartitionedOutput senders to the Exchange receivers,
+and reports per edge:
+
+- bytes and rows moved,
+- effective GB/s over the receiving pipeline's wall-clock window,
+- blocked wall time on the sender side (output buffers full: receiver or
+  network is slow) and on the receiver side (waiting for pages: upstream
+  operators are slow),
+- bytes still buffered in the sender tasks' output buffers.
+
+Across several query infos the edges are grouped by exchange mode (ex_/nex_
+file prefix, else the operator names) and worker count (distinct nodes in the
+task list), so runs with different setups can be compared directly.
+
+Used by query_plan_visualize.py --exchange; over a suite:
+
+    python exchange_throughput.py ex_q5.json nex_q5.json -o exchange
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from critical_path import collect_pipeline_times
+from plan_graph import PlanGraph, is_partitioned_output
+from presto_stats import load_operators, load_stages, format_data_size, format_rows, format_time, read_json
+
+_MODE_PREFIX_RE = re.compile(r"^(nex|ex)_")
+
+
+def detect_mode(query_info: Dict[str, Any], name: str = "") -> str:
+    """'ex' (cudf exchange) or 'nex' (HTTP exchange), from the file name or the operators."""
+    match = _MODE_PREFIX_RE.match(name or "")
+    if match:
+        return match.group(1)
+    if any(op.operator_type.lower().startswith("cudfexchange") for op in load_operators(query_info)):
+        return "ex"
+    return "nex"
+
+
+def count_workers(query_info: Dict[str, Any]) -> int:
+    """Distinct worker nodes that ran tasks of this query."""
+    return len({task.node for stage in load_stages(query_info) for task in stage.tasks})
+
+
+def _buffered_bytes(query_info: Dict[str, Any]) -> Dict[Any, int]:
+    """Stage -> bytes buffered in its tasks' output buffers (stage stats as fallback)."""
+    buffered = {}
+    for stage in load_stages(query_info):
+        task_bytes = [t.buffered_bytes for t in stage.tasks if t.buffered_bytes is not None]
+        buffered[stage.stage_id] = sum(task_bytes) if task_bytes else \
+            stage.stats.get("bufferedDataSizeInBytes", 0) or 0
+    return buffered
+
+
+def analyze_exchanges(query_info: Dict[str, Any], name: str = "") -> Dict[str, Any]:
+    """Per stage edge throughput and blocking for one query info."""
+    graph = PlanGraph(query_info)
+    times = collect_pipeline_times(query_info)
+    buffered = _buffered_bytes(query_info)
+
+    edges = {}
+    for src_key, links in graph.links.items():
+        src_op = graph.ops.get(src_key)
+        if not src_op or not is_partitioned_output(src_op.operator_type):
+            continue
+        for dst_key, direction in links:
+            if direction != "forward":
+                continue
+            edge = edges.setdefault((src_key[0], dst_key[0]), {"senders": {}, "receivers": {}})
+            edge["senders"][src_key] = src_op
+            edge["receivers"][dst_key] = graph.ops[dst_key]
+
+    rows = []
+    for (src_stage, dst_stage), edge in sorted(edges.items(), key=lambda kv: tuple((0, k) if isinstance(k, int) else (1, str(k)) for k in kv[0])):
+        senders, receivers = edge["senders"].values(), edge["receivers"].values()
+        sent_bytes = sum(op.output_bytes or op.input_bytes for op in senders)
+        received_bytes = sum(op.raw_input_bytes or op.input_bytes or op.output_bytes for op in receivers)
+        moved = received_bytes or sent_bytes
+
+        windows = [times[k[:2]] for k in edge["receivers"] if k[:2] in times] or \
+                  [times[k[:2]] for k in edge["senders"] if k[:2] in times]
+        window_s = max(w[1] for w in windows) - min(w[0] for w in windows) if windows else 0.0
+
+        rows.append({
+            "query": name,
+            "src_stage": src_stage,
+            "dst_stage": dst_stage,
+            "sender": ", ".join(sorted({op.operator_type for op in senders})),
+            "receiver": ", ".join(sorted({op.operator_type for op in receivers})),
+            "bytes": moved,
+            "rows": sum(op.output_rows for op in receivers),
+            "window_s": window_s,
+            "gbps": moved / window_s / 1e9 if window_s > 0 else None,
+            "sender_blocked_ns": sum(op.blocked_wall_ns for op in senders),
+            "receiver_blocked_ns": sum(op.blocked_wall_ns for op in receivers),
+            "buffered_bytes": buffered.get(src_stage, 0),
+        })
+
+    for row in rows:
+        if row["sender_blocked_ns"] > 2 * row["receiver_blocked_ns"]:
+            row["limiter"] = "receiver/network"
+        elif row["receiver_blocked_ns"] > 2 * row["sender_blocked_ns"]:
+            row["limiter"] = "sender operators"
+        else:
+            row["limiter"] = "balanced"
+
+    return {
+        "query": name,
+        "mode": detect_mode(query_info, name),
+        "workers": count_workers(query_info),
+        "edges": rows,
+    }
+
+
+def compare_setups(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate edges by (exchange mode, worker count)."""
+    groups = {}
+    for result in results:
+        group = groups.setdefault((result["mode"], result["workers"]), {
+            "mode": result["mode"], "workers": result["workers"], "queries": 0, "edges": 0,
+            "bytes": 0, "window_s": 0.0, "sender_blocked_ns": 0.0, "receiver_blocked_ns": 0.0,
+        })
+        group["queries"] += 1
+        for edge in result["edges"]:
+            group["edges"] += 1
+            group["bytes"] += edge["bytes"]
+            group["window_s"] += edge["window_s"]
+            group["sender_blocked_ns"] += edge["sender_blocked_ns"]
+            group["receiver_blocked_ns"] += edge["receiver_blocked_ns"]
+    summary = list(groups.values())
+    for group in summary:
+        group["gbps"] = group["bytes"] / group["window_s"] / 1e9 if group["window_s"] > 0 else None
+    summary.sort(key=lambda g: (g["mode"], g["workers"]))
+    return summary
+
+
+def _gbps(value) -> str:
+    return f"{value:.2f}" if value is not None else "N/A"
+
+
+def exchange_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    rows = ""
+    for e in result["edges"]:
+        rows += (f'<tr><td><a href="#stage-{e["src_stage"]}">Stage {e["src_stage"]}</a> &rarr; '
+                 f'<a href="#stage-{e["dst_stage"]}">Stage {e["dst_stage"]}</a></td>'
+                 f'<td>{e["sender"]} &rarr; {e["receiver"]}</td>'
+                 f'<td style="text-align: right;">{format_data_size(e["bytes"])} / {format_rows(e["rows"])} rows</td>'
+                 f'<td style="text-align: right;">{_gbps(e["gbps"])}</td>'
+                 f'<td style="text-align: right;">{format_time(e["sender_blocked_ns"])}</td>'
+                 f'<td style="text-align: right;">{format_time(e["receiver_blocked_ns"])}</td>'
+                 f'<td style="text-align: right;">{format_data_size(e["buffered_bytes"])}</td>'
+                 f'<td>{e["limiter"]}</td></tr>\n')
+    return f"""
+            <div class="operator-summary exchange-throughput">
+                <div class="operator-summary-title">Exchange Throughput ({result['mode']}, {result['workers']} workers)</div>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Edge</th><th>Operators</th><th style="text-align: right;">Moved</th>
+                        <th style="text-align: right;">GB/s</th><th style="text-align: right;">Sender Blocked</th>
+                        <th style="text-align: right;">Receiver Blocked</th><th style="text-align: right;">Buffered</th>
+                        <th>Limited By</th></tr></thead>
+                    <tbody>
+{rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_edges_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    fields = ["query", "mode", "workers", "src_stage", "dst_stage", "sender", "receiver", "bytes", "rows",
+              "window_s", "gbps", "sender_blocked_ms", "receiver_blocked_ms", "buffered_bytes", "limiter"]
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for r in results:
+            for e in r["edges"]:
+                writer.writerow([r["query"], r["mode"], r["workers"], e["src_stage"], e["dst_stage"], e["sender"],
+                                 e["receiver"], e["bytes"], e["rows"], f"{e['window_s']:.3f}", _gbps(e["gbps"]),
+                                 f"{e['sender_blocked_ns'] / 1e6:.3f}", f"{e['receiver_blocked_ns'] / 1e6:.3f}",
+                                 e["buffered_bytes"], e["limiter"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exchange throughput per stage edge, compared across exchange modes and worker counts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ex_q5.json nex_q5.json
+  %(prog)s query_infos/ -o exchange
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_edges.csv")
+    args = parser.parse_args()
+
+    results = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                results.append(analyze_exchanges(read_json(json_path), json_path.stem))
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'Query':<32} {'Edge':<8} {'Moved':>10} {'GB/s':>7} {'SendBlk':>10} {'RecvBlk':>10} {'Limited by':<18}")
+    for r in results:
+        for e in r["edges"]:
+            print(f"{r['query'][:32]:<32} {str(e['src_stage']) + '->' + str(e['dst_stage']):<8} "
+                  f"{format_data_size(e['bytes']):>10} {_gbps(e['gbps']):>7} {format_time(e['sender_blocked_ns']):>10} "
+                  f"{format_time(e['receiver_blocked_ns']):>10} {e['limiter']:<18}")
+
+    print(f"\n{'Mode':<5} {'Workers':>7} {'Queries':>7} {'Edges':>6} {'Moved':>10} {'GB/s':>7} {'SendBlk':>10} {'RecvBlk':>10}")
+    for g in compare_setups(results):
+        print(f"{g['mode']:<5} {g['workers']:>7} {g['queries']:>7} {g['edges']:>6} {format_data_size(g['bytes']):>10} "
+              f"{_gbps(g['gbps']):>7} {format_time(g['sender_blocked_ns']):>10} {format_time(g['receiver_blocked_ns']):>10}")
+
+    if args.output_prefix:
+        write_edges_csv(results, Path(f"{args.output_prefix}_edges.csv"))
+        print(f"✓ Wrote {args.output_prefix}_edges.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
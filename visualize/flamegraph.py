@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Flame-graph export of a query's operator time.
+
+Every operator summary's time is split into components and written as a stack
+
+    query;Stage 1;Pipeline 0;CudfHashJoinProbe;active  1234
+
+in two formats:
+
+- collapsed stacks (<prefix>.folded): one "frames weight" line per stack,
+  readable by flamegraph.pl, difffolded.pl, inferno and speedscope,
+- speedscope JSON (<prefix>.speedscope.json): one sampled profile per query
+  plus, for several queries, a merged "suite" profile.
+
+Weights are microseconds of wall time (components active, blocked_input,
+blocked_output, finish, as in the operator summary) or of CPU time
+(add_input, get_output, finish). Operator frames are named by operator type
+only, so the same operator type merges across pipelines in speedscope's
+sandwich view and a suite-wide graph shows where the whole benchmark spends
+its time.
+
+Used by query_plan_visualize.py --flamegraph; over a suite:
+
+    python flamegraph.py query_metrics/ -o tpch_flame --weight cpu
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import load_operators, read_json, WALL_COMPONENTS
+
+WEIGHTS = ["wall", "cpu"]
+
+CPU_COMPONENTS = [("add_input", "add_input_cpu_ns"), ("get_output", "get_output_cpu_ns"), ("finish", "finish_cpu_ns")]
+
+
+def _frame(name) -> str:
+    """Frame names may not contain the collapsed-stack separator."""
+    return str(name).replace(";", ":").replace("\n", " ")
+
+
+def query_stacks(query_info: Dict[str, Any], name: str, weight: str = "wall") -> Dict[tuple, int]:
+    """(query, stage, pipeline, operator, component) -> microseconds, zero weights omitted."""
+    stacks = {}
+    for op in load_operators(query_info):
+        if weight == "cpu":
+            components = {label: getattr(op, field) for label, field in CPU_COMPONENTS}
+        else:
+            breakdown = op.wall_breakdown()
+            components = {label: breakdown[label] for label in WALL_COMPONENTS}
+        prefix = (_frame(name), f"Stage {op.stage}", f"Pipeline {op.pipeline}", _frame(op.operator_type))
+        for label, ns in components.items():
+            us = int(round(ns / 1000))
+            if us > 0:
+                stacks[prefix + (label,)] = stacks.get(prefix + (label,), 0) + us
+    return stacks
+
+
+def merge_stacks(stacks_list: List[Dict[tuple, int]]) -> Dict[tuple, int]:
+    merged = {}
+    for stacks in stacks_list:
+        for stack, value in stacks.items():
+            merged[stack] = merged.get(stack, 0) + value
+    return merged
+
+
+def write_collapsed(stacks: Dict[tuple, int], output_path: Path) -> None:
+    with open(output_path, "w") as f:
+        for stack, value in sorted(stacks.items()):
+            f.write(f"{';'.join(stack)} {value}\n")
+
+
+def speedscope_json(profiles: List[tuple], name: str) -> Dict[str, Any]:
+    """A speedscope file with one sampled profile per (name, stacks) pair, sharing one frame table."""
+    frames = {}
+    out_profiles = []
+    for profile_name, stacks in profiles:
+        samples, weights = [], []
+        for stack, value in sorted(stacks.items()):
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(value)
+        out_profiles.append({
+            "type": "sampled",
+            "name": profile_name,
+            "unit": "microseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "presto_benchmarking flamegraph.py",
+        "activeProfileIndex": 0,
+        "shared": {"frames": [{"name": frame} for frame in frames]},
+        "profiles": out_profiles,
+    }
+
+
+def export_flamegraphs(queries: List[tuple], prefix: str, weight: str = "wall") -> List[str]:
+    """
+    Write <prefix>.folded and <prefix>.speedscope.json for (name, query info)
+    pairs; several queries are merged into one suite graph. Returns the paths.
+    """
+    per_query = [(name, query_stacks(query_info, name, weight)) for name, query_info in queries]
+    merged = merge_stacks([stacks for _, stacks in per_query])
+    profiles = per_query if len(per_query) == 1 else [(f"suite ({weight})", merged)] + per_query
+    folded_path = f"{prefix}.folded"
+    speedscope_path = f"{prefix}.speedscope.json"
+    write_collapsed(merged, Path(folded_path))
+    with open(speedscope_path, "w") as f:
+        json.dump(speedscope_json(profiles, f"{Path(prefix).name} ({weight} time)"), f)
+    return [folded_path, speedscope_path]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export query -> stage -> pipeline -> operator -> component time as flame graphs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s query.json -o q9_flame
+  %(prog)s query_metrics/ -o tpch_flame --weight cpu
+  flamegraph.pl tpch_flame.folded > tpch_flame.svg
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("-o", "--output-prefix", required=True,
+                        help="Write <prefix>.folded and <prefix>.speedscope.json")
+    parser.add_argument("--weight", choices=WEIGHTS, default="wall", help="Weight stacks by wall (default) or CPU time")
+    args = parser.parse_args()
+
+    queries = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                query_info = read_json(json_path)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+                continue
+            if "queryStats" not in query_info:
+                print(f"✗ Skipping {json_path}: not a query info (no queryStats)", file=sys.stderr)
+                continue
+            queries.append((json_path.stem, query_info))
+    if not queries:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    for path in export_flamegraphs(queries, args.output_prefix, args.weight):
+        print(f"✓ Wrote {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,9 +25,13 @@ import json
 import sys
 import argparse
 import traceback
-from datetime import datetime
+from pathlib import Path
 from typing import Optional, Dict, Any, List
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import load_query_info, format_time
+
 
 def fetch_json(url: str) -> Any:
     """
@@ -192,23 +196,19 @@ def print_summary(query_data: Dict[str, Any]) -> None:
     print("QUERY SUMMARY", file=sys.stderr)
     print("="*80, file=sys.stderr)
 
-    query_id = query_data.get("queryId", "N/A")
-    state = query_data.get("state", "N/A")
-    user = query_data.get("session", {}).get("user", "N/A")
-    query_string = query_data.get("query", "")[:100]
-
-    stats = query_data.get("queryStats", {})
-    create_time = stats.get("createTime", "N/A")
-    elapsed = stats.get("elapsedTime", "N/A")
-    queue_time = stats.get("queuedTime", "N/A")
-
-    print(f"Query ID:      {query_id}", file=sys.stderr)
-    print(f"State:         {state}", file=sys.stderr)
-    print(f"User:          {user}", file=sys.stderr)
-    print(f"Created:       {create_time}", file=sys.stderr)
-    print(f"Elapsed Time:  {elapsed}", file=sys.stderr)
-    print(f"Queued Time:   {queue_time}", file=sys.stderr)
-    print(f"Query (first 100 chars): {query_string}...", file=sys.stderr)
+    query = load_query_info(query_data)
+
+    print(f"Query ID:      {query.query_id or 'N/A'}", file=sys.stderr)
+    print(f"State:         {query.state}", file=sys.stderr)
+    print(f"User:          {query.session.get('user', 'N/A')}", file=sys.stderr)
+    print(f"Created:       {query_data.get('queryStats', {}).get('createTime', 'N/A')}", file=sys.stderr)
+    print(f"Elapsed Time:  {format_time(query.elapsed_ns)}", file=sys.stderr)
+    print(f"Queued Time:   {format_time(query.queued_ns)}", file=sys.stderr)
+    if query.planning_ns:
+        print(f"Planning Time: {format_time(query.planning_ns)}", file=sys.stderr)
+    if query.finishing_ns:
+        print(f"Finishing:     {format_time(query.finishing_ns)}", file=sys.stderr)
+    print(f"Query (first 100 chars): {query.query[:100]}...", file=sys.stderr)
     print("="*80 + "\n", file=sys.stderr)
 
 
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+GPU coverage and CPU-fallback analysis for Presto query infos.
+
+Every operator in operatorSummaries is classified as
+
+- conversion: a CPU<->GPU boundary (CudfFromVelox / CudfToVelox, or a
+  non-numeric plan node id such as "1653-to-velox"),
+- gpu:        a cudf operator (CudfHashJoinBuild, cudfPartitionedOutput, ...),
+- cpu:        any other Velox operator.
+
+Per query it reports the share of active wall time and rows processed on the
+GPU, and lists every fallback boundary with its transfer volume and the CPU
+operator on the other side. Over a suite of query infos the CPU operators
+next to boundaries are ranked by the wall time they and their conversions
+cost, which points at the unsupported operators worth porting first.
+
+Used by query_plan_visualize.py --gpu-coverage; over a suite:
+
+    python gpu_coverage.py ../results/query_infos/*.json -o coverage
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from critical_path import active_wall_ns
+from presto_stats import OperatorStats, load_operators, format_data_size, format_rows, format_time, read_json
+
+CLASSES = ["gpu", "cpu", "conversion"]
+
+
+def classify_operator(op: OperatorStats) -> str:
+    operator_type = op.operator_type
+    if "FromVelox" in operator_type or "ToVelox" in operator_type or "-to-" in op.plan_node_id:
+        return "conversion"
+    if operator_type.lower().startswith("cudf"):
+        return "gpu"
+    return "cpu"
+
+
+def rows_processed(op: OperatorStats) -> int:
+    """Input rows, or output rows for source operators such as TableScan."""
+    return op.input_rows or op.output_rows
+
+
+def analyze_query(query_info: Dict[str, Any], name: str = None) -> Dict[str, Any]:
+    """Per-class wall/row totals and fallback boundaries of one query info."""
+    by_key = {op.key: op for op in load_operators(query_info)}
+
+    totals = {cls: {"wall_ns": 0.0, "rows": 0, "operators": 0} for cls in CLASSES}
+    boundaries = []
+    for key, op in sorted(by_key.items(), key=lambda kv: tuple(str(k) for k in kv[0])):
+        cls = classify_operator(op)
+        totals[cls]["wall_ns"] += active_wall_ns(op)
+        totals[cls]["rows"] += rows_processed(op)
+        totals[cls]["operators"] += 1
+        if cls != "conversion":
+            continue
+
+        stage_id, pipeline_id, operator_id = key
+        to_cpu = "ToVelox" in op.operator_type or "-to-velox" in op.plan_node_id
+        # The CPU side is downstream of a GPU->CPU conversion and upstream of a CPU->GPU one
+        neighbour = None
+        if isinstance(operator_id, int):
+            neighbour = by_key.get((stage_id, pipeline_id, operator_id + 1 if to_cpu else operator_id - 1))
+        boundaries.append({
+            "query": name or query_info.get("queryId", ""),
+            "key": key,
+            "operator": op.operator_type,
+            "plan_node_id": op.plan_node_id,
+            "direction": "gpu->cpu" if to_cpu else "cpu->gpu",
+            "cpu_operator": neighbour.operator_type if neighbour else "",
+            "cpu_operator_wall_ns": active_wall_ns(neighbour) if neighbour and classify_operator(neighbour) == "cpu" else 0.0,
+            "rows": op.input_rows,
+            "bytes": op.input_bytes,
+            "wall_ns": active_wall_ns(op),
+        })
+
+    wall_total = sum(t["wall_ns"] for t in totals.values())
+    rows_total = sum(t["rows"] for t in totals.values())
+    return {
+        "query": name or query_info.get("queryId", ""),
+        "totals": totals,
+        "gpu_wall_share": totals["gpu"]["wall_ns"] / wall_total if wall_total else 0.0,
+        "gpu_rows_share": totals["gpu"]["rows"] / rows_total if rows_total else 0.0,
+        "conversion_wall_share": totals["conversion"]["wall_ns"] / wall_total if wall_total else 0.0,
+        "boundaries": boundaries,
+    }
+
+
+def rank_fallbacks(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate boundaries by the CPU operator they fall back to, costliest first."""
+    ranking = {}
+    for result in results:
+        for b in result["boundaries"]:
+            name = b["cpu_operator"] or "(none)"
+            entry = ranking.setdefault(name, {"cpu_operator": name, "boundaries": 0, "queries": set(),
+                                              "cpu_wall_ns": 0.0, "conversion_wall_ns": 0.0, "bytes": 0, "rows": 0})
+            entry["boundaries"] += 1
+            entry["queries"].add(result["query"])
+            entry["cpu_wall_ns"] += b["cpu_operator_wall_ns"]
+            entry["conversion_wall_ns"] += b["wall_ns"]
+            entry["bytes"] += b["bytes"]
+            entry["rows"] += b["rows"]
+    ranked = list(ranking.values())
+    for entry in ranked:
+        entry["queries"] = len(entry["queries"])
+        entry["cost_ns"] = entry["cpu_wall_ns"] + entry["conversion_wall_ns"]
+    ranked.sort(key=lambda e: -e["cost_ns"])
+    return ranked
+
+
+def gpu_coverage_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    class_rows = ""
+    for cls in CLASSES:
+        t = result["totals"][cls]
+        class_rows += (f'<tr><td>{cls.upper()}</td><td style="text-align: center;">{t["operators"]}</td>'
+                       f'<td style="text-align: right;">{format_time(t["wall_ns"])}</td>'
+                       f'<td style="text-align: right;">{format_rows(t["rows"])}</td></tr>\n')
+    boundary_rows = ""
+    for b in result["boundaries"]:
+        stage_id, pipeline_id, operator_id = b["key"]
+        anchor = f"stage-{stage_id}-p{pipeline_id}-op-{operator_id}"
+        boundary_rows += (f'<tr><td><a href="#{anchor}">{b["operator"]}</a> [{stage_id}, {pipeline_id}, {operator_id}]</td>'
+                          f'<td>{b["direction"]}</td><td>{b["cpu_operator"]}</td>'
+                          f'<td style="text-align: right;">{format_rows(b["rows"])}</td>'
+                          f'<td style="text-align: right;">{format_data_size(b["bytes"])}</td>'
+                          f'<td style="text-align: right;">{format_time(b["wall_ns"])}</td></tr>\n')
+    return f"""
+            <div class="operator-summary gpu-coverage">
+                <div class="operator-summary-title">GPU Coverage: {result['gpu_wall_share'] * 100:.1f}% of active wall time,
+                    {result['gpu_rows_share'] * 100:.1f}% of rows on GPU</div>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Class</th><th style="text-align: center;">Operators</th>
+                        <th style="text-align: right;">Active Wall</th><th style="text-align: right;">Rows</th></tr></thead>
+                    <tbody>
+{class_rows}                    </tbody>
+                </table>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Boundary</th><th>Direction</th><th>CPU Operator</th>
+                        <th style="text-align: right;">Rows</th><th style="text-align: right;">Bytes</th>
+                        <th style="text-align: right;">Wall</th></tr></thead>
+                    <tbody>
+{boundary_rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_queries_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "gpu_wall_share", "gpu_rows_share", "conversion_wall_share", "boundaries"]
+                        + [f"{cls}_{m}" for cls in CLASSES for m in ("operators", "wall_ms", "rows")])
+        for r in results:
+            row = [r["query"], f"{r['gpu_wall_share']:.4f}", f"{r['gpu_rows_share']:.4f}",
+                   f"{r['conversion_wall_share']:.4f}", len(r["boundaries"])]
+            for cls in CLASSES:
+                t = r["totals"][cls]
+                row += [t["operators"], f"{t['wall_ns'] / 1e6:.3f}", t["rows"]]
+            writer.writerow(row)
+
+
+def write_boundaries_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "stage", "pipeline", "operator_id", "operator", "plan_node_id", "direction",
+                         "cpu_operator", "rows", "bytes", "wall_ms", "cpu_operator_wall_ms"])
+        for r in results:
+            for b in r["boundaries"]:
+                writer.writerow([b["query"], *b["key"], b["operator"], b["plan_node_id"], b["direction"],
+                                 b["cpu_operator"], b["rows"], b["bytes"], f"{b['wall_ns'] / 1e6:.3f}",
+                                 f"{b['cpu_operator_wall_ns'] / 1e6:.3f}"])
+
+
+def _expand_inputs(inputs: List[str]) -> List[Path]:
+    paths = []
+    for item in inputs:
+        path = Path(item)
+        paths.extend(sorted(path.glob("*.json")) if path.is_dir() else [path])
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="GPU coverage and CPU-fallback analysis over query info JSON files",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s query.json
+  %(prog)s ../results/query_infos -o coverage
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_queries.csv and <prefix>_boundaries.csv")
+    args = parser.parse_args()
+
+    results = []
+    for path in _expand_inputs(args.inputs):
+        try:
+            results.append(analyze_query(read_json(path), path.stem))
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"✗ Skipping {path}: {e}", file=sys.stderr)
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'Query':<40} {'GPU wall':>9} {'GPU rows':>9} {'Conv wall':>9} {'Boundaries':>10}")
+    for r in results:
+        print(f"{r['query'][:40]:<40} {r['gpu_wall_share'] * 100:>8.1f}% {r['gpu_rows_share'] * 100:>8.1f}% "
+              f"{r['conversion_wall_share'] * 100:>8.1f}% {len(r['boundaries']):>10}")
+
+    wall = {cls: sum(r["totals"][cls]["wall_ns"] for r in results) for cls in CLASSES}
+    rows = {cls: sum(r["totals"][cls]["rows"] for r in results) for cls in CLASSES}
+    print(f"\nSuite: {wall['gpu'] / (sum(wall.values()) or 1) * 100:.1f}% of active wall time and "
+          f"{rows['gpu'] / (sum(rows.values()) or 1) * 100:.1f}% of rows on GPU over {len(results)} queries")
+
+    print("\nCostliest fallbacks (CPU operator + conversion wall time):")
+    for entry in rank_fallbacks(results)[:15]:
+        print(f"  {entry['cpu_operator']:<28} {format_time(entry['cost_ns']):>10}  boundaries={entry['boundaries']:<4} "
+              f"queries={entry['queries']:<3} transferred={format_data_size(entry['bytes'])}")
+
+    if args.output_prefix:
+        write_queries_csv(results, Path(f"{args.output_prefix}_queries.csv"))
+        write_boundaries_csv(results, Path(f"{args.output_prefix}_boundaries.csv"))
+        print(f"✓ Wrote {args.output_prefix}_queries.csv and {args.output_prefix}_boundaries.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
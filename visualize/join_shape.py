@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Join build-side and distribution analysis.
+
+The visualizer shows HashJoinBuild/CudfHashJoinBuild and their probes as
+separate operators and nothing ties them together. This module pairs every
+build with its probe by (stage, planNodeId) and reports per join:
+
+- build rows and bytes, probe rows, output rows,
+- expansion: output rows per probe row (above 1 the join multiplies rows),
+- distribution: REPLICATED (broadcast build) or PARTITIONED, from the join's
+  plan node details,
+- memory held by the build: the build operators' peak reservation and the
+  build input per task, which is what a GPU build has to hold in device
+  memory (cuDF builds do not reserve from the Velox pools, so their
+  reservation is often 0).
+
+A join is flagged when the memory held by its build (the larger of the two)
+exceeds --build-fraction of a memory limit: the GPU memory given with --gpu-memory, and the worker's
+query.max-memory-per-node from config.properties. That is the first thing to
+check when a query fails after a scale-factor step up.
+
+Used by query_plan_visualize.py --joins; over a suite:
+
+    python join_shape.py query_infos/ --gpu-memory 80GB -o joins
+"""
+
+import argparse
+import csv
+import html
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cardinality import join_distribution, plan_nodes
+from memory_pressure import DEFAULT_CONFIG, load_limits
+from plan_graph import PlanGraph
+from presto_stats import load_stages, parse_data_size, format_data_size, format_rows, read_json
+
+DEFAULT_BUILD_FRACTION = 0.5
+
+BUILD_OPERATORS = ("HashJoinBuild", "HashBuild")
+PROBE_OPERATORS = ("HashJoinProbe", "HashProbe", "LookupJoin")
+
+
+def memory_limits(config_path: Optional[Path], gpu_memory: Optional[float]) -> Dict[str, float]:
+    """Limits a per-task build is checked against: GPU memory and query.max-memory-per-node."""
+    limits = {}
+    if gpu_memory:
+        limits["gpu-memory"] = gpu_memory
+    if config_path is not None and config_path.exists():
+        per_node = load_limits(config_path).get("query.max-memory-per-node")
+        if per_node:
+            limits["query.max-memory-per-node"] = per_node
+    return limits
+
+
+def analyze_joins(query_info: Dict[str, Any], limits: Dict[str, float] = None,
+                  build_fraction: float = DEFAULT_BUILD_FRACTION, name: str = "") -> Dict[str, Any]:
+    """Per join build/probe/output sizes, distribution and build memory against the limits."""
+    limits = limits or {}
+    graph = PlanGraph(query_info)
+    tasks = {stage.stage_id: len(stage.tasks) for stage in load_stages(query_info)}
+    details = {(n["stage"], n["node"]): n for n in plan_nodes(query_info)}
+
+    joins = []
+    for (stage_id, node_id), ops in graph.node_ops.items():
+        builds = [op for op in ops if op.operator_type.endswith(BUILD_OPERATORS)]
+        probes = [op for op in ops if op.operator_type.endswith(PROBE_OPERATORS)]
+        if not builds or not probes:
+            continue
+        plan_node = details.get((stage_id, node_id), {})
+        build_bytes = sum(op.input_bytes for op in builds)
+        probe_rows = sum(op.input_rows for op in probes)
+        output_rows = sum(op.output_rows for op in probes)
+        stage_tasks = tasks.get(stage_id) or 1
+        per_task_bytes = build_bytes / stage_tasks
+        build_memory = max(max(op.peak_total_bytes, op.peak_user_bytes) for op in builds)
+        held = max(per_task_bytes, build_memory)
+        usage = {limit_name: held / limit for limit_name, limit in limits.items() if limit}
+        build_op = min(builds, key=lambda op: (op.pipeline, op.operator_id or 0))
+        probe_op = min(probes, key=lambda op: (op.pipeline, op.operator_id or 0))
+        joins.append({
+            "stage": stage_id,
+            "node": node_id,
+            "name": plan_node.get("name", "Join"),
+            "identifier": plan_node.get("identifier", ""),
+            "distribution": join_distribution(plan_node.get("details", "")) or "N/A",
+            "build_key": build_op.key,
+            "probe_key": probe_op.key,
+            "build_operator": build_op.operator_type,
+            "tasks": stage_tasks,
+            "build_rows": sum(op.input_rows for op in builds),
+            "build_bytes": build_bytes,
+            "build_bytes_per_task": per_task_bytes,
+            "build_memory_bytes": build_memory,
+            "build_held_bytes": held,
+            "probe_rows": probe_rows,
+            "output_rows": output_rows,
+            "expansion": output_rows / probe_rows if probe_rows else None,
+            "usage": usage,
+            "flagged": [limit_name for limit_name, u in usage.items() if u > build_fraction],
+        })
+    joins.sort(key=lambda j: -j["build_held_bytes"])
+    return {
+        "query": name or query_info.get("queryId", ""),
+        "limits": limits,
+        "build_fraction": build_fraction,
+        "joins": joins,
+        "flagged": [j for j in joins if j["flagged"]],
+    }
+
+
+def _anchor(key: tuple, label: str) -> str:
+    stage_id, pipeline_id, operator_id = key
+    return f'<a href="#stage-{stage_id}-p{pipeline_id}-op-{operator_id}">{label}</a>'
+
+
+def _usage(join: Dict[str, Any]) -> str:
+    return ", ".join(f"{u * 100:.0f}% {limit_name}" for limit_name, u in join["usage"].items()) or "N/A"
+
+
+def joins_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    warning = ""
+    if result["flagged"]:
+        items = "".join(f'<li>Stage {j["stage"]} node {html.escape(j["node"])}: '
+                        f'{format_data_size(j["build_held_bytes"])} held by the build ({_usage(j)})</li>'
+                        for j in result["flagged"])
+        warning = (f'<div style="color: #e74c3c;">Build side above {result["build_fraction"] * 100:.0f}% '
+                   f'of a memory limit:<ul>{items}</ul></div>')
+    rows = ""
+    for j in result["joins"]:
+        style = ' style="background-color: #fdecea;"' if j["flagged"] else ""
+        expansion = f'{j["expansion"]:.2f}' if j["expansion"] is not None else "N/A"
+        rows += (f'<tr{style}><td><a href="#stage-{j["stage"]}">Stage {j["stage"]}</a></td>'
+                 f'<td>{html.escape(j["name"])} (node {html.escape(j["node"])}) {html.escape(j["identifier"])}</td>'
+                 f'<td>{html.escape(j["distribution"])}</td>'
+                 f'<td style="text-align: right;">{_anchor(j["build_key"], format_rows(j["build_rows"]))}</td>'
+                 f'<td style="text-align: right;">{format_data_size(j["build_bytes"])}</td>'
+                 f'<td style="text-align: right;">{format_data_size(j["build_bytes_per_task"])}</td>'
+                 f'<td style="text-align: right;">{format_data_size(j["build_memory_bytes"])}</td>'
+                 f'<td style="text-align: right;">{_anchor(j["probe_key"], format_rows(j["probe_rows"]))}</td>'
+                 f'<td style="text-align: right;">{format_rows(j["output_rows"])}</td>'
+                 f'<td style="text-align: right;">{expansion}</td>'
+                 f'<td style="text-align: right;">{_usage(j)}</td></tr>\n')
+    limits = ", ".join(f"{limit_name} {format_data_size(value)}" for limit_name, value in result["limits"].items())
+    return f"""
+            <div class="operator-summary join-shape">
+                <div class="operator-summary-title">Joins: {len(result['joins'])} hash joins,
+                    {len(result['flagged'])} with a build above {result['build_fraction'] * 100:.0f}% of
+                    {limits or 'no configured limit'}</div>
+                {warning}
+                <table class="operator-summary-table">
+                    <thead><tr><th>Stage</th><th>Join</th><th>Distribution</th>
+                        <th style="text-align: right;">Build Rows</th><th style="text-align: right;">Build Bytes</th>
+                        <th style="text-align: right;">Build / Task</th><th style="text-align: right;">Build Peak Mem</th>
+                        <th style="text-align: right;">Probe Rows</th><th style="text-align: right;">Output Rows</th>
+                        <th style="text-align: right;">Expansion</th><th style="text-align: right;">Of Limit</th></tr></thead>
+                    <tbody>
+{rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_joins_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "stage", "plan_node_id", "distribution", "tasks", "build_rows", "build_bytes",
+                         "build_bytes_per_task", "build_memory_bytes", "probe_rows", "output_rows", "expansion",
+                         "flagged"])
+        for r in results:
+            for j in r["joins"]:
+                writer.writerow([r["query"], j["stage"], j["node"], j["distribution"], j["tasks"], j["build_rows"],
+                                 j["build_bytes"], f"{j['build_bytes_per_task']:.0f}", j["build_memory_bytes"],
+                                 j["probe_rows"], j["output_rows"],
+                                 "" if j["expansion"] is None else f"{j['expansion']:.4f}",
+                                 ";".join(j["flagged"])])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per join build/probe sizes, distribution and build memory against GPU and query memory",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s query.json --gpu-memory 80GB
+  %(prog)s query_infos/ --gpu-memory 40GB --build-fraction 0.25 -o joins
+  %(prog)s query_infos/ --config ../configs/worker_configs/
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("--gpu-memory", help="GPU memory per worker, e.g. 80GB")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG),
+                        help="Worker config.properties, or a directory of generated worker configs "
+                             "(default: configs/templates/config.properties.template)")
+    parser.add_argument("--build-fraction", type=float, default=DEFAULT_BUILD_FRACTION,
+                        help=f"Flag builds above this fraction of a limit (default: {DEFAULT_BUILD_FRACTION})")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_joins.csv")
+    args = parser.parse_args()
+
+    gpu_memory = parse_data_size(args.gpu_memory) if args.gpu_memory else None
+    if args.gpu_memory and gpu_memory is None:
+        parser.error(f"invalid --gpu-memory {args.gpu_memory!r}, expected a size such as 80GB")
+    limits = memory_limits(Path(args.config), gpu_memory)
+
+    results = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                query_info = read_json(json_path)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+                continue
+            if "queryStats" not in query_info:
+                print(f"✗ Skipping {json_path}: not a query info (no queryStats)", file=sys.stderr)
+                continue
+            results.append(analyze_joins(query_info, limits, args.build_fraction, json_path.stem))
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'Query':<28} {'Stage':>5} {'Node':>6} {'Distribution':<12} {'Build rows':>10} {'Build/task':>10} "
+          f"{'Build mem':>10} {'Probe rows':>10} {'Output':>10} {'Expand':>7}")
+    for r in results:
+        for j in r["joins"]:
+            expansion = f"{j['expansion']:.2f}" if j["expansion"] is not None else "N/A"
+            flag = f"  <-- {_usage(j)}" if j["flagged"] else ""
+            print(f"{r['query'][:28]:<28} {str(j['stage']):>5} {j['node']:>6} {j['distribution'][:12]:<12} "
+                  f"{format_rows(j['build_rows']):>10} {format_data_size(j['build_bytes_per_task']):>10} "
+                  f"{format_data_size(j['build_memory_bytes']):>10} "
+                  f"{format_rows(j['probe_rows']):>10} {format_rows(j['output_rows']):>10} {expansion:>7}{flag}")
+
+    flagged = sum(len(r["flagged"]) for r in results)
+    print(f"\n{flagged} joins with a build above {args.build_fraction * 100:.0f}% of "
+          + (", ".join(f"{n} {format_data_size(v)}" for n, v in limits.items()) or "no configured limit"))
+
+    if args.output_prefix:
+        write_joins_csv(results, Path(f"{args.output_prefix}_joins.csv"))
+        print(f"✓ Wrote {args.output_prefix}_joins.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
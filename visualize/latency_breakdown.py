@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Latency waterfall of Presto queries: where a short query's elapsed time goes.
+
+At small scale factors a query runs in under a second and fixed coordinator
+overheads weigh as much as the kernels. This module splits the elapsed time
+(createTime to endTime) into consecutive phases:
+
+- queued:      queuedTime plus resourceWaitingTime,
+- planning:    end of queueing to the first task being created (dispatching,
+               analysis, planning and fragmenting; analysisTime and
+               totalPlanningTime are kept alongside for reference),
+- scheduling:  first task created to first task started,
+- execution:   first task started to the last pipeline of any task ending,
+- client fetch: last pipeline end to the output stage's tasks ending, i.e.
+               the output buffer being drained by the coordinator and client,
+- finishing:   output stage done to the query's endTime (commit, cleanup).
+
+Without task timestamps (basic query info) the phases fall back to the
+query-level durations; what cannot be placed is reported as "other".
+Everything but execution is counted as coordinator overhead.
+
+Used by query_plan_visualize.py --latency; over a suite:
+
+    python latency_breakdown.py query_metrics/ -o latency
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import format_time, load_query_info, read_json
+
+PHASES = ["queued", "planning", "scheduling", "execution", "client_fetch", "finishing", "other"]
+
+PHASE_LABELS = {
+    "queued": "Queued",
+    "planning": "Analysis / Planning",
+    "scheduling": "Scheduling",
+    "execution": "Execution",
+    "client_fetch": "Client Fetch",
+    "finishing": "Finishing",
+    "other": "Other",
+}
+
+PHASE_COLORS = {
+    "queued": "#95a5a6",
+    "planning": "#9b59b6",
+    "scheduling": "#f39c12",
+    "execution": "#27ae60",
+    "client_fetch": "#3498db",
+    "finishing": "#e67e22",
+    "other": "#bdc3c7",
+}
+
+
+def latency_breakdown(query_info: Dict[str, Any], name: str = "") -> Dict[str, Any]:
+    """Phase durations in ns for one query info; they add up to the elapsed time."""
+    query = load_query_info(query_info)
+    queued_ns = query.queued_ns + query.resource_waiting_ns
+    finishing_ns = query.finishing_ns
+    elapsed_ns = query.elapsed_ns
+    if query.create is not None and query.end is not None:
+        elapsed_ns = max((query.end - query.create) * 1e9, 0.0)
+
+    tasks = query.tasks()
+    creates = [t.create for t in tasks if t.create is not None]
+    starts = [t.first_start for t in tasks if t.first_start is not None]
+    last_ends = [t.last_end if t.last_end is not None else t.end for t in tasks]
+    last_ends = [t for t in last_ends if t is not None]
+    output_tasks = query.stages[0].tasks if query.stages else []
+    output_ends = [t.end if t.end is not None else t.last_end for t in output_tasks]
+    output_ends = [t for t in output_ends if t is not None]
+
+    phases = dict.fromkeys(PHASES, 0.0)
+    timed = query.create is not None and query.end is not None and creates and starts and last_ends
+    if timed:
+        # Consecutive boundaries in seconds since createTime, clamped to be non-decreasing and within elapsed
+        end = elapsed_ns / 1e9
+        bounds = [min(queued_ns / 1e9, end)]
+        for t in (min(creates), min(starts), max(last_ends), max(output_ends, default=max(last_ends))):
+            bounds.append(min(max(t - query.create, bounds[-1]), end))
+        bounds.append(end)
+        phases["queued"] = bounds[0] * 1e9
+        for phase, (lo, hi) in zip(["planning", "scheduling", "execution", "client_fetch", "finishing"],
+                                   zip(bounds, bounds[1:])):
+            phases[phase] = (hi - lo) * 1e9
+    else:
+        planning_ns = query.dispatching_ns + query.planning_ns
+        phases["queued"] = queued_ns
+        phases["planning"] = planning_ns
+        phases["finishing"] = finishing_ns
+        phases["execution"] = max(query.execution_ns - query.planning_ns - finishing_ns, 0.0)
+        phases["other"] = max(elapsed_ns - sum(phases.values()), 0.0)
+        elapsed_ns = max(elapsed_ns, sum(phases.values()))
+
+    overhead_ns = sum(ns for phase, ns in phases.items() if phase != "execution")
+    return {
+        "query": name or query.query_id,
+        "query_id": query.query_id,
+        "timed": bool(timed),
+        "elapsed_ns": elapsed_ns,
+        "phases": phases,
+        "overhead_ns": overhead_ns,
+        "overhead_share": overhead_ns / elapsed_ns if elapsed_ns else 0.0,
+        "analysis_ns": query.analysis_ns,
+        "planning_ns": query.planning_ns,
+    }
+
+
+def aggregate_breakdowns(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Suite totals per phase and the share of the suite's elapsed time each takes."""
+    totals = {phase: sum(r["phases"][phase] for r in results) for phase in PHASES}
+    elapsed_ns = sum(r["elapsed_ns"] for r in results)
+    overhead_ns = sum(r["overhead_ns"] for r in results)
+    return {
+        "queries": len(results),
+        "elapsed_ns": elapsed_ns,
+        "phases": totals,
+        "shares": {phase: ns / elapsed_ns if elapsed_ns else 0.0 for phase, ns in totals.items()},
+        "overhead_ns": overhead_ns,
+        "overhead_share": overhead_ns / elapsed_ns if elapsed_ns else 0.0,
+    }
+
+
+def _waterfall_bar(phases: Dict[str, float], elapsed_ns: float) -> str:
+    spans = ""
+    for phase in PHASES:
+        ns = phases[phase]
+        if ns <= 0 or not elapsed_ns:
+            continue
+        spans += (f'<span title="{PHASE_LABELS[phase]}: {format_time(ns)}" style="display: inline-block; '
+                  f'height: 12px; width: {ns / elapsed_ns * 100:.2f}%; background: {PHASE_COLORS[phase]};"></span>')
+    return f'<div style="width: 400px; white-space: nowrap; font-size: 0;">{spans}</div>'
+
+
+def latency_html(result: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    rows = ""
+    for phase in PHASES:
+        ns = result["phases"][phase]
+        if phase == "other" and not ns:
+            continue
+        share = ns / result["elapsed_ns"] * 100 if result["elapsed_ns"] else 0.0
+        rows += (f'<tr><td><span style="color: {PHASE_COLORS[phase]};">&#9632;</span> {PHASE_LABELS[phase]}</td>'
+                 f'<td style="text-align: right;">{format_time(ns)}</td>'
+                 f'<td style="text-align: right;">{share:.1f}%</td></tr>\n')
+    source = "task timestamps" if result["timed"] else "query-level durations (no task timestamps)"
+    return f"""
+            <div class="operator-summary latency-breakdown">
+                <div class="operator-summary-title">Latency Breakdown ({format_time(result['elapsed_ns'])} elapsed,
+                    {result['overhead_share'] * 100:.0f}% outside execution; from {source})</div>
+                {_waterfall_bar(result['phases'], result['elapsed_ns'])}
+                <table class="operator-summary-table">
+                    <thead><tr><th>Phase</th><th style="text-align: right;">Time</th>
+                        <th style="text-align: right;">Share</th></tr></thead>
+                    <tbody>
+{rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_latency_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "query_id", "elapsed_ms"] + [f"{phase}_ms" for phase in PHASES]
+                        + ["overhead_share", "analysis_time_ms", "total_planning_time_ms", "timed"])
+        for r in results:
+            writer.writerow([r["query"], r["query_id"], f"{r['elapsed_ns'] / 1e6:.3f}"]
+                            + [f"{r['phases'][phase] / 1e6:.3f}" for phase in PHASES]
+                            + [f"{r['overhead_share']:.4f}", f"{r['analysis_ns'] / 1e6:.3f}",
+                               f"{r['planning_ns'] / 1e6:.3f}", int(r["timed"])])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-query latency waterfall (queued, planning, scheduling, execution, fetch, finishing)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s query.json
+  %(prog)s query_metrics/ -o latency
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_latency.csv")
+    args = parser.parse_args()
+
+    results = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                query_info = read_json(json_path)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+                continue
+            if "queryStats" not in query_info:
+                print(f"✗ Skipping {json_path}: not a query info (no queryStats)", file=sys.stderr)
+                continue
+            results.append(latency_breakdown(query_info, json_path.stem))
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    short = {"queued": "Queued", "planning": "Planning", "scheduling": "Sched", "execution": "Exec",
+             "client_fetch": "Fetch", "finishing": "Finish", "other": "Other"}
+    print(f"{'Query':<32} {'Elapsed':>10}" + "".join(f" {short[p]:>10}" for p in PHASES) + f" {'Overhead':>8}")
+    for r in sorted(results, key=lambda r: -r["overhead_share"]):
+        print(f"{r['query'][:32]:<32} {format_time(r['elapsed_ns']):>10}"
+              + "".join(f" {format_time(r['phases'][p]):>10}" for p in PHASES)
+              + f" {r['overhead_share'] * 100:>7.0f}%{'' if r['timed'] else '  (no task times)'}")
+
+    suite = aggregate_breakdowns(results)
+    print(f"\nSuite ({suite['queries']} queries, {format_time(suite['elapsed_ns'])} elapsed): "
+          + ", ".join(f"{short[p].lower()} {suite['shares'][p] * 100:.1f}%" for p in PHASES if suite["phases"][p]))
+    print(f"{suite['overhead_share'] * 100:.1f}% of the suite's elapsed time is outside execution")
+
+    if args.output_prefix:
+        write_latency_csv(results, Path(f"{args.output_prefix}_latency.csv"))
+        print(f"✓ Wrote {args.output_prefix}_latency.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
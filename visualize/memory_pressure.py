@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Memory pressure of Presto queries against the configured worker limits.
+
+The visualizer's stage boxes show only the current userMemoryReservationInBytes,
+which is 0 once a query has finished. This module reports the peaks instead:
+
+- per stage:    peak user memory and peak node total memory, spilled bytes,
+- per operator: peak user/system/total reservation and spilled bytes,
+- per node:     summed task peak user/total memory of this query and the
+                node-wide peak total memory seen by its tasks,
+
+and compares the node peaks with the worker limits read from config.properties
+(configs/templates/config.properties.template by default):
+
+- query.max-memory-per-node   vs the node's peak user memory for this query,
+- query-memory-gb             vs the node's peak total memory,
+- system-memory-gb minus memory.heap-headroom-per-node (reported as
+  system-memory-minus-headroom) vs the same.
+
+A query is flagged when any peak is within --margin percent of its limit, so
+queries that will OOM at the next scale factor show up before they do.
+
+Used by query_plan_visualize.py --memory; over a suite:
+
+    python memory_pressure.py query_infos/ --config ../configs/templates/config.properties.template -o memory
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import load_query_info, parse_data_size, format_data_size, read_json
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "configs" / "templates" / "config.properties.template"
+DEFAULT_MARGIN = 20.0
+
+GB = 1024 ** 3
+
+# Derived limit: system-memory-gb less memory.heap-headroom-per-node
+SYSTEM_MINUS_HEADROOM = "system-memory-minus-headroom"
+
+# limit name -> (node peak it bounds, description)
+LIMIT_CHECKS = [
+    ("query.max-memory-per-node", "user_bytes", "query user memory per node"),
+    ("query-memory-gb", "node_total_bytes", "query memory pool"),
+    (SYSTEM_MINUS_HEADROOM, "node_total_bytes", "system memory minus heap headroom"),
+]
+
+
+def load_limits(config_path: Path) -> Dict[str, float]:
+    """
+    Memory limits in bytes from a config.properties file, or the tightest of
+    each limit over all config.properties below a directory of worker configs.
+    Configured values keep their property names; the system memory left after
+    the heap headroom is added as SYSTEM_MINUS_HEADROOM.
+    """
+    files = sorted(config_path.rglob("config.properties")) if config_path.is_dir() else [config_path]
+    limits = {}
+    for path in files:
+        props = {}
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#") and "=" in line:
+                    key, value = line.split("=", 1)
+                    props[key.strip()] = value.strip()
+        values = {}
+        for key in ("system-memory-gb", "query-memory-gb"):
+            if key in props:
+                try:
+                    values[key] = float(props[key]) * GB
+                except ValueError:
+                    pass
+        for key in ("query.max-memory-per-node", "memory.heap-headroom-per-node"):
+            size = parse_data_size(props.get(key, ""))
+            if size is not None:
+                values[key] = size
+        if "system-memory-gb" in values:
+            values[SYSTEM_MINUS_HEADROOM] = values["system-memory-gb"] - values.get("memory.heap-headroom-per-node", 0)
+        for key, value in values.items():
+            limits[key] = min(limits.get(key, value), value)
+    return limits
+
+
+def analyze_memory(query_info: Dict[str, Any], limits: Dict[str, float],
+                   margin: float = DEFAULT_MARGIN, name: str = "") -> Dict[str, Any]:
+    """Peak memory per stage, operator and node, and the limits each node comes close to."""
+    query = load_query_info(query_info)
+    stage_spill = {}
+    operators = []
+    for op in query.operators:
+        stage_spill[op.stage] = stage_spill.get(op.stage, 0) + op.spilled_bytes
+        operators.append({
+            "key": op.key,
+            "operator": op.operator_type,
+            "user_bytes": op.peak_user_bytes,
+            "system_bytes": op.peak_system_bytes,
+            "total_bytes": op.peak_total_bytes,
+            "spilled_bytes": op.spilled_bytes,
+        })
+    operators.sort(key=lambda o: -max(o["total_bytes"], o["user_bytes"]))
+
+    stages = []
+    nodes = {}
+    for stage in query.stages:
+        stages.append({
+            "stage": stage.stage_id,
+            "user_bytes": stage.stats.get("peakUserMemoryReservationInBytes", 0) or 0,
+            "node_total_bytes": stage.stats.get("peakNodeTotalMemoryReservationInBytes", 0) or 0,
+            "spilled_bytes": stage_spill.get(stage.stage_id, 0),
+        })
+        for task in stage.tasks:
+            node = nodes.setdefault(task.node, {"node": task.node, "tasks": 0, "user_bytes": 0,
+                                                "total_bytes": 0, "node_total_bytes": 0})
+            node["tasks"] += 1
+            node["user_bytes"] += task.peak_user_bytes
+            node["total_bytes"] += task.peak_total_bytes
+            node["node_total_bytes"] = max(node["node_total_bytes"], task.peak_node_total_bytes)
+    stages.sort(key=lambda s: (0, s["stage"]) if isinstance(s["stage"], int) else (1, str(s["stage"])))
+
+    if not nodes:
+        # No task list: fall back to the query-level node peak
+        nodes["(query)"] = {"node": "(query)", "tasks": 0, "user_bytes": 0, "total_bytes": 0,
+                            "node_total_bytes": query.peak_node_total_bytes}
+
+    warnings = []
+    for node in nodes.values():
+        node["usage"] = {}
+        for limit_name, field, description in LIMIT_CHECKS:
+            limit = limits.get(limit_name)
+            if not limit or not node[field]:
+                continue
+            usage = node[field] / limit
+            node["usage"][limit_name] = usage
+            if usage >= 1 - margin / 100:
+                warnings.append({"node": node["node"], "limit": limit_name, "description": description,
+                                 "peak_bytes": node[field], "limit_bytes": limit, "usage": usage})
+    warnings.sort(key=lambda w: -w["usage"])
+
+    return {
+        "query": name or query.query_id,
+        "peak_user_bytes": query.peak_user_bytes,
+        "peak_total_bytes": query.peak_total_bytes,
+        "peak_node_total_bytes": max((n["node_total_bytes"] for n in nodes.values()), default=0),
+        "spilled_bytes": query.spilled_bytes or sum(stage_spill.values()),
+        "max_usage": max((u for n in nodes.values() for u in n["usage"].values()), default=0.0),
+        "stages": stages,
+        "operators": operators,
+        "nodes": sorted(nodes.values(), key=lambda n: n["node"]),
+        "warnings": warnings,
+        "margin": margin,
+    }
+
+
+def _usage(node: Dict[str, Any], limit_name: str) -> str:
+    usage = node["usage"].get(limit_name)
+    return f"{usage * 100:.0f}%" if usage is not None else "N/A"
+
+
+def memory_html(result: Dict[str, Any], top: int = 10) -> str:
+    """Summary section for the visualizer header."""
+    warning = ""
+    if result["warnings"]:
+        items = "".join(f'<li>{w["node"]}: {format_data_size(w["peak_bytes"])} of {format_data_size(w["limit_bytes"])} '
+                        f'{w["limit"]} ({w["usage"] * 100:.0f}%)</li>' for w in result["warnings"])
+        warning = f'<div style="color: #e74c3c;">Within {result["margin"]:.0f}% of a limit:<ul>{items}</ul></div>'
+    node_rows = ""
+    for n in result["nodes"]:
+        node_rows += (f'<tr><td>{n["node"]}</td><td style="text-align: center;">{n["tasks"]}</td>'
+                      f'<td style="text-align: right;">{format_data_size(n["user_bytes"])}</td>'
+                      f'<td style="text-align: right;">{format_data_size(n["total_bytes"])}</td>'
+                      f'<td style="text-align: right;">{format_data_size(n["node_total_bytes"])}</td>'
+                      + "".join(f'<td style="text-align: right;">{_usage(n, name)}</td>' for name, _, _ in LIMIT_CHECKS)
+                      + '</tr>\n')
+    stage_rows = ""
+    for s in result["stages"]:
+        stage_rows += (f'<tr><td><a href="#stage-{s["stage"]}">Stage {s["stage"]}</a></td>'
+                       f'<td style="text-align: right;">{format_data_size(s["user_bytes"])}</td>'
+                       f'<td style="text-align: right;">{format_data_size(s["node_total_bytes"])}</td>'
+                       f'<td style="text-align: right;">{format_data_size(s["spilled_bytes"])}</td></tr>\n')
+    operator_rows = ""
+    for o in result["operators"][:top]:
+        stage_id, pipeline_id, operator_id = o["key"]
+        operator_rows += (f'<tr><td><a href="#stage-{stage_id}-p{pipeline_id}-op-{operator_id}">{o["operator"]}</a> '
+                          f'[{stage_id}, {pipeline_id}, {operator_id}]</td>'
+                          f'<td style="text-align: right;">{format_data_size(o["user_bytes"])}</td>'
+                          f'<td style="text-align: right;">{format_data_size(o["system_bytes"])}</td>'
+                          f'<td style="text-align: right;">{format_data_size(o["total_bytes"])}</td>'
+                          f'<td style="text-align: right;">{format_data_size(o["spilled_bytes"])}</td></tr>\n')
+    limit_headers = "".join(f'<th style="text-align: right;">% {name}</th>' for name, _, _ in LIMIT_CHECKS)
+    return f"""
+            <div class="operator-summary memory-pressure">
+                <div class="operator-summary-title">Memory Pressure: peak user {format_data_size(result['peak_user_bytes'])},
+                    peak node total {format_data_size(result['peak_node_total_bytes'])},
+                    spilled {format_data_size(result['spilled_bytes'])}</div>
+                {warning}
+                <table class="operator-summary-table">
+                    <thead><tr><th>Node</th><th style="text-align: center;">Tasks</th>
+                        <th style="text-align: right;">Peak User</th><th style="text-align: right;">Peak Total</th>
+                        <th style="text-align: right;">Node Peak Total</th>{limit_headers}</tr></thead>
+                    <tbody>
+{node_rows}                    </tbody>
+                </table>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Stage</th><th style="text-align: right;">Peak User</th>
+                        <th style="text-align: right;">Peak Node Total</th><th style="text-align: right;">Spilled</th></tr></thead>
+                    <tbody>
+{stage_rows}                    </tbody>
+                </table>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Operator (top {top} by peak memory)</th><th style="text-align: right;">Peak User</th>
+                        <th style="text-align: right;">Peak System</th><th style="text-align: right;">Peak Total</th>
+                        <th style="text-align: right;">Spilled</th></tr></thead>
+                    <tbody>
+{operator_rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_nodes_csv(results: List[Dict[str, Any]], output_path: Path) -> None:
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["query", "node", "tasks", "peak_user_bytes", "peak_total_bytes", "node_peak_total_bytes"]
+                        + [f"usage_{name}" for name, _, _ in LIMIT_CHECKS] + ["flagged"])
+        for r in results:
+            flagged = {w["node"] for w in r["warnings"]}
+            for n in r["nodes"]:
+                writer.writerow([r["query"], n["node"], n["tasks"], n["user_bytes"], n["total_bytes"],
+                                 n["node_total_bytes"]]
+                                + [f"{n['usage'][name]:.4f}" if name in n["usage"] else "" for name, _, _ in LIMIT_CHECKS]
+                                + ["yes" if n["node"] in flagged else "no"])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory per stage, operator and node against the configured worker memory limits",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s query.json
+  %(prog)s query_infos/ --margin 10 -o memory
+  %(prog)s query_infos/ --config worker_configs/
+        """
+    )
+    parser.add_argument("inputs", nargs="+", help="Query info JSON files or directories of them")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG),
+                        help="Worker config.properties, or a directory of generated worker configs "
+                             "(default: configs/templates/config.properties.template)")
+    parser.add_argument("--margin", type=float, default=DEFAULT_MARGIN,
+                        help=f"Flag peaks within this percentage of a limit (default: {DEFAULT_MARGIN:.0f})")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_nodes.csv")
+    args = parser.parse_args()
+
+    limits = load_limits(Path(args.config))
+    if not limits:
+        print(f"ERROR: no memory limits found in {args.config}", file=sys.stderr)
+        sys.exit(1)
+    print("Limits: " + ", ".join(f"{name}={format_data_size(value)}" for name, value in sorted(limits.items())),
+          file=sys.stderr)
+
+    results = []
+    for item in args.inputs:
+        path = Path(item)
+        for json_path in (sorted(path.glob("*.json")) if path.is_dir() else [path]):
+            try:
+                query_info = read_json(json_path)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {json_path}: {e}", file=sys.stderr)
+                continue
+            if "queryStats" not in query_info:
+                print(f"✗ Skipping {json_path}: not a query info (no queryStats)", file=sys.stderr)
+                continue
+            results.append(analyze_memory(query_info, limits, args.margin, json_path.stem))
+    if not results:
+        print("ERROR: no query infos loaded", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'Query':<40} {'Peak user':>10} {'Node total':>10} {'Spilled':>10} {'Max usage':>9}")
+    for r in sorted(results, key=lambda r: -r["max_usage"]):
+        flag = "  <-- near limit" if r["warnings"] else ""
+        print(f"{r['query'][:40]:<40} {format_data_size(r['peak_user_bytes']):>10} "
+              f"{format_data_size(r['peak_node_total_bytes']):>10} {format_data_size(r['spilled_bytes']):>10} "
+              f"{r['max_usage'] * 100:>8.0f}%{flag}")
+        for w in r["warnings"]:
+            print(f"      {w['node']}: {format_data_size(w['peak_bytes'])} of {format_data_size(w['limit_bytes'])} "
+                  f"{w['limit']} ({w['description']})")
+
+    flagged = sum(1 for r in results if r["warnings"])
+    print(f"\n{flagged} of {len(results)} queries within {args.margin:.0f}% of a memory limit")
+
+    if args.output_prefix:
+        write_nodes_csv(results, Path(f"{args.output_prefix}_nodes.csv"))
+        print(f"✓ Wrote {args.output_prefix}_nodes.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Columnar warehouse of operator statistics across all captured query infos.
+
+Every operator summary normally sits in its own query JSON, which makes
+questions like "how did CudfHashJoinProbe wall time in Q9 evolve across the
+last 20 runs" a scripting exercise. This module flattens
+queryStats.operatorSummaries from any number of query infos into a Parquet
+dataset partitioned by query name:
+
+    <warehouse>/query=Q9/<queryId>.parquet
+    <warehouse>/_manifest.json
+
+Each row carries query_id, query (Q9, from the "-- TPCH Q9" header or the
+file name), source file, run start time, sf (session schema or file name),
+workers (distinct task nodes), stage, pipeline, operator id/type, plan node
+and every numeric statistic: plain numbers as-is, Duration strings as
+<field>_ns, DataSize strings as <field>_bytes, runtimeStats sums as rt_<name>,
+plus the active/blocked/finish wall breakdown.
+
+Appends are incremental: the manifest records each source's mtime and size,
+so re-running ingest only flattens new or changed query infos, each into its
+own Parquet file.
+
+pyarrow is needed to write or read the dataset and is imported lazily
+(pip install pyarrow); flattening itself has no extra dependencies.
+
+Usage:
+    python operator_warehouse.py ingest query_infos/ --warehouse ../results/operator_stats
+    python operator_warehouse.py history --warehouse ../results/operator_stats \\
+        --query Q9 --operator CudfHashJoinProbe --metric active_wall_ns --last 20
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Iterable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from exchange_throughput import count_workers
+from presto_stats import (
+    OperatorStats, WALL_COMPONENTS, load_operators, parse_duration, parse_data_size, read_json, parse_timestamp,
+    format_time, plan_fingerprint,
+)
+
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+
+_QUERY_NAME_RE = re.compile(r'--\s*(?:TPC-?H\s+)?Q(?:uery)?\s*0*(\d+)', re.IGNORECASE)
+_FILE_QUERY_RE = re.compile(r'(?:^|[_-])q(?:uery)?_?0*(\d{1,2})(?=[_.-]|$)', re.IGNORECASE)
+_SF_RE = re.compile(r'(?:^|[_-])sf(\d+)(k?)(?=[_-]|$)', re.IGNORECASE)
+
+KEY_COLUMNS = ["query_id", "query", "source", "run_start", "sf", "workers",
+               "stage", "pipeline", "operator_id", "operator_type", "plan_node_id"]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.compute
+    except ImportError:
+        print("ERROR: pyarrow is required for the operator warehouse (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+    return pyarrow
+
+
+def query_name(query_info: Dict[str, Any], source: Path) -> str:
+    """'Q9' from the query text header or the file name, else the file stem."""
+    match = _QUERY_NAME_RE.search(query_info.get("query", "") or "") or _FILE_QUERY_RE.search(source.stem)
+    return f"Q{int(match.group(1))}" if match else source.stem
+
+
+def scale_factor(query_info: Dict[str, Any], source: Path):
+    """SF from the session schema (sf1000_nvidia) or the file name."""
+    for label in (query_info.get("session", {}).get("schema", ""), source.stem):
+        match = _SF_RE.search(label or "")
+        if match:
+            return int(match.group(1)) * (1000 if match.group(2) else 1)
+    return None
+
+
+def flatten_operator(op: OperatorStats) -> Dict[str, Any]:
+    """Numeric statistics of one operator summary in base units (ns, bytes)."""
+    row = {}
+    for key, value in op.raw.items():
+        if key in ("stageId", "pipelineId", "operatorId", "planNodeId", "operatorType", "stageExecutionId"):
+            continue
+        if isinstance(value, bool):
+            row[key] = int(value)
+        elif isinstance(value, (int, float)):
+            row[key] = value
+        elif isinstance(value, str):
+            duration = parse_duration(value)
+            if duration is not None:
+                row[f"{key}_ns"] = duration
+            else:
+                size = parse_data_size(value)
+                if size is not None:
+                    row[f"{key}_bytes"] = size
+    for name, metric in (op.raw.get("runtimeStats") or {}).items():
+        if isinstance(metric, dict) and isinstance(metric.get("sum"), (int, float)):
+            row[f"rt_{name}"] = metric["sum"]
+    breakdown = op.wall_breakdown()
+    for component in WALL_COMPONENTS:
+        row[f"{component}_wall_ns"] = breakdown[component]
+    return row
+
+
+def flatten_query_info(query_info: Dict[str, Any], source: Path) -> List[Dict[str, Any]]:
+    """One row per operator summary with the query-level key columns."""
+    query_stats = query_info.get("queryStats", {})
+    start = parse_timestamp(query_stats.get("createTime"))
+    common = {
+        "query_id": query_info.get("queryId", source.stem),
+        "query": query_name(query_info, source),
+        "source": str(source),
+        "run_start": start,
+        "sf": scale_factor(query_info, source),
+        "workers": count_workers(query_info) or None,
+        "plan_fingerprint": plan_fingerprint(query_info) or None,
+    }
+    rows = []
+    for op in load_operators(query_info):
+        row = dict(common,
+                   stage=op.stage,
+                   pipeline=op.pipeline,
+                   operator_id=op.operator_id,
+                   operator_type=op.operator_type,
+                   plan_node_id=op.plan_node_id)
+        row.update(flatten_operator(op))
+        rows.append(row)
+    return rows
+
+
+def _partition_dir(name: str) -> str:
+    return "query=" + re.sub(r'[^A-Za-z0-9_.-]', "_", name)
+
+
+class OperatorWarehouse:
+    """A partitioned Parquet dataset of operator statistics plus its ingest manifest."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.manifest_path = self.path / MANIFEST_NAME
+        self.manifest = {"version": MANIFEST_VERSION, "sources": {}}
+        if self.manifest_path.exists():
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.manifest = manifest
+
+    def ingest(self, inputs: Iterable) -> Dict[str, int]:
+        """Flatten new or changed query infos; returns counts of added, skipped and failed files."""
+        pa = _require_pyarrow()
+        import pyarrow.parquet as pq
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        counts = {"added": 0, "skipped": 0, "failed": 0}
+        for source in _expand(inputs):
+            key = str(source.resolve())
+            stat = source.stat()
+            entry = self.manifest["sources"].get(key)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                counts["skipped"] += 1
+                continue
+            try:
+                query_info = read_json(source)
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"✗ Skipping {source}: {e}", file=sys.stderr)
+                counts["failed"] += 1
+                continue
+            rows = flatten_query_info(query_info, source)
+            if not rows:
+                print(f"✗ Skipping {source}: no operatorSummaries", file=sys.stderr)
+                counts["failed"] += 1
+                continue
+
+            partition = self.path / _partition_dir(rows[0]["query"])
+            partition.mkdir(exist_ok=True)
+            file_name = re.sub(r'[^A-Za-z0-9_.-]', "_", rows[0]["query_id"]) + ".parquet"
+            if entry and entry.get("file") and entry["file"] != str(Path(partition.name) / file_name):
+                stale = self.path / entry["file"]
+                if stale.exists():
+                    stale.unlink()
+            pq.write_table(pa.Table.from_pylist(rows), partition / file_name)
+            self.manifest["sources"][key] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "query_id": rows[0]["query_id"],
+                "file": str(Path(partition.name) / file_name),
+            }
+            counts["added"] += 1
+
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        return counts
+
+    def read(self, query: str = None, operator: str = None, columns: List[str] = None):
+        """
+        Load rows as a pyarrow Table, optionally restricted to one query
+        partition, one operator type and a subset of columns (key columns are
+        always kept). Files written with different stat sets are unified.
+        """
+        pa = _require_pyarrow()
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        pattern = f"{_partition_dir(query)}/*.parquet" if query else "query=*/*.parquet"
+        wanted = None if columns is None else list(dict.fromkeys(KEY_COLUMNS + list(columns)))
+        tables = []
+        for file in sorted(self.path.glob(pattern)):
+            table = pq.read_table(file)
+            if wanted is not None:
+                table = table.select([c for c in wanted if c in table.column_names])
+            tables.append(table)
+        if not tables:
+            return pa.table({c: [] for c in KEY_COLUMNS})
+        try:
+            table = pa.concat_tables(tables, promote_options="default")
+        except TypeError:
+            table = pa.concat_tables(tables, promote=True)
+        if operator:
+            table = table.filter(pc.equal(table["operator_type"], operator))
+        return table
+
+    def history(self, query: str, operator: str, metric: str = "active_wall_ns", last: int = 20) -> List[Dict[str, Any]]:
+        """
+        Per-run totals of one metric for one operator type in one query, oldest
+        first, limited to the last N runs.
+        """
+        table = self.read(query=query, operator=operator, columns=[metric, "plan_fingerprint"])
+        if metric not in table.column_names:
+            return []
+        runs = {}
+        for row in table.to_pylist():
+            run = runs.setdefault(row["query_id"], {"query_id": row["query_id"], "run_start": row["run_start"],
+                                                    "source": row["source"], "operators": 0, metric: 0.0,
+                                                    "plan": row.get("plan_fingerprint")})
+            run["operators"] += 1
+            run[metric] += row[metric] or 0
+        ordered = sorted(runs.values(), key=lambda r: (r["run_start"] or 0, r["query_id"]))
+        return ordered[-last:] if last else ordered
+
+
+def _expand(inputs: Iterable) -> List[Path]:
+    paths = []
+    for item in inputs:
+        path = Path(item)
+        paths.extend(sorted(path.rglob("*.json")) if path.is_dir() else [path])
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Columnar operator-statistics warehouse over captured query infos",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ingest query_infos/ --warehouse ../results/operator_stats
+  %(prog)s history --warehouse ../results/operator_stats --query Q9 --operator CudfHashJoinProbe
+  %(prog)s history --warehouse ../results/operator_stats --query Q9 --operator CudfHashJoinProbe \\
+      --metric getOutputWall_ns --last 20
+        """
+    )
+    parser.add_argument("command", choices=["ingest", "history", "operators"])
+    parser.add_argument("inputs", nargs="*", help="ingest: query info JSON files or directories")
+    parser.add_argument("--warehouse", required=True, help="Dataset directory")
+    parser.add_argument("--query", help="Query name, e.g. Q9")
+    parser.add_argument("--operator", help="Operator type, e.g. CudfHashJoinProbe")
+    parser.add_argument("--metric", default="active_wall_ns", help="Column to report (default: active_wall_ns)")
+    parser.add_argument("--last", type=int, default=20, help="Number of most recent runs (default: 20)")
+    args = parser.parse_args()
+
+    warehouse = OperatorWarehouse(args.warehouse)
+
+    if args.command == "ingest":
+        if not args.inputs:
+            parser.error("ingest needs query info files or directories")
+        counts = warehouse.ingest(args.inputs)
+        print(f"✓ Ingested {counts['added']} query infos ({counts['skipped']} unchanged, "
+              f"{counts['failed']} failed) into {args.warehouse}", file=sys.stderr)
+    elif args.command == "operators":
+        table = warehouse.read(query=args.query, columns=["active_wall_ns"])
+        totals = {}
+        for row in table.to_pylist():
+            totals[row["operator_type"]] = totals.get(row["operator_type"], 0.0) + (row.get("active_wall_ns") or 0)
+        for name, ns in sorted(totals.items(), key=lambda kv: -kv[1]):
+            print(f"{name:<32} {format_time(ns):>12}")
+    else:
+        if not args.query or not args.operator:
+            parser.error("history needs --query and --operator")
+        runs = warehouse.history(args.query, args.operator, args.metric, args.last)
+        if not runs:
+            print(f"No {args.operator} rows with '{args.metric}' for {args.query}", file=sys.stderr)
+            sys.exit(1)
+        is_time = args.metric.endswith("_ns")
+        for run in runs:
+            value = format_time(run[args.metric]) if is_time else f"{run[args.metric]:.0f}"
+            plan = run["plan"] or "-"
+            print(f"{run['query_id']:<32} {value:>12}  ({run['operators']} operators)  plan {plan}  {run['source']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Operator-level diff of two query infos of the same query.
+
+Runs such as with_local_exchange_opt vs no_local_exchange_opt, or cudf vs
+HTTP exchange, are aligned operator by operator instead of comparing two HTML
+files side by side. Operators are matched on plan node id and a normalized
+operator type, so GPU and CPU variants of the same operator line up
+(CudfHashJoinProbe ~ HashJoinProbe, cudfPartitionedOutput ~
+PartitionedOutput, 7-to-velox ~ 7). Stages and pipelines are aligned by
+majority vote over their matched operators, so a stage renumbered by the
+other plan is shown next to its counterpart. The result is a single HTML page
+with per-operator deltas in wall time, rows, bytes and peak memory, sorted by
+absolute wall time impact.
+
+Used by query_plan_visualize.py --diff; can also run standalone:
+
+    python plan_diff.py before.json after.json -o diff.html
+"""
+
+import argparse
+import html
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import (
+    OperatorStats, load_operators, format_data_size, format_rows, format_time, parse_time_value, plan_fingerprint,
+    read_json,
+)
+
+# Operator type families that are the same logical operator under another name
+TYPE_ALIASES = {
+    "partialaggregation": "aggregation",
+    "hashaggregation": "aggregation",
+    "streamingaggregation": "aggregation",
+    "finalaggregation": "aggregation",
+    "fromvelox": "conversion",
+    "tovelox": "conversion",
+    "localexchangesource": "localexchange",
+    "localpartition": "localexchange",
+    "merge": "exchange",
+    "mergeexchange": "exchange",
+}
+
+_GPU_PREFIX_RE = re.compile(r"^cudf", re.IGNORECASE)
+_CONVERSION_NODE_RE = re.compile(r"^(\d+)-to-\w+$")
+
+METRICS = [
+    ("wall_ns", "Wall Time", format_time),
+    ("rows", "Output Rows", format_rows),
+    ("bytes", "Output Bytes", format_data_size),
+    ("memory", "Peak Memory", format_data_size),
+]
+
+
+def normalize_operator_type(operator_type: str) -> str:
+    """Map CPU and GPU spellings of an operator to one family name."""
+    name = _GPU_PREFIX_RE.sub("", operator_type or "").lower()
+    return TYPE_ALIASES.get(name, name)
+
+
+def normalize_plan_node(plan_node_id) -> str:
+    """Conversion boundaries ('7-to-velox') belong to their plan node ('7')."""
+    node = str(plan_node_id) if plan_node_id is not None else "N/A"
+    match = _CONVERSION_NODE_RE.match(node)
+    return match.group(1) if match else node
+
+
+def operator_metrics(op: OperatorStats) -> Dict[str, Any]:
+    return {
+        "key": op.key,
+        "operator": op.operator_type,
+        "plan_node_id": op.plan_node_id,
+        "wall_ns": op.wall_ns,
+        "rows": op.output_rows,
+        "bytes": op.output_bytes,
+        "memory": op.peak_total_bytes,
+    }
+
+
+def _index_operators(query_info: Dict[str, Any]) -> Dict[tuple, Dict[str, Any]]:
+    """(plan node, type family, occurrence) -> operator metrics."""
+    ops = sorted(load_operators(query_info), key=lambda o: (o.stage or 0, o.pipeline, o.operator_id or 0))
+    index, seen = {}, {}
+    for op in ops:
+        base = (normalize_plan_node(op.plan_node_id), normalize_operator_type(op.operator_type))
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        index[base + (occurrence,)] = operator_metrics(op)
+    return index
+
+
+def _align(pairs: List[tuple]) -> Dict[Any, Any]:
+    """Majority vote mapping from 'before' ids to 'after' ids."""
+    votes = {}
+    for a, b in pairs:
+        votes.setdefault(a, {}).setdefault(b, 0)
+        votes[a][b] += 1
+    return {a: max(counts, key=counts.get) for a, counts in votes.items()}
+
+
+def diff_query_infos(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Align the operators of two query infos and compute per-operator deltas.
+
+    Returns {'rows': [...], 'stage_map': {...}, 'pipeline_map': {...}}; each
+    row has 'before' and 'after' metrics (None when unmatched), a 'delta'
+    dict per metric and 'impact' (absolute wall time delta in ns). 'plans'
+    holds both plan-shape fingerprints and 'plan_changed' is set when they
+    differ, i.e. the optimizer chose another plan.
+    """
+    before_ops = _index_operators(before)
+    after_ops = _index_operators(after)
+
+    rows = []
+    for match_key in list(before_ops) + [k for k in after_ops if k not in before_ops]:
+        a = before_ops.get(match_key)
+        b = after_ops.get(match_key)
+        delta = {metric: (b[metric] if b else 0) - (a[metric] if a else 0) for metric, _, _ in METRICS}
+        rows.append({
+            "plan_node_id": match_key[0],
+            "family": match_key[1],
+            "before": a,
+            "after": b,
+            "delta": delta,
+            "impact": abs(delta["wall_ns"]),
+        })
+    rows.sort(key=lambda r: -r["impact"])
+
+    matched = [(r["before"]["key"], r["after"]["key"]) for r in rows if r["before"] and r["after"]]
+    before_plan, after_plan = plan_fingerprint(before), plan_fingerprint(after)
+    return {
+        "rows": rows,
+        "plans": (before_plan, after_plan),
+        "plan_changed": bool(before_plan and after_plan and before_plan != after_plan),
+        "stage_map": _align([(a[0], b[0]) for a, b in matched]),
+        "pipeline_map": _align([(a[:2], b[:2]) for a, b in matched]),
+    }
+
+
+def renumbered_stages(diff: Dict[str, Any]) -> List[tuple]:
+    """(before, after) stage ids of aligned stages whose id differs."""
+    return [(a, b) for a, b in _sorted_stages(diff["stage_map"]) if a != b]
+
+
+def _sorted_stages(stage_map: Dict[Any, Any]) -> List[tuple]:
+    # Operators without a stage id map as None; list them last
+    return sorted(stage_map.items(), key=lambda kv: (kv[0] is None, kv[0] or 0))
+
+
+def _query_total_ns(query_info: Dict[str, Any]) -> float:
+    query_stats = query_info.get("queryStats", {})
+    return parse_time_value(query_stats.get("elapsedTime") or query_stats.get("executionTime") or "0ns")
+
+
+def _cell(metrics, metric, formatter) -> str:
+    return formatter(metrics[metric]) if metrics else "&mdash;"
+
+
+def _delta_cell(row, metric, formatter) -> str:
+    value = row["delta"][metric]
+    if not row["before"] or not row["after"]:
+        return '<td class="delta">&mdash;</td>'
+    if value == 0:
+        return '<td class="delta">0</td>'
+    base = row["before"][metric]
+    pct = f" ({value / base * 100:+.0f}%)" if base else ""
+    css = "worse" if value > 0 else "better"
+    sign = "+" if value > 0 else "-"
+    return f'<td class="delta {css}">{sign}{formatter(abs(value))}{pct}</td>'
+
+
+def generate_diff_html(before: Dict[str, Any], after: Dict[str, Any], diff: Dict[str, Any],
+                       before_label: str, after_label: str) -> str:
+    """Render the diff as a single self-contained HTML page."""
+    before_total = _query_total_ns(before)
+    after_total = _query_total_ns(after)
+    total_delta = after_total - before_total
+    query_text = html.escape(before.get("query", "")[:500])
+
+    stage_rows = ""
+    for a_stage, b_stage in _sorted_stages(diff["stage_map"]):
+        css = ' class="renumbered"' if a_stage != b_stage else ""
+        stage_rows += f"<tr{css}><td>Stage {a_stage}</td><td>Stage {b_stage}</td></tr>\n"
+
+    pipeline_rows = ""
+    for a_pipe, b_pipe in sorted(diff["pipeline_map"].items(), key=lambda kv: str(kv[0])):
+        pipeline_rows += (f"<tr><td>Stage {a_pipe[0]} / Pipeline {a_pipe[1]}</td>"
+                          f"<td>Stage {b_pipe[0]} / Pipeline {b_pipe[1]}</td></tr>\n")
+    renumbered = renumbered_stages(diff)
+    stage_note = f"{len(renumbered)} of {len(diff['stage_map'])} stages renumbered" if renumbered else \
+        "Stage ids unchanged"
+
+    op_rows = ""
+    for row in diff["rows"]:
+        a, b = row["before"], row["after"]
+        status = "matched" if a and b else ("removed" if a else "added")
+        a_name = f'{a["operator"]} [{", ".join(str(x) for x in a["key"])}]' if a else "&mdash;"
+        b_name = f'{b["operator"]} [{", ".join(str(x) for x in b["key"])}]' if b else "&mdash;"
+        op_rows += f'<tr class="{status}"><td>{row["plan_node_id"]}</td><td>{a_name}</td><td>{b_name}</td>'
+        for metric, _, formatter in METRICS:
+            op_rows += f'<td>{_cell(a, metric, formatter)}</td><td>{_cell(b, metric, formatter)}</td>'
+            op_rows += _delta_cell(row, metric, formatter)
+        op_rows += "</tr>\n"
+
+    metric_headers = "".join(f'<th colspan="3">{label}</th>' for _, label, _ in METRICS)
+    metric_subheaders = "<th>Before</th><th>After</th><th>&Delta;</th>" * len(METRICS)
+    total_css = "worse" if total_delta > 0 else "better"
+    before_plan, after_plan = diff["plans"]
+    plan_note = ""
+    if diff["plan_changed"]:
+        plan_note = (f'<div class="plan-changed">Plan shape changed ({before_plan} &rarr; {after_plan}): '
+                     f'deltas mix optimizer and execution effects</div>')
+    elif before_plan:
+        plan_note = f'<div class="labels">Same plan shape ({before_plan})</div>'
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Plan Diff - {html.escape(before_label)} vs {html.escape(after_label)}</title>
+    <style>
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+            background: #f5f5f5;
+            color: #333;
+            margin: 0;
+            padding: 20px;
+        }}
+        .container {{ max-width: 1800px; margin: 0 auto; background: white; padding: 20px; border-radius: 4px; }}
+        h1 {{ font-size: 20px; margin: 0 0 8px 0; }}
+        .labels {{ font-family: monospace; font-size: 12px; color: #666; margin-bottom: 12px; }}
+        .query-text {{ font-family: monospace; font-size: 12px; background: #f8f9fa; padding: 8px; white-space: pre-wrap; }}
+        .summary {{ margin: 12px 0; font-size: 14px; }}
+        table {{ border-collapse: collapse; width: 100%; font-size: 12px; margin-bottom: 20px; }}
+        th {{ background: #2c3e50; color: white; padding: 6px 8px; text-align: left; position: sticky; top: 0; }}
+        td {{ padding: 4px 8px; border-bottom: 1px solid #eee; font-family: monospace; }}
+        tr:hover {{ background: #f8f9fa; }}
+        tr.added {{ background: #eafaf1; }}
+        tr.removed {{ background: #fdf2f1; }}
+        td.delta {{ font-weight: bold; }}
+        .worse {{ color: #c0392b; }}
+        .better {{ color: #27ae60; }}
+        .stage-map {{ width: auto; display: inline-table; vertical-align: top; margin-right: 20px; }}
+        tr.renumbered {{ background: #fef5e7; font-weight: bold; }}
+        .plan-changed {{ background: #fdf2f1; color: #c0392b; font-weight: bold; padding: 8px; margin: 8px 0; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Operator Diff</h1>
+        <div class="labels">Before: {html.escape(before_label)}<br>After: {html.escape(after_label)}</div>
+        <div class="query-text">{query_text}</div>
+        {plan_note}
+        <div class="summary">Elapsed: {format_time(before_total)} &rarr; {format_time(after_total)}
+            <span class="{total_css}">({'+' if total_delta > 0 else '-'}{format_time(abs(total_delta))})</span>
+            &middot; {sum(1 for r in diff['rows'] if r['before'] and r['after'])} matched,
+            {sum(1 for r in diff['rows'] if not r['after'])} removed,
+            {sum(1 for r in diff['rows'] if not r['before'])} added operators</div>
+        <div class="labels">{stage_note}</div>
+        <table class="stage-map">
+            <thead><tr><th>Before Stage</th><th>After Stage</th></tr></thead>
+            <tbody>
+{stage_rows}            </tbody>
+        </table>
+        <table class="stage-map">
+            <thead><tr><th>Before Pipeline</th><th>After Pipeline</th></tr></thead>
+            <tbody>
+{pipeline_rows}            </tbody>
+        </table>
+        <table>
+            <thead>
+                <tr><th rowspan="2">Plan Node</th><th rowspan="2">Before Operator</th><th rowspan="2">After Operator</th>{metric_headers}</tr>
+                <tr>{metric_subheaders}</tr>
+            </thead>
+            <tbody>
+{op_rows}            </tbody>
+        </table>
+    </div>
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Operator-level diff of two query infos of the same query")
+    parser.add_argument("before", help="Baseline query plan JSON")
+    parser.add_argument("after", help="Query plan JSON to compare against the baseline")
+    parser.add_argument("-o", "--output", help="Output HTML file (default: <before>_vs_<after>_diff.html)")
+    args = parser.parse_args()
+
+    before_path, after_path = Path(args.before), Path(args.after)
+    before = read_json(before_path)
+    after = read_json(after_path)
+
+    output_path = Path(args.output) if args.output else \
+        before_path.parent / f"{before_path.stem}_vs_{after_path.stem}_diff.html"
+    diff = diff_query_infos(before, after)
+    with open(output_path, "w") as f:
+        f.write(generate_diff_html(before, after, diff, str(before_path), str(after_path)))
+    print(f"✓ Diff saved to: {output_path}", file=sys.stderr)
+    if diff["plan_changed"]:
+        print(f"  Plan shape changed: {diff['plans'][0]} -> {diff['plans'][1]}", file=sys.stderr)
+    for a_stage, b_stage in renumbered_stages(diff):
+        print(f"  Stage {a_stage} -> Stage {b_stage}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Indexed in-memory graph of a Presto query's operators.
+
+One pass over queryStats.operatorSummaries and one walk over the stage plan
+trees build every lookup the visualizer needs:
+
+- ops:            (stage, pipeline, operator) -> OperatorStats record
+- operator_types: (stage, pipeline, operator) -> operator type
+- pipeline_ops:   (stage, pipeline) -> operators sorted by operatorId
+- node_ops:       (stage, plan node id) -> operators implementing the node
+- stage_trees:    stage -> node id -> {name, children, remoteSources}
+- receivers:      source stage -> [(receiving stage, node id)] in plan order
+- links:          operator key -> ordered set of (linked key, direction)
+
+Links are deduplicated with dict membership instead of scanning lists, and
+PartitionedOutput operators look up their receivers in the receivers index
+instead of rescanning every stage tree, so building the graph is linear in
+the number of operators and plan nodes.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import OperatorStats, load_operators
+
+# Operators whose pipeline ends without producing output for another pipeline
+NO_OUTPUT_OPERATORS = {
+    "HashJoinBuild", "CudfHashJoinBuild",
+    "HashJoinProbe", "CudfHashJoinProbe",
+    "TopNRowNumber", "CudfTopNRowNumber",
+}
+
+
+def is_partitioned_output(operator_type: str) -> bool:
+    return "PartitionedOutput" in operator_type or "cudfPartitionedOutput" in operator_type
+
+
+def walk_stages(stage: Dict[str, Any]):
+    """Yield a stage and all its sub-stages, depth first."""
+    yield stage
+    for substage in stage.get("subStages", []):
+        yield from walk_stages(substage)
+
+
+def stage_id_of(stage: Dict[str, Any]):
+    """A stage's plan id as int when numeric."""
+    stage_id = stage.get("plan", {}).get("id")
+    try:
+        return int(stage_id)
+    except (ValueError, TypeError):
+        return stage_id
+
+
+def _has_numeric_node(op: OperatorStats) -> bool:
+    """Conversion boundaries such as '1653-to-velox' are not plan tree nodes."""
+    return op.plan_node_id.isdigit()
+
+
+class PlanGraph:
+    """Operator graph of one query info; see the module docstring for the indexes."""
+
+    def __init__(self, query_info: Dict[str, Any]):
+        self.ops = {}
+        self.operator_types = {}
+        self.pipeline_ops = {}
+        self.stage_ops = {}
+        self.node_ops = {}
+        self.stage_trees = {}
+        self.receivers = {}
+        self.links = {}
+
+        for op in load_operators(query_info):
+            key = op.key
+            self.ops.setdefault(key, op)
+            self.operator_types[key] = op.operator_type
+            self.pipeline_ops.setdefault((op.stage, op.pipeline), []).append(op)
+            self.stage_ops.setdefault(op.stage, []).append(op)
+            if op.raw.get("planNodeId"):
+                self.node_ops.setdefault((op.stage, op.plan_node_id), []).append(op)
+
+        for ops in self.pipeline_ops.values():
+            ops.sort(key=lambda o: o.operator_id or 0)
+
+        if "outputStage" in query_info:
+            self._index_stage_trees(query_info["outputStage"])
+        for recv_stage_id, tree in self.stage_trees.items():
+            for node_id, node_info in tree.items():
+                for source_stage_id in node_info["remoteSources"]:
+                    self.receivers.setdefault(source_stage_id, []).append((recv_stage_id, node_id))
+
+        self._link_pipeline_outputs()
+        self._link_partitioned_outputs()
+
+    def _index_stage_trees(self, root_stage: Dict[str, Any]) -> None:
+        pending = [root_stage]
+        while pending:
+            stage = pending.pop()
+            stage_id = stage.get("plan", {}).get("id")
+            if stage_id:
+                try:
+                    stage_id = int(stage_id)
+                except (ValueError, TypeError):
+                    pass
+                try:
+                    plan_tree = json.loads(stage.get("plan", {}).get("jsonRepresentation", "{}"))
+                    tree = {}
+                    nodes = [plan_tree]
+                    while nodes:
+                        node = nodes.pop()
+                        node_id = node.get("id")
+                        children = node.get("children", [])
+                        if node_id:
+                            tree[node_id] = {
+                                "name": node.get("name", ""),
+                                "children": [c.get("id") for c in children],
+                                "remoteSources": [int(x) for x in node.get("remoteSources", [])],
+                            }
+                        nodes.extend(reversed(children))
+                    self.stage_trees[stage_id] = tree
+                except (json.JSONDecodeError, TypeError):
+                    pass
+            pending.extend(reversed(stage.get("subStages", [])))
+
+    def add_link(self, src_key: tuple, dst_key: tuple) -> None:
+        """Add a forward link and its reverse; duplicates are ignored."""
+        self.links.setdefault(src_key, {})[(dst_key, "forward")] = None
+        self.links.setdefault(dst_key, {})[(src_key, "reverse")] = None
+
+    def _link_pipeline_outputs(self) -> None:
+        """Connect pipelines whose top plan node has remote sources to the receiving stages."""
+        for (stage_id, pipeline_id), ops in sorted(self.pipeline_ops.items()):
+            if not ops:
+                continue
+            highest_op = ops[-1]
+            highest_type = highest_op.operator_type
+            if highest_type in NO_OUTPUT_OPERATORS or is_partitioned_output(highest_type):
+                continue
+
+            routing_op = highest_op
+            if highest_op.plan_node_id in ("", "N/A"):
+                routing_op = next((op for op in reversed(ops) if _has_numeric_node(op)), None)
+                if routing_op is None:
+                    continue
+
+            tree = self.stage_trees.get(stage_id)
+            node_info = tree.get(routing_op.plan_node_id) if tree else None
+            if not node_info or not node_info["remoteSources"]:
+                continue
+
+            connection_key = highest_op.key
+            for receiving_stage_id in node_info["remoteSources"]:
+                for child_id in node_info["children"]:
+                    for dest_op in self.node_ops.get((receiving_stage_id, child_id), []):
+                        self.add_link(connection_key, dest_op.key)
+
+    def _link_partitioned_outputs(self) -> None:
+        """
+        Connect each PartitionedOutput to operator 0 of the pipelines implementing
+        the first receiving node (with operators) of every stage that reads from it.
+        """
+        for (stage_id, pipeline_id), ops in sorted(self.pipeline_ops.items()):
+            for op in ops:
+                if not is_partitioned_output(op.operator_type):
+                    continue
+                source_key = op.key
+                connected_stages = set()
+                for recv_stage_id, node_id in self.receivers.get(stage_id, []):
+                    if recv_stage_id == stage_id or recv_stage_id in connected_stages:
+                        continue
+                    recv_ops = self.node_ops.get((recv_stage_id, str(node_id)), [])
+                    if not recv_ops:
+                        continue
+                    connected_stages.add(recv_stage_id)
+                    for recv_op in recv_ops:
+                        recv_pipeline = recv_op.pipeline
+                        first_op = self.pipeline_ops.get((recv_stage_id, recv_pipeline), [None])[0]
+                        if first_op is not None and first_op.operator_id == 0:
+                            self.add_link(source_key, (recv_stage_id, recv_pipeline, 0))
+
+    def connections(self) -> Dict[tuple, List[tuple]]:
+        """Links in the build_operator_connections() format: key -> [(linked key, direction)]."""
+        return {key: list(links) for key, links in self.links.items()}
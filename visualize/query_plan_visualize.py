@@ -10,112 +10,34 @@ Usage:
     python query_plan_simple.py <path_to_query_json> [--output <output_html>]
 """
 
+import csv
+import hashlib
+import html
+import io
 import json
+import os
 import sys
+import time
 import argparse
+from multiprocessing import Pool
 from pathlib import Path
 from typing import Dict, Any, List
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def format_data_size(bytes_val) -> str:
-    """Format bytes to human-readable size."""
-    if isinstance(bytes_val, str):
-        return bytes_val
-    if bytes_val is None or bytes_val == 0:
-        return "0B"
-    try:
-        size = float(bytes_val)
-    except (ValueError, TypeError):
-        return str(bytes_val)
-
-    units = ["B", "KB", "MB", "GB", "TB", "PB"]
-    for unit in units:
-        if size < 1024:
-            return f"{size:.2f}{unit}"
-        size /= 1024
-    return f"{size:.2f}PB"
-
-
-def format_rows(rows) -> str:
-    """Format row count."""
-    if rows is None or rows == 0:
-        return "0"
-    if isinstance(rows, str):
-        return rows
-    rows = int(rows)
-    if rows < 1000:
-        return str(rows)
-    if rows < 1_000_000:
-        return f"{rows / 1000:.2f}K"
-    if rows < 1_000_000_000:
-        return f"{rows / 1_000_000:.2f}M"
-    return f"{rows / 1_000_000_000:.2f}B"
-
-
-def parse_time_value(time_str: str) -> float:
-    """Parse time string (e.g., '49.06us', '80.54ms', '6.24m') to nanoseconds."""
-    if not isinstance(time_str, str) or time_str == "0.00ns":
-        return 0.0
-
-    time_str = time_str.strip()
-
-    # Extract number and unit
-    import re
-    match = re.match(r'([0-9.]+)\s*([a-zA-Z]+)', time_str)
-    if not match:
-        return 0.0
-
-    value = float(match.group(1))
-    unit = match.group(2).lower()
-
-    # Convert to nanoseconds
-    conversions = {
-        'ns': 1,
-        'us': 1_000,
-        'ms': 1_000_000,
-        's': 1_000_000_000,
-        'm': 60 * 1_000_000_000,  # minutes
-        'h': 3600 * 1_000_000_000,  # hours
-    }
-
-    multiplier = conversions.get(unit, 1)
-    return value * multiplier
-
-
-def format_time(nanoseconds: float) -> str:
-    """Format nanoseconds to human-readable time."""
-    if nanoseconds == 0:
-        return "0.00ns"
-
-    units = [
-        (1_000_000_000 * 3600, 'h'),
-        (1_000_000_000 * 60, 'm'),
-        (1_000_000_000, 's'),
-        (1_000_000, 'ms'),
-        (1_000, 'us'),
-        (1, 'ns'),
-    ]
-
-    for divisor, unit in units:
-        if nanoseconds >= divisor:
-            return f"{nanoseconds / divisor:.2f}{unit}"
-
-    return f"{nanoseconds:.2f}ns"
+from plan_graph import PlanGraph
+from presto_stats import (
+    OperatorStats, WALL_COMPONENTS, load_operators,
+    format_data_size, parse_data_size, format_rows, parse_time_value, format_time, read_json,
+)
 
 
 def calculate_total_walltime(operator: Dict[str, Any]) -> str:
-    """Calculate total walltime for an operator by summing all walltime components."""
-    walltime_fields = ['addInputWall', 'getOutputWall', 'finishWall', 'blockedWall', 'isBlockedWall']
+    """An operator's total wall time, formatted; blocked time is counted once (see OperatorStats.wall_breakdown)."""
+    return format_time(OperatorStats(operator).wall_ns)
 
-    total_ns = 0.0
-    for field in walltime_fields:
-        time_str = operator.get(field, "0.00ns")
-        total_ns += parse_time_value(time_str)
 
-    return format_time(total_ns)
-
-
-def build_operator_connections(query_info: Dict[str, Any]) -> Dict[tuple, tuple]:
+def build_operator_connections(query_info: Dict[str, Any]) -> Dict[tuple, list]:
     """
     Build bi-directional connections between operators using PURE TREE-BASED LOGIC.
 
@@ -125,338 +47,24 @@ def build_operator_connections(query_info: Dict[str, Any]) -> Dict[tuple, tuple]
     - An operator receives inter-stage data if it's referenced in a node's remoteSources
     - Destinations are determined by following the logical plan tree, not operator types
 
-    This eliminates all hardcoded operator type lists by deriving behavior from tree structure.
+    The indexes and link building live in plan_graph.PlanGraph.
 
-    Connection key: (stage_id, pipeline_id, operator_id) -> (dest_stage_id, dest_pipeline_id, dest_operator_id, direction)
+    Connection key: (stage_id, pipeline_id, operator_id) -> [((dest_stage_id, dest_pipeline_id, dest_operator_id), direction)]
     Direction: 'forward' (sender to receiver) or 'reverse' (receiver to sender)
     """
-    connections = {}
-
-    def add_connection(src_key, dst_key):
-        """Add both forward and reverse connections (with deduplication)"""
-        if src_key not in connections:
-            connections[src_key] = []
-
-        # Check if this forward connection already exists
-        if not any(d[0] == dst_key and d[1] == 'forward' for d in connections[src_key]):
-            connections[src_key].append((dst_key, 'forward'))
-
-        if dst_key not in connections:
-            connections[dst_key] = []
-
-        # Check if this reverse connection already exists
-        if not any(d[0] == src_key and d[1] == 'reverse' for d in connections[dst_key]):
-            connections[dst_key].append((src_key, 'reverse'))
-
-    operator_summaries = query_info.get("queryStats", {}).get("operatorSummaries", [])
-
-    # Stage 1: Index operators
-    stage_pipeline_ops = {}  # (stage, pipeline) -> [operators]
-    stage_ops = {}  # stage -> [operators]
-    node_to_operators = {}  # (stage, plan_node_id) -> [operators]
-    operator_summaries_by_key = {}  # (stage, pipeline, op_id) -> operator
-
-    for op in operator_summaries:
-        stage_id = op.get("stageId")
-        pipeline_id = op.get("pipelineId", 0)
-        op_id = op.get("operatorId")
-        plan_node_id = op.get("planNodeId")
-
-        # Index by (stage, pipeline, op_id) for quick lookup
-        op_key = (stage_id, pipeline_id, op_id)
-        operator_summaries_by_key[op_key] = op
-
-        # Index by (stage, pipeline)
-        key = (stage_id, pipeline_id)
-        if key not in stage_pipeline_ops:
-            stage_pipeline_ops[key] = []
-        stage_pipeline_ops[key].append(op)
-
-        # Index by stage
-        if stage_id not in stage_ops:
-            stage_ops[stage_id] = []
-        stage_ops[stage_id].append(op)
-
-        # Index by (stage, plan_node_id)
-        # Normalize plan_node_id to string for consistent lookups
-        if plan_node_id:
-            plan_node_id_str = str(plan_node_id)
-            node_key = (stage_id, plan_node_id_str)
-            if node_key not in node_to_operators:
-                node_to_operators[node_key] = []
-            node_to_operators[node_key].append(op)
-
-    # Stage 2: Extract and analyze logical plan structure for each stage
-    stage_plans = {}  # stage_id -> plan tree
-    stage_tree_structure = {}  # stage_id -> node_id -> {children: [...], remoteSources: [...]}
-
-    def extract_stage_plans(stage, target_stage_id=None):
-        """Recursively extract stage plans from the query structure."""
-        stage_id = stage.get("plan", {}).get("id")
-        if stage_id:
-            try:
-                stage_id = int(stage_id)
-            except (ValueError, TypeError):
-                pass
-
-            # Only extract if we haven't already or if target matches
-            if target_stage_id is None or stage_id == target_stage_id:
-                plan_data = stage.get("plan", {}).get("jsonRepresentation", "{}")
-                try:
-                    plan_tree = json.loads(plan_data)
-                    stage_plans[stage_id] = plan_tree
-
-                    # Build tree structure for this stage
-                    tree = {}
+    return PlanGraph(query_info).connections()
 
-                    def build_tree_map(node):
-                        """Build map of node structure from plan tree."""
-                        node_id = node.get("id")
-                        if node_id:
-                            tree[node_id] = {
-                                "name": node.get("name", ""),
-                                "children": [c.get("id") for c in node.get("children", [])],
-                                "remoteSources": [int(x) for x in node.get("remoteSources", [])]
-                            }
 
-                        for child in node.get("children", []):
-                            build_tree_map(child)
-
-                    build_tree_map(plan_tree)
-                    stage_tree_structure[stage_id] = tree
-
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
-        for substage in stage.get("subStages", []):
-            extract_stage_plans(substage, target_stage_id)
-
-    if "outputStage" in query_info:
-        extract_stage_plans(query_info["outputStage"])
-
-    # Stage 3: Determine output behavior based on tree structure
-    # This replaces the hardcoded operator type lists
-    def get_intra_stage_children(stage_id, node_id):
-        """Get children of a node that are in different pipelines in the SAME stage."""
-        if stage_id not in stage_tree_structure:
-            return []
-
-        tree = stage_tree_structure[stage_id]
-        if node_id not in tree:
-            return []
-
-        children = tree[node_id].get("children", [])
-        result = []
-
-        # Get pipelines implementing this node
-        # Normalize node_id to string for lookup
-        node_id_str = str(node_id)
-        node_key = (stage_id, node_id_str)
-        producer_pipelines = set(op.get("pipelineId", 0)
-                                for op in node_to_operators.get(node_key, []))
-
-        # Check which children are in this stage in different pipelines
-        for child_id in children:
-            child_id_str = str(child_id)
-
-            # Skip inter-stage children (RemoteSource nodes with remoteSources)
-            # These should not be routed to intra-stage
-            child_tree_info = tree.get(child_id_str, {})
-            if child_tree_info.get("remoteSources", []):
-                # This is an inter-stage receiver, skip it
-                continue
-
-            child_key = (stage_id, child_id_str)
-            child_ops = node_to_operators.get(child_key, [])
-
-            if child_ops:  # Child is in this stage
-                child_pipelines = set(op.get("pipelineId", 0) for op in child_ops)
-
-                # If child is in different pipeline(s), it's an intra-stage connection target
-                for child_p in child_pipelines:
-                    for prod_p in producer_pipelines:
-                        if child_p != prod_p:
-                            result.append(child_id)
-                            break
-
-        return result
-
-    # Stage 4: Process each pipeline and determine its connections
-    for (stage_id, pipeline_id), ops_in_pipeline in sorted(stage_pipeline_ops.items()):
-        # Find highest operator in this pipeline (by operatorId) that implements a tree node
-        # Skip terminal operators that don't implement tree nodes
-        sorted_ops = sorted(ops_in_pipeline, key=lambda x: x.get("operatorId", 0))
-        if not sorted_ops:
-            continue
-
-        # Find highest operator that implements a tree node
-        # If highest operator doesn't have valid planNodeId, find next highest that does
-        highest_op = None
-        highest_op_with_node = None
-
-        for op in reversed(sorted_ops):
-            op_type = op.get("operatorType", "")
-            op_node_id = op.get("planNodeId")
-
-            # Track the very highest operator
-            if highest_op is None:
-                highest_op = op
-
-            # Track highest operator with valid planNodeId (only numeric IDs that are in the tree)
-            if highest_op_with_node is None and op_node_id and op_node_id != "N/A":
-                # Only use numeric node IDs (not IDs like "1653-to-velox")
-                try:
-                    int(op_node_id)
-                    # Node ID is numeric, this is a valid fallback
-                    highest_op_with_node = op
-                except (ValueError, TypeError):
-                    # Non-numeric node ID, skip it
-                    pass
-
-        if not highest_op:
-            continue
-
-        # Determine which operator to use for routing
-        # If highest operator is a terminal/no-output operator, use the highest operator with a valid node ID
-        highest_op_type = highest_op.get("operatorType", "")
-        no_output_operators = [
-            "HashJoinBuild", "CudfHashJoinBuild",
-            "HashJoinProbe", "CudfHashJoinProbe",
-            "TopNRowNumber", "CudfTopNRowNumber",
-        ]
-
-        # Determine the operator to use for routing (needs valid node ID)
-        routing_op = highest_op
-        if highest_op_type in no_output_operators or not highest_op.get("planNodeId") or highest_op.get("planNodeId") == "N/A":
-            # Use highest operator with valid node ID for determining routing
-            if highest_op_with_node:
-                routing_op = highest_op_with_node
-            else:
-                # No operator in this pipeline has a valid node ID
-                continue
-
-        # connection_key is ALWAYS the actual highest operator (for the connection source)
-        connection_key = (stage_id, pipeline_id, highest_op.get("operatorId"))
-
-        # routing_op provides the node ID for determining WHERE to send data
-        routing_op_type = routing_op.get("operatorType", "")
-        routing_op_node_id = routing_op.get("planNodeId")
-        highest_op_type = highest_op.get("operatorType", "")
-
-        # Skip if the selected operator is a no-output operator
-        # (these should never create connections)
-        if highest_op_type in no_output_operators:
-            continue
-
-        # PartitionedOutput operators handle inter-stage connections only in Stage 5
-        # Skip them here to avoid double-connecting
-        if "PartitionedOutput" in highest_op_type or "cudfPartitionedOutput" in highest_op_type:
-            continue
-
-        # Skip if no valid node ID or stage not in tree
-        if not routing_op_node_id or routing_op_node_id == "N/A" or stage_id not in stage_tree_structure:
-            continue
-
-        tree = stage_tree_structure[stage_id]
-        if routing_op_node_id not in tree:
-            continue
-
-        node_info = tree[routing_op_node_id]
-
-        # Check if this node has inter-stage children (remoteSources)
-        remote_sources = node_info.get("remoteSources", [])
-
-        if remote_sources:
-            # Inter-stage output: Connect to receiving stages
-            for receiving_stage_id in remote_sources:
-                # Find operator in receiving stage that implements a child node
-                for child_id in node_info.get("children", []):
-                    child_key = (receiving_stage_id, child_id)
-                    child_ops = node_to_operators.get(child_key, [])
-
-                    for dest_op in child_ops:
-                        dest_key = (
-                            receiving_stage_id,
-                            dest_op.get("pipelineId", 0),
-                            dest_op.get("operatorId")
-                        )
-                        add_connection(connection_key, dest_key)
-        else:
-            # Skip intra-stage connections - they are too complex to encode
-            pass
-
-    # Stage 5: Connect PartitionedOutput operators to inter-stage RECEIVERS
-    # A PartitionedOutput in stage X sends to stages that have RemoteSource nodes with remoteSources=['X']
-    # Each PartitionedOutput sends to exactly ONE receiving operator per receiving stage
-
-    for (stage_id, pipeline_id), ops_in_pipeline in sorted(stage_pipeline_ops.items()):
-        for op in ops_in_pipeline:
-            op_type = op.get("operatorType", "")
-            if not ("PartitionedOutput" in op_type or "cudfPartitionedOutput" in op_type):
-                continue
-
-            # This is a PartitionedOutput operator in stage_id
-            source_key = (stage_id, pipeline_id, op.get("operatorId"))
-
-            # Find all stages that have receiver nodes with remoteSources pointing to this stage
-            # by checking all stages' plans for nodes with remoteSources=[stage_id]
-            for recv_stage_id, recv_tree_structure in stage_tree_structure.items():
-                if recv_stage_id == stage_id:
-                    continue  # Skip same stage
-
-                # Look for nodes in recv_stage with remoteSources=[stage_id]
-                for node_id, node_info in recv_tree_structure.items():
-                    remote_srcs = node_info.get("remoteSources", [])
-
-                    # Check if this node receives from our source stage
-                    if stage_id in remote_srcs:
-                        # Found a receiver in recv_stage_id that receives from stage_id
-                        # Get the operators implementing this receiving node
-                        node_id_str = str(node_id)
-                        recv_node_key = (recv_stage_id, node_id_str)
-                        recv_ops = node_to_operators.get(recv_node_key, [])
-
-                        if recv_ops:
-                            # Connect to Op 0 of each pipeline implementing this receiving node
-                            for recv_op in recv_ops:
-                                recv_pipeline = recv_op.get("pipelineId", 0)
-                                recv_key = (recv_stage_id, recv_pipeline)
-
-                                if recv_key in stage_pipeline_ops:
-                                    recv_ops_list = stage_pipeline_ops[recv_key]
-                                    op_0 = next((o for o in recv_ops_list if o.get("operatorId") == 0), None)
-
-                                    if op_0:
-                                        dest_key = (
-                                            recv_stage_id,
-                                            op_0.get("pipelineId", 0),
-                                            op_0.get("operatorId")
-                                        )
-                                        add_connection(source_key, dest_key)
-
-                            # Only connect to first matching receiver
-                            break
-
-    return connections
-
-
-def extract_stages(query_info: Dict[str, Any]) -> tuple:
+def extract_stages(query_info: Dict[str, Any], graph: PlanGraph = None) -> tuple:
     """Extract runtime operators from query execution stats."""
     stages_list = []
 
-    # Get runtime operators from operatorSummaries
-    operator_summaries = query_info.get("queryStats", {}).get("operatorSummaries", [])
-
     # Build connections between operators
-    connections = build_operator_connections(query_info)
+    graph = graph or PlanGraph(query_info)
+    connections = graph.connections()
 
-    # Group operators by stage
-    stage_operators = {}
-    for op in operator_summaries:
-        stage_id = op.get("stageId")
-        if stage_id not in stage_operators:
-            stage_operators[stage_id] = []
-        stage_operators[stage_id].append(op)
+    # Operators grouped by stage
+    stage_operators = graph.stage_ops
 
     # Get stage information from the plan tree for stats
     stage_stats = {}
@@ -485,23 +93,24 @@ def extract_stages(query_info: Dict[str, Any]) -> tuple:
 
         # IMPORTANT: Sort operators by operatorId within each stage
         # (JSON may have them in arbitrary order, but HTML display depends on proper ordering)
-        ops = sorted(ops, key=lambda x: x.get("operatorId", 0))
+        ops = sorted(ops, key=lambda x: x.operator_id or 0)
 
         # Convert operators to simplified format
         runtime_ops = []
         for op in ops:
+            breakdown = op.wall_breakdown()
             runtime_ops.append({
-                "name": op.get("operatorType", "Unknown"),
-                "operator_id": op.get("operatorId"),
-                "pipeline_id": op.get("pipelineId"),
-                "plan_node_id": op.get("planNodeId", "N/A"),
-                "input_data_size": op.get("inputDataSizeInBytes", 0),
-                "output_data_size": op.get("outputDataSizeInBytes", 0),
-                "cpu_time": op.get("totalCpuTime", "N/A"),
-                "raw_input_data_size": op.get("rawInputDataSizeInBytes", 0),
-                "input_positions": op.get("inputPositions", 0),
-                "output_positions": op.get("outputPositions", 0),
-                "wall_time": calculate_total_walltime(op),
+                "name": op.operator_type,
+                "operator_id": op.operator_id,
+                "pipeline_id": op.pipeline,
+                "plan_node_id": op.plan_node_id,
+                "input_data_size": op.input_bytes,
+                "output_data_size": op.output_bytes,
+                "cpu_time": op.raw.get("totalCpuTime", "N/A"),
+                "input_positions": op.input_rows,
+                "output_positions": op.output_rows,
+                "wall_ns": sum(breakdown.values()),
+                "wall_breakdown": breakdown,
             })
 
         stage_info = stage_stats.get(stage_id, {})
@@ -564,77 +173,14 @@ def extract_operators(node: Dict[str, Any], operators: List[Dict] = None, pipeli
     return operators
 
 
-def generate_html(query_plan_json: Dict[str, Any]) -> str:
-    """Generate simple HTML visualization."""
-
-    stages, connections = extract_stages(query_plan_json)
-    query_info = query_plan_json.get("queryStats", {})
-    query_text = query_plan_json.get("query", "N/A")
-    query_id = query_plan_json.get("queryId", "N/A")
-    state = query_plan_json.get("state", "UNKNOWN")
-
-    # Color based on state
-    state_colors = {
-        "FINISHED": "#2ecc71",
-        "RUNNING": "#3498db",
-        "FAILED": "#e74c3c",
-        "CANCELLED": "#95a5a6",
-        "SCHEDULED": "#f39c12",
-        "QUEUED": "#9b59b6",
-    }
-    state_color = state_colors.get(state, "#95a5a6")
-
-    # Build merged operator summary with wall time and stages
-    operator_type_stats = {}  # operator_type -> {wall_time_ns: ..., stages: [...], count: ...}
-
-    for stage in stages:
-        for op in stage["operators"]:
-            op_type = op.get("name", "Unknown")
-            wall_time_str = op.get("wall_time", "0.00ns")
-            wall_time_ns = parse_time_value(wall_time_str)
-            stage_id = stage["stageId"]
-
-            if op_type not in operator_type_stats:
-                operator_type_stats[op_type] = {
-                    "wall_time_ns": 0,
-                    "stages": set(),
-                    "count": 0
-                }
-
-            operator_type_stats[op_type]["wall_time_ns"] += wall_time_ns
-            operator_type_stats[op_type]["stages"].add(stage_id)
-            operator_type_stats[op_type]["count"] += 1
-
-    # Sort by total wall time descending
-    sorted_operator_types = sorted(
-        operator_type_stats.items(),
-        key=lambda x: x[1]["wall_time_ns"],
-        reverse=True
-    )
-
-    # Build merged operator summary HTML
-    operator_summary_html = '<div class="operator-summary">\n    <div class="operator-summary-title">Operators by Type & Wall Time</div>\n    <table class="operator-summary-table">\n        <thead>\n            <tr>\n                <th>Operator Type</th>\n                <th style="text-align: center;">Count</th>\n                <th style="text-align: right;">Total Wall Time</th>\n                <th style="text-align: left;">Stages</th>\n            </tr>\n        </thead>\n        <tbody>\n'
-    for op_type, stats in sorted_operator_types:
-        wall_time_str = format_time(stats["wall_time_ns"])
-        stages_list = sorted(stats["stages"])
-        stages_str = ", ".join(str(s) for s in stages_list)
-        count = stats["count"]
-        operator_summary_html += f'            <tr><td>{op_type}</td><td style="text-align: center;">{count}</td><td style="text-align: right; font-family: monospace;">{wall_time_str}</td><td style="font-family: monospace;">{stages_str}</td></tr>\n'
-    operator_summary_html += '        </tbody>\n    </table>\n</div>\n'
-
-    # Build stage navigation
-    stage_nav_html = '<div class="stage-nav">\n        <div class="stage-nav-title">Stages</div>\n        <div class="stage-nav-list">\n'
-    for stage in stages:
-        stage_nav_html += f'            <a href="#stage-{stage["stageId"]}" class="stage-nav-link">Stage {stage["planId"]}</a>\n'
-    stage_nav_html += '        </div>\n    </div>\n'
-
-    # Build stages HTML
-    stages_html = ""
+def _stage_html_chunks(stages: List[Dict[str, Any]], connections: Dict[tuple, list],
+                       operator_types: Dict[tuple, str], state_color: str, highlight: set):
+    """Yield the HTML of each stage piece by piece so callers can stream it."""
     for idx, stage in enumerate(stages):
         stats = stage["stats"]
 
         # Stage header
-        stages_html += f"""
+        yield f"""
         <div class="stage" id="stage-{stage['stageId']}">
             <div class="stage-header" style="background-color: {state_color}">
                 <div class="stage-title">
@@ -684,16 +230,9 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
                 pipelines[pipeline_id] = []
             pipelines[pipeline_id].append(op)
 
-        # Build operator type lookup map for all operators in all stages
-        operator_type_map = {}  # (stage_id, pipeline_id, operator_id) -> operator_type
-        for s in stages:
-            for op in s.get("operators", []):
-                key = (s["stageId"], op.get("pipeline_id", 0), op.get("operator_id", "?"))
-                operator_type_map[key] = op.get("name", "Unknown")
-
         # Display pipelines in order
         for pipeline_id in sorted(pipelines.keys()):
-            stages_html += f"""
+            yield f"""
                     <div class="pipeline">
                         <div class="pipeline-header">Pipeline {pipeline_id}</div>
             """
@@ -712,13 +251,12 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
                 input_size = op.get("input_data_size", 0)
                 output_size = op.get("output_data_size", 0)
                 cpu_time = op.get("cpu_time", "N/A")
-                wall_time = op.get("wall_time", "0.00ns")
-                raw_input_size = op.get("raw_input_data_size", 0)
+                wall_ns = op.get("wall_ns", 0.0)
                 input_positions = op.get("input_positions", 0)
                 output_positions = op.get("output_positions", 0)
 
                 # Only show stats if we have meaningful data
-                if input_size > 0 or output_size > 0 or cpu_time != "N/A" or wall_time != "0.00ns":
+                if input_size > 0 or output_size > 0 or cpu_time != "N/A" or wall_ns > 0:
                     stats_html = f"""
                     <div class="operator-stats">
                         <div class="stat-row">
@@ -731,7 +269,11 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
                         </div>
                         <div class="stat-row">
                             <span class="stat-label">Wall Time:</span>
-                            <span class="stat-value">{wall_time}</span>
+                            <span class="stat-value">{format_time(wall_ns)}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span class="stat-label">Active / Blocked In / Out / Finish:</span>
+                            <span class="stat-value">{" / ".join(format_time(op["wall_breakdown"][c]) for c in WALL_COMPONENTS)}</span>
                         </div>
                     </div>
                     """
@@ -747,7 +289,7 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
 
                         # Look up the operator type for the linked operator
                         linked_key = (linked_stage, linked_pipeline, linked_op_id)
-                        linked_op_type = operator_type_map.get(linked_key, "Unknown")
+                        linked_op_type = operator_types.get(linked_key, "Unknown")
 
                         # Determine link symbol and text based on direction and stage
                         if direction == 'forward':
@@ -763,8 +305,9 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
 
                         connection_html += f'<div class="operator-link {link_class}"><a href="#{anchor_id}">{link_text}</a></div>'
 
-                stages_html += f"""
-                        <div class="operator" id="stage-{stage_id}-p{pipeline_id}-op-{operator_id}">
+                operator_class = "operator critical" if (stage_id, pipeline_id, operator_id) in highlight else "operator"
+                yield f"""
+                        <div class="{operator_class}" id="stage-{stage_id}-p{pipeline_id}-op-{operator_id}">
                             <div class="operator-header">
                                 <div class="operator-name">{op_type} <span class="operator-ids">[{stage_id}, {pipeline_id}, {operator_id}]</span></div>
                                 <span class="operator-num">Op {operator_id}</span>
@@ -775,11 +318,11 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
                         </div>
                 """
 
-            stages_html += """
+            yield """
                     </div>
             """
 
-        stages_html += """
+        yield """
                 </div>
             </div>
         </div>
@@ -787,7 +330,315 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
 
         # Add arrow between stages (except after last stage)
         if idx < len(stages) - 1:
-            stages_html += '<div class="stage-arrow">↓</div>'
+            yield '<div class="stage-arrow">↓</div>'
+
+
+
+# Renderer for write_html(compact=True): builds the same stage/operator markup
+# as _stage_html_chunks from the embedded model, one stage at a time on expand
+# and one batch of operators at a time as they scroll into view.
+COMPACT_RENDERER = r"""
+        <style>
+            .stage.collapsed .stage-content { display: none; }
+            .stage-header { cursor: pointer; }
+            .stage-toggle { font-size: 12px; opacity: 0.9; }
+            .operator-more { height: 1px; }
+        </style>
+        <script>
+        (function () {
+            const model = JSON.parse(document.getElementById("plan-model").textContent);
+            const BATCH = 50;
+            const container = document.querySelector("main .stages");
+            const stages = {};
+
+            function esc(v) {
+                return String(v).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})[c]);
+            }
+            function size(b) {
+                if (!b) return "0B";
+                const units = ["B", "KB", "MB", "GB", "TB", "PB"];
+                for (const u of units) { if (b < 1024) return b.toFixed(2) + u; b /= 1024; }
+                return b.toFixed(2) + "PB";
+            }
+            function rows(r) {
+                if (!r) return "0";
+                if (r < 1e3) return String(Math.trunc(r));
+                if (r < 1e6) return (r / 1e3).toFixed(2) + "K";
+                if (r < 1e9) return (r / 1e6).toFixed(2) + "M";
+                return (r / 1e9).toFixed(2) + "B";
+            }
+            function time(ns) {
+                if (!ns) return "0.00ns";
+                const units = [[3.6e12, "h"], [6e10, "m"], [1e9, "s"], [1e6, "ms"], [1e3, "us"], [1, "ns"]];
+                for (const [d, u] of units) { if (ns >= d) return (ns / d).toFixed(2) + u; }
+                return ns.toFixed(2) + "ns";
+            }
+            function statRow(label, value) {
+                return '<div class="stat-row"><span class="stat-label">' + label + '</span><span class="stat-value">' + value + '</span></div>';
+            }
+            function operatorHtml(stage, pipelineId, op) {
+                const [opId, type, node, inBytes, inRows, outBytes, outRows, wall, breakdown, flags, links] = op;
+                let html = '<div class="operator' + (flags & 2 ? ' critical' : '') + '" id="stage-' + stage.id + '-p' + pipelineId + '-op-' + opId + '">'
+                    + '<div class="operator-header"><div class="operator-name">' + esc(model.types[type])
+                    + ' <span class="operator-ids">[' + stage.id + ', ' + pipelineId + ', ' + opId + ']</span></div>'
+                    + '<span class="operator-num">Op ' + opId + '</span></div>'
+                    + '<div class="operator-details"><span class="operator-node-label">Node ' + esc(node) + '</span></div>';
+                if (flags & 1) {
+                    html += '<div class="operator-stats">'
+                        + statRow("Input:", size(inBytes) + " / " + rows(inRows) + " rows")
+                        + statRow("Output:", size(outBytes) + " / " + rows(outRows) + " rows")
+                        + statRow("Wall Time:", time(wall))
+                        + statRow("Active / Blocked In / Out / Finish:", breakdown.map(time).join(" / "))
+                        + '</div>';
+                }
+                for (const [s, p, o, forward, linkedType] of links) {
+                    html += '<div class="operator-link ' + (forward ? 'operator-link-forward' : 'operator-link-reverse') + '">'
+                        + '<a href="#stage-' + s + '-p' + p + '-op-' + o + '">' + (forward ? "→" : "←")
+                        + ' Stage ' + s + ', Pipeline ' + p + ', Op ' + o + ' (' + esc(model.types[linkedType]) + ')</a></div>';
+                }
+                return html + '</div>';
+            }
+
+            // Append the next batch of a pipeline's operators; returns false once all are shown
+            function renderBatch(entry, pipeline) {
+                const [pipelineId, ops] = entry.stage.pipelines[pipeline.index];
+                const end = Math.min(pipeline.shown + BATCH, ops.length);
+                let html = "";
+                for (let i = pipeline.shown; i < end; i++) html += operatorHtml(entry.stage, pipelineId, ops[i]);
+                pipeline.sentinel.insertAdjacentHTML("beforebegin", html);
+                pipeline.shown = end;
+                if (end >= ops.length) { observer.unobserve(pipeline.sentinel); pipeline.sentinel.remove(); return false; }
+                return true;
+            }
+
+            const observer = new IntersectionObserver(items => {
+                for (const item of items) {
+                    // Re-observing re-checks the sentinel, so batches keep coming while it stays in view
+                    if (item.isIntersecting && renderBatch(item.target._entry, item.target._pipeline)) {
+                        observer.unobserve(item.target);
+                        observer.observe(item.target);
+                    }
+                }
+            }, {rootMargin: "600px"});
+
+            function expand(entry) {
+                entry.el.classList.remove("collapsed");
+                entry.el.querySelector(".stage-toggle").textContent = "▾";
+                if (entry.pipelines) return;
+                const content = entry.el.querySelector(".stage-content");
+                const st = entry.stage.stats;
+                content.innerHTML = '<div class="stage-stats">' + statRow("CPU Time:", st[0]) + statRow("Memory:", st[1])
+                    + statRow("Splits (Q/R/F):", st[2]) + statRow("Input:", st[3]) + statRow("Output:", st[4])
+                    + statRow("Buffered:", st[5]) + '</div><div class="operators"><div class="operators-label">Pipelines & Operators:</div></div>';
+                const operators = content.querySelector(".operators");
+                entry.pipelines = entry.stage.pipelines.map(([pipelineId], index) => {
+                    const box = document.createElement("div");
+                    box.className = "pipeline";
+                    box.innerHTML = '<div class="pipeline-header">Pipeline ' + pipelineId + '</div><div class="operator-more"></div>';
+                    operators.appendChild(box);
+                    const pipeline = {index: index, shown: 0, sentinel: box.lastChild};
+                    pipeline.sentinel._entry = entry;
+                    pipeline.sentinel._pipeline = pipeline;
+                    if (renderBatch(entry, pipeline)) observer.observe(pipeline.sentinel);
+                    return pipeline;
+                });
+            }
+
+            // Make sure the element behind an anchor exists before the browser scrolls to it
+            function reveal(id) {
+                const match = /^stage-(.+?)(?:-p(\d+)-op-(.+))?$/.exec(id);
+                const entry = match && stages[match[1]];
+                if (!entry) return;
+                expand(entry);
+                if (match[2] === undefined) return;
+                const index = entry.stage.pipelines.findIndex(([pipelineId]) => String(pipelineId) === match[2]);
+                const pipeline = entry.pipelines[index];
+                while (pipeline && !document.getElementById(id) && renderBatch(entry, pipeline)) {}
+            }
+
+            let html = "";
+            model.stages.forEach((stage, idx) => {
+                const count = stage.pipelines.reduce((n, [, ops]) => n + ops.length, 0);
+                html += '<div class="stage collapsed" id="stage-' + stage.id + '">'
+                    + '<div class="stage-header" style="background-color: ' + model.color + '">'
+                    + '<div class="stage-title"><span class="stage-toggle">▸</span> <strong>Stage ' + esc(stage.plan) + '</strong> '
+                    + '<span class="state-badge">' + esc(stage.state) + '</span></div>'
+                    + '<div class="stage-id">ID: ' + stage.id + ' &middot; ' + count + ' operators</div></div>'
+                    + '<div class="stage-content"></div></div>';
+                if (idx < model.stages.length - 1) html += '<div class="stage-arrow">↓</div>';
+            });
+            container.innerHTML = html;
+            for (const stage of model.stages) {
+                const el = document.getElementById("stage-" + stage.id);
+                stages[String(stage.id)] = {stage: stage, el: el};
+                el.querySelector(".stage-header").addEventListener("click", () => {
+                    const entry = stages[String(stage.id)];
+                    if (entry.el.classList.contains("collapsed")) { expand(entry); }
+                    else { entry.el.classList.add("collapsed"); entry.el.querySelector(".stage-toggle").textContent = "▸"; }
+                });
+            }
+
+            document.addEventListener("click", event => {
+                const link = event.target.closest('a[href^="#stage-"]');
+                if (link) reveal(link.getAttribute("href").slice(1));
+            });
+            window.addEventListener("hashchange", () => reveal(location.hash.slice(1)));
+            if (location.hash) {
+                const id = location.hash.slice(1);
+                reveal(id);
+                const target = document.getElementById(id);
+                if (target) target.scrollIntoView();
+            }
+        })();
+        </script>
+"""
+
+
+def compact_plan_model(stages: List[Dict[str, Any]], connections: Dict[tuple, list],
+                       operator_types: Dict[tuple, str], state_color: str, highlight: set) -> Dict[str, Any]:
+    """
+    The stage/operator model behind the compact page: operator types are
+    interned, stage stats pre-formatted and every operator is one array
+    [id, type, node, in bytes, in rows, out bytes, out rows, wall ns,
+    [active, blocked in, blocked out, finish], flags, links] in display order.
+    flags bit 1: show stats, bit 2: highlighted; links are
+    [stage, pipeline, operator, forward, type].
+    """
+    types = {}
+
+    def intern(name):
+        return types.setdefault(name, len(types))
+
+    model_stages = []
+    for stage in stages:
+        stats = stage["stats"]
+        pipelines = {}
+        for op in stage["operators"]:
+            pipelines.setdefault(op.get("pipeline_id", 0), []).append(op)
+        model_pipelines = []
+        for pipeline_id in sorted(pipelines.keys()):
+            ops = []
+            for op in reversed(pipelines[pipeline_id]):
+                key = (stage["stageId"], pipeline_id, op.get("operator_id", "?"))
+                wall_ns = op.get("wall_ns", 0.0)
+                show_stats = (op.get("input_data_size", 0) > 0 or op.get("output_data_size", 0) > 0
+                              or op.get("cpu_time", "N/A") != "N/A" or wall_ns > 0)
+                links = [[s, p, o, 1 if direction == "forward" else 0, intern(operator_types.get((s, p, o), "Unknown"))]
+                         for (s, p, o), direction in connections.get(key, [])]
+                ops.append([key[2], intern(op.get("name", "Unknown")), op.get("plan_node_id", "N/A"),
+                            op.get("input_data_size", 0), op.get("input_positions", 0),
+                            op.get("output_data_size", 0), op.get("output_positions", 0),
+                            wall_ns, [op["wall_breakdown"][c] for c in WALL_COMPONENTS],
+                            (1 if show_stats else 0) | (2 if key in highlight else 0), links])
+            model_pipelines.append([pipeline_id, ops])
+        model_stages.append({
+            "id": stage["stageId"],
+            "plan": stage["planId"],
+            "state": stage["state"],
+            "stats": [
+                str(stats.get('totalCpuTime', 'N/A')),
+                format_data_size(stats.get('userMemoryReservationInBytes', 0)),
+                f"{stats.get('queuedDrivers', 0)}/{stats.get('runningDrivers', 0)}/{stats.get('completedDrivers', 0)}",
+                f"{format_data_size(stats.get('rawInputDataSizeInBytes', 0))} / {format_rows(stats.get('rawInputPositions', 0))} rows",
+                f"{format_data_size(stats.get('outputDataSizeInBytes', 0))} / {format_rows(stats.get('outputPositions', 0))} rows",
+                format_data_size(stats.get('bufferedDataSizeInBytes', 0)),
+            ],
+            "pipelines": model_pipelines,
+        })
+    return {"color": state_color, "types": list(types), "stages": model_stages}
+
+
+def write_breakdown_csv(query_plan_json: Dict[str, Any], output_path: Path) -> None:
+    """Write every operator's wall time breakdown (milliseconds) to CSV."""
+    ops = load_operators(query_plan_json)
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["stage", "pipeline", "operator_id", "operator", "plan_node_id"]
+                        + [f"{c}_ms" for c in WALL_COMPONENTS] + ["total_ms"])
+        for op in sorted(ops, key=lambda o: (str(o.stage), o.pipeline, o.operator_id or 0)):
+            breakdown = op.wall_breakdown()
+            writer.writerow([op.stage, op.pipeline, op.operator_id, op.operator_type, op.plan_node_id]
+                            + [f"{breakdown[c] / 1e6:.3f}" for c in WALL_COMPONENTS]
+                            + [f"{sum(breakdown.values()) / 1e6:.3f}"])
+
+
+def generate_html(query_plan_json: Dict[str, Any], sections: List[str] = None,
+                  highlight: set = None, rank_by: str = "active", compact: bool = False) -> str:
+    """Generate simple HTML visualization."""
+    buffer = io.StringIO()
+    write_html(buffer, query_plan_json, sections, highlight, rank_by, compact)
+    return buffer.getvalue()
+
+
+def write_html(out, query_plan_json: Dict[str, Any], sections: List[str] = None,
+               highlight: set = None, rank_by: str = "active", compact: bool = False) -> None:
+    """
+    Stream the HTML visualization to a text file object.
+
+    sections are extra HTML blocks (analysis reports) placed below the operator
+    summary; highlight is a set of (stage, pipeline, operator) keys whose
+    operator boxes get the 'critical' style; rank_by orders the operator
+    summary by 'active' or 'total' wall time. compact embeds the stages as
+    JSON (compact_plan_model) and renders them in the browser, collapsed until
+    opened or linked to, instead of writing every operator box.
+    """
+    sections = sections or []
+    highlight = highlight or set()
+
+    graph = PlanGraph(query_plan_json)
+    stages, connections = extract_stages(query_plan_json, graph)
+    query_info = query_plan_json.get("queryStats", {})
+    query_text = query_plan_json.get("query", "N/A")
+    query_id = query_plan_json.get("queryId", "N/A")
+    state = query_plan_json.get("state", "UNKNOWN")
+
+    # Color based on state
+    state_colors = {
+        "FINISHED": "#2ecc71",
+        "RUNNING": "#3498db",
+        "FAILED": "#e74c3c",
+        "CANCELLED": "#95a5a6",
+        "SCHEDULED": "#f39c12",
+        "QUEUED": "#9b59b6",
+    }
+    state_color = state_colors.get(state, "#95a5a6")
+
+    # Build merged operator summary with the wall time breakdown and stages
+    operator_type_stats = {}  # operator_type -> {active: ..., ..., total: ..., stages: {...}, count: ...}
+
+    for stage in stages:
+        for op in stage["operators"]:
+            op_type = op.get("name", "Unknown")
+            stats = operator_type_stats.setdefault(op_type, dict(
+                {component: 0.0 for component in WALL_COMPONENTS}, total=0.0, stages=set(), count=0))
+            for component in WALL_COMPONENTS:
+                stats[component] += op["wall_breakdown"][component]
+            stats["total"] += op.get("wall_ns", 0.0)
+            stats["stages"].add(stage["stageId"])
+            stats["count"] += 1
+
+    # Rank by active time (real work) unless asked for total wall time
+    sorted_operator_types = sorted(
+        operator_type_stats.items(),
+        key=lambda x: x[1][rank_by],
+        reverse=True
+    )
+
+    # Build merged operator summary HTML
+    title = "Operators by Type & Active Time" if rank_by == "active" else "Operators by Type & Wall Time"
+    operator_summary_html = f'<div class="operator-summary">\n    <div class="operator-summary-title">{title}</div>\n    <table class="operator-summary-table">\n        <thead>\n            <tr>\n                <th>Operator Type</th>\n                <th style="text-align: center;">Count</th>\n                <th style="text-align: right;">Active</th>\n                <th style="text-align: right;">Blocked on Input</th>\n                <th style="text-align: right;">Blocked on Output</th>\n                <th style="text-align: right;">Finish</th>\n                <th style="text-align: right;">Total Wall Time</th>\n                <th style="text-align: left;">Stages</th>\n            </tr>\n        </thead>\n        <tbody>\n'
+    for op_type, stats in sorted_operator_types:
+        stages_str = ", ".join(str(s) for s in sorted(stats["stages"]))
+        times = "".join(f'<td style="text-align: right; font-family: monospace;">{format_time(stats[c])}</td>'
+                        for c in WALL_COMPONENTS + ["total"])
+        operator_summary_html += f'            <tr><td>{op_type}</td><td style="text-align: center;">{stats["count"]}</td>{times}<td style="font-family: monospace; text-align: left;">{stages_str}</td></tr>\n'
+    operator_summary_html += '        </tbody>\n    </table>\n</div>\n'
+
+    # Build stage navigation
+    stage_nav_html = '<div class="stage-nav">\n        <div class="stage-nav-title">Stages</div>\n        <div class="stage-nav-list">\n'
+    for stage in stages:
+        stage_nav_html += f'            <a href="#stage-{stage["stageId"]}" class="stage-nav-link">Stage {stage["planId"]}</a>\n'
+    stage_nav_html += '        </div>\n    </div>\n'
 
     # Build summary stats (merged operator summary is now above stages)
     summary_html = f"""
@@ -805,7 +656,7 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
     </div>
     """
 
-    html = f"""<!DOCTYPE html>
+    out.write(f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -1061,6 +912,11 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
             margin-bottom: 8px;
         }}
 
+        .operator.critical {{
+            border-left: 3px solid #e74c3c;
+            background: #fdf2f1;
+        }}
+
         .operator:last-child {{
             margin-bottom: 0;
         }}
@@ -1431,12 +1287,23 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
             <div class="query-text"><strong>Query:</strong> {query_text}</div>
             {summary_html}
             {operator_summary_html}
+            {"".join(sections)}
         </header>
 
         <main>
             {stage_nav_html}
             <div class="stages">
-                {stages_html}
+                """)
+    if compact:
+        model = compact_plan_model(stages, connections, graph.operator_types, state_color, highlight)
+        out.write('<script type="application/json" id="plan-model">')
+        out.write(json.dumps(model, separators=(",", ":")).replace("</", "<\\/"))
+        out.write('</script>')
+        out.write(COMPACT_RENDERER)
+    else:
+        for chunk in _stage_html_chunks(stages, connections, graph.operator_types, state_color, highlight):
+            out.write(chunk)
+    out.write(f"""
             </div>
         </main>
 
@@ -1446,9 +1313,207 @@ def generate_html(query_plan_json: Dict[str, Any]) -> str:
     </div>
 </body>
 </html>
-"""
+""")
+
+
+ANALYSIS_FLAGS = ["critical_path", "gpu_coverage", "exchange", "skew", "memory", "timeline", "drivers", "cardinality",
+                  "joins", "latency"]
+
+# Directory mode: hash of the options the HTML files in an output directory were rendered with
+OPTIONS_STAMP = ".render_options"
+
+
+def build_analysis_sections(query_plan: Dict[str, Any], name: str, options: Dict[str, Any],
+                            verbose: bool = True) -> tuple:
+    """Run the analyses enabled in options; return (HTML sections, highlighted operator keys)."""
+    sections = []
+    highlight = set()
+    if options.get("critical_path"):
+        from critical_path import compute_critical_path, critical_path_html, critical_keys, print_critical_path
+        result = compute_critical_path(query_plan)
+        if verbose:
+            print_critical_path(result)
+        sections.append(critical_path_html(result))
+        highlight = critical_keys(result)
+    if options.get("gpu_coverage"):
+        from gpu_coverage import analyze_query, gpu_coverage_html
+        coverage = analyze_query(query_plan, name)
+        if verbose:
+            print(f"GPU coverage: {coverage['gpu_wall_share'] * 100:.1f}% of active wall, "
+                  f"{coverage['gpu_rows_share'] * 100:.1f}% of rows, {len(coverage['boundaries'])} fallback boundaries",
+                  file=sys.stderr)
+        sections.append(gpu_coverage_html(coverage))
+    if options.get("exchange"):
+        from exchange_throughput import analyze_exchanges, exchange_html
+        sections.append(exchange_html(analyze_exchanges(query_plan, name)))
+    if options.get("skew"):
+        from task_skew import analyze_skew, skew_html
+        sections.append(skew_html(analyze_skew(query_plan)))
+    if options.get("memory"):
+        from memory_pressure import DEFAULT_CONFIG, analyze_memory, load_limits, memory_html
+        result = analyze_memory(query_plan, load_limits(Path(options.get("worker_config") or DEFAULT_CONFIG)), name=name)
+        if verbose:
+            for w in result["warnings"]:
+                print(f"Memory: {w['node']} at {w['usage'] * 100:.0f}% of {w['limit']}", file=sys.stderr)
+        sections.append(memory_html(result))
+    if options.get("timeline"):
+        from stage_timeline import collect_timeline, timeline_html
+        sections.append(timeline_html(collect_timeline(query_plan)))
+    if options.get("drivers"):
+        from driver_parallelism import analyze_parallelism, configured_drivers, parallelism_html
+        worker_config = Path(options["worker_config"]) if options.get("worker_config") else None
+        max_drivers = options.get("max_drivers") or configured_drivers(query_plan, name, worker_config)
+        sections.append(parallelism_html(analyze_parallelism(query_plan, max_drivers, name)))
+    if options.get("cardinality"):
+        from cardinality import analyze_cardinality, cardinality_html
+        result = analyze_cardinality(query_plan, name=name)
+        if verbose:
+            print(f"Cardinality: {len(result['flagged'])} of {result['compared']} plan nodes off by more than "
+                  f"{result['threshold']:.0f}x", file=sys.stderr)
+        sections.append(cardinality_html(result))
+    if options.get("joins"):
+        from join_shape import analyze_joins, joins_html, memory_limits
+        from memory_pressure import DEFAULT_CONFIG
+        limits = memory_limits(Path(options.get("worker_config") or DEFAULT_CONFIG), options.get("gpu_memory"))
+        result = analyze_joins(query_plan, limits, name=name)
+        if verbose:
+            for j in result["flagged"]:
+                print(f"Joins: stage {j['stage']} node {j['node']} holds {format_data_size(j['build_held_bytes'])} "
+                      f"in its build ({', '.join(j['flagged'])})", file=sys.stderr)
+        sections.append(joins_html(result))
+    if options.get("latency"):
+        from latency_breakdown import latency_breakdown, latency_html
+        result = latency_breakdown(query_plan, name)
+        if verbose:
+            print(f"Latency: {result['overhead_share'] * 100:.0f}% of {format_time(result['elapsed_ns'])} "
+                  f"outside execution", file=sys.stderr)
+        sections.append(latency_html(result))
+    return sections, highlight
+
+
+def query_summary(query_plan: Dict[str, Any], top: int = 3) -> Dict[str, Any]:
+    """Elapsed time, state and top operators by active time, for index pages."""
+    query_stats = query_plan.get("queryStats", {})
+    by_type = {}
+    for op in load_operators(query_plan):
+        by_type[op.operator_type] = by_type.get(op.operator_type, 0.0) + op.wall_breakdown()["active"]
+    query_text = query_plan.get("query", "") or ""
+    return {
+        "query_id": query_plan.get("queryId", "N/A"),
+        "state": query_plan.get("state", "UNKNOWN"),
+        "elapsed_ns": parse_time_value(query_stats.get("elapsedTime") or "0ns"),
+        "query": next((line.strip() for line in query_text.splitlines() if line.strip()), ""),
+        "top_operators": sorted(by_type.items(), key=lambda kv: -kv[1])[:top],
+    }
 
-    return html
+
+def _render_job(job: tuple) -> Dict[str, Any]:
+    """Render one query JSON unless its HTML is up to date; runs in a pool worker."""
+    input_path, output_path, options, force = job
+    input_path, output_path = Path(input_path), Path(output_path)
+    try:
+        query_plan = read_json(input_path)
+    except (IOError, json.JSONDecodeError) as e:
+        return {"input": str(input_path), "error": str(e)}
+    if "queryStats" not in query_plan:
+        return {"input": str(input_path), "error": "not a query info (no queryStats)"}
+
+    up_to_date = output_path.exists() and output_path.stat().st_mtime >= input_path.stat().st_mtime
+    if force or not up_to_date:
+        sections, highlight = build_analysis_sections(query_plan, input_path.stem, options, verbose=False)
+        with open(output_path, "w") as f:
+            write_html(f, query_plan, sections=sections, highlight=highlight, rank_by=options.get("rank_by", "active"),
+                       compact=options.get("compact", False))
+    return dict(query_summary(query_plan), input=str(input_path), output=str(output_path),
+                rendered=force or not up_to_date)
+
+
+def write_index_html(summaries: List[Dict[str, Any]], index_path: Path) -> None:
+    """Index page linking every rendered query with elapsed time, state and top operators."""
+    state_colors = {"FINISHED": "#2ecc71", "FAILED": "#e74c3c", "RUNNING": "#3498db"}
+    rows = []
+    for s in summaries:
+        link = os.path.relpath(s["output"], index_path.parent)
+        top = "<br>".join(f"{name} ({format_time(ns)})" for name, ns in s["top_operators"])
+        rows.append(f'<tr><td><a href="{html.escape(link)}">{html.escape(Path(s["input"]).stem)}</a></td>'
+                    f'<td style="font-family: monospace;">{html.escape(s["query_id"])}</td>'
+                    f'<td><span class="state" style="background-color: {state_colors.get(s["state"], "#95a5a6")}">{s["state"]}</span></td>'
+                    f'<td style="text-align: right; font-family: monospace;">{format_time(s["elapsed_ns"])}</td>'
+                    f'<td style="font-family: monospace;">{top}</td>'
+                    f'<td class="query">{html.escape(s["query"][:120])}</td></tr>')
+    total_ns = sum(s["elapsed_ns"] for s in summaries)
+    with open(index_path, "w") as f:
+        f.write(f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Query Plans - {html.escape(str(index_path.parent))}</title>
+    <style>
+        body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+               background: #f5f5f5; color: #333; padding: 20px; }}
+        .container {{ max-width: 1600px; margin: 0 auto; background: white; padding: 20px; border-radius: 4px; }}
+        h1 {{ font-size: 20px; margin-bottom: 8px; }}
+        .summary {{ margin-bottom: 16px; color: #666; }}
+        table {{ width: 100%; border-collapse: collapse; font-size: 13px; }}
+        th {{ background: #f5f5f5; border-bottom: 2px solid #ddd; padding: 8px; text-align: left; }}
+        td {{ border-bottom: 1px solid #eee; padding: 6px 8px; vertical-align: top; }}
+        .state {{ color: white; padding: 2px 8px; border-radius: 3px; font-size: 11px; }}
+        .query {{ color: #666; font-family: monospace; font-size: 12px; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Query Plans</h1>
+        <div class="summary">{len(summaries)} queries &middot; total elapsed {format_time(total_ns)}</div>
+        <table>
+            <thead><tr><th>File</th><th>Query ID</th><th>State</th><th style="text-align: right;">Elapsed</th>
+                <th>Top Operators (active time)</th><th>Query</th></tr></thead>
+            <tbody>
+{chr(10).join(rows)}
+            </tbody>
+        </table>
+    </div>
+</body>
+</html>
+""")
+
+
+def options_hash(options: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def render_directory(input_dir: Path, output_dir: Path, options: Dict[str, Any],
+                     jobs: int = None, force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Render every query JSON in input_dir on a process pool and write index.html.
+
+    An HTML file is reused when it is newer than its JSON and the directory
+    was last rendered with the same options (recorded in OPTIONS_STAMP);
+    different analysis flags re-render everything.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp_path = output_dir / OPTIONS_STAMP
+    stamp = options_hash(options)
+    if not force and (not stamp_path.exists() or stamp_path.read_text().strip() != stamp):
+        force = True
+    inputs = sorted(input_dir.glob("*.json"))
+    work = [(str(p), str(output_dir / f"{p.stem}_simple.html"), options, force) for p in inputs]
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(work)))
+    if workers == 1:
+        results = [_render_job(job) for job in work]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_render_job, work)
+
+    summaries = []
+    for result in results:
+        if "error" in result:
+            print(f"✗ Skipped {result['input']}: {result['error']}", file=sys.stderr)
+        else:
+            summaries.append(result)
+    write_index_html(summaries, output_dir / "index.html")
+    stamp_path.write_text(stamp + "\n")
+    return summaries
 
 
 def main():
@@ -1459,11 +1524,74 @@ def main():
 Examples:
   %(prog)s order_nex_query_2026_02_09.json
   %(prog)s order_nex_query_2026_02_09.json --output plan.html
+  %(prog)s order_nex_query_2026_02_09.json --breakdown-csv operators.csv
+  %(prog)s order_nex_query_2026_02_09.json --compact
+  %(prog)s order_nex_query_2026_02_09.json --critical-path
+  %(prog)s order_nex_query_2026_02_09.json --gpu-coverage
+  %(prog)s order_nex_query_2026_02_09.json --exchange
+  %(prog)s order_nex_query_2026_02_09.json --skew
+  %(prog)s order_nex_query_2026_02_09.json --memory --worker-config ../configs/worker_configs/
+  %(prog)s order_nex_query_2026_02_09.json --timeline
+  %(prog)s ex_sf1000_q9_2drivers.json --drivers
+  %(prog)s order_nex_query_2026_02_09.json --cardinality
+  %(prog)s order_nex_query_2026_02_09.json --joins --gpu-memory 80GB
+  %(prog)s order_nex_query_2026_02_09.json --latency
+  %(prog)s order_nex_query_2026_02_09.json --flamegraph q9_flame --flame-weight cpu
+  %(prog)s order_nex_query_2026_02_09.json --trace q9.trace.json
+  %(prog)s with_local_exchange_opt.json --diff no_local_exchange_opt.json
+  %(prog)s query_metrics_dir/ -o plans/ --critical-path
         """
     )
 
-    parser.add_argument("input", help="Path to query plan JSON file")
-    parser.add_argument("-o", "--output", help="Output HTML file")
+    parser.add_argument("input", help="Path to query plan JSON file, or a directory of them")
+    parser.add_argument("-o", "--output", help="Output HTML file (output directory in directory mode)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Directory mode: number of worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="Directory mode: re-render even if the HTML is newer than the JSON and was "
+                             "rendered with the same options (e.g. after changing --worker-config's file)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Embed the plan as JSON and render stages in the browser on demand (for large plans)")
+    parser.add_argument("--rank-by", choices=["active", "total"], default="active",
+                        help="Rank the operator summary by active (default) or total wall time")
+    parser.add_argument("--breakdown-csv", metavar="CSV",
+                        help="Also write each operator's active/blocked/finish wall time breakdown to CSV")
+    parser.add_argument("--critical-path", action="store_true",
+                        help="Highlight the critical path and report each operator's share of execution time")
+    parser.add_argument("--gpu-coverage", action="store_true",
+                        help="Add GPU/CPU/conversion shares and CPU-fallback boundaries")
+    parser.add_argument("--exchange", action="store_true",
+                        help="Add per stage edge exchange throughput and blocking")
+    parser.add_argument("--skew", action="store_true",
+                        help="Add per-stage task skew metrics and straggler tasks")
+    parser.add_argument("--memory", action="store_true",
+                        help="Add peak memory per node, stage and operator against the worker memory limits")
+    parser.add_argument("--timeline", action="store_true",
+                        help="Add a stage/task Gantt timeline with stage overlap and join build/probe pipelining")
+    parser.add_argument("--drivers", action="store_true",
+                        help="Add per-pipeline driver counts, split sizes and parallelism against the configured drivers")
+    parser.add_argument("--cardinality", action="store_true",
+                        help="Add optimizer row estimates against actual rows per plan node, join inputs first")
+    parser.add_argument("--joins", action="store_true",
+                        help="Add per join build/probe sizes, distribution and build memory against the memory limits")
+    parser.add_argument("--latency", action="store_true",
+                        help="Add a latency waterfall: queued, planning, scheduling, execution, client fetch, finishing")
+    parser.add_argument("--gpu-memory", metavar="SIZE",
+                        help="--joins: GPU memory per worker, e.g. 80GB")
+    parser.add_argument("--max-drivers", type=int,
+                        help="--drivers: configured task.max-drivers-per-task (default: detect)")
+    parser.add_argument("--worker-config", metavar="PATH",
+                        help="--memory/--drivers/--joins: worker config.properties or directory of them "
+                             "(default: configs/templates/config.properties.template)")
+    parser.add_argument("--flamegraph", metavar="PREFIX",
+                        help="Also write <PREFIX>.folded and <PREFIX>.speedscope.json flame graphs "
+                             "(merged over all queries in directory mode)")
+    parser.add_argument("--flame-weight", choices=["wall", "cpu"], default="wall",
+                        help="--flamegraph: weight by wall (default) or CPU time")
+    parser.add_argument("--trace", metavar="TRACE_JSON",
+                        help="Also write a Chrome Trace Event JSON of task/pipeline execution (open in Perfetto)")
+    parser.add_argument("--diff", metavar="OTHER_JSON",
+                        help="Render an operator-level diff of input (before) against OTHER_JSON (after)")
 
     args = parser.parse_args()
 
@@ -1473,13 +1601,65 @@ Examples:
         print(f"Error: Input file not found: {input_path}", file=sys.stderr)
         sys.exit(1)
 
+    options = {flag: getattr(args, flag) for flag in ANALYSIS_FLAGS}
+    options["rank_by"] = args.rank_by
+    options["compact"] = args.compact
+    options["worker_config"] = args.worker_config
+    options["max_drivers"] = args.max_drivers
+    options["gpu_memory"] = parse_data_size(args.gpu_memory) if args.gpu_memory else None
+
+    if input_path.is_dir():
+        if args.diff or args.breakdown_csv or args.trace:
+            parser.error("--diff, --breakdown-csv and --trace take a single query JSON, not a directory")
+        output_dir = Path(args.output) if args.output else input_path
+        start = time.perf_counter()
+        summaries = render_directory(input_path, output_dir, options, args.jobs, args.force)
+        rendered = sum(1 for s in summaries if s["rendered"])
+        print(f"✓ Rendered {rendered} of {len(summaries)} queries ({len(summaries) - rendered} up to date) in "
+              f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+        print(f"✓ Index saved to: {output_dir / 'index.html'}", file=sys.stderr)
+        if args.flamegraph:
+            from flamegraph import export_flamegraphs
+            queries = []
+            for json_path in sorted(input_path.glob("*.json")):
+                try:
+                    query_info = read_json(json_path)
+                except (IOError, json.JSONDecodeError):
+                    continue  # already reported by render_directory
+                if isinstance(query_info, dict) and "queryStats" in query_info:
+                    queries.append((json_path.stem, query_info))
+            for path in export_flamegraphs(queries, args.flamegraph, args.flame_weight):
+                print(f"✓ Flame graph saved to: {path}", file=sys.stderr)
+        return
+
     try:
-        with open(input_path) as f:
-            query_plan = json.load(f)
+        query_plan = read_json(input_path)
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON file: {e}", file=sys.stderr)
         sys.exit(1)
 
+    if args.diff:
+        from plan_diff import diff_query_infos, generate_diff_html, renumbered_stages
+        other_path = Path(args.diff)
+        try:
+            other_plan = read_json(other_path)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error: Cannot read diff input {other_path}: {e}", file=sys.stderr)
+            sys.exit(1)
+        output_path = Path(args.output) if args.output else \
+            input_path.parent / f"{input_path.stem}_vs_{other_path.stem}_diff.html"
+        print(f"Diffing {input_path} against {other_path}...", file=sys.stderr)
+        diff = diff_query_infos(query_plan, other_plan)
+        html_content = generate_diff_html(query_plan, other_plan, diff, str(input_path), str(other_path))
+        with open(output_path, "w") as f:
+            f.write(html_content)
+        print(f"✓ Diff saved to: {output_path}", file=sys.stderr)
+        if diff["plan_changed"]:
+            print(f"  Plan shape changed: {diff['plans'][0]} -> {diff['plans'][1]}", file=sys.stderr)
+        for a_stage, b_stage in renumbered_stages(diff):
+            print(f"  Stage {a_stage} -> Stage {b_stage}", file=sys.stderr)
+        return
+
     # Determine output path
     if args.output:
         output_path = Path(args.output)
@@ -1488,13 +1668,25 @@ Examples:
 
     # Generate HTML
     print(f"Generating simple visualization from {input_path}...", file=sys.stderr)
-    html_content = generate_html(query_plan)
+    sections, highlight = build_analysis_sections(query_plan, input_path.stem, options)
 
-    # Write output
+    # Stream HTML to the output file
     try:
         with open(output_path, "w") as f:
-            f.write(html_content)
+            write_html(f, query_plan, sections=sections, highlight=highlight, rank_by=args.rank_by, compact=args.compact)
         print(f"✓ Visualization saved to: {output_path}", file=sys.stderr)
+        if args.breakdown_csv:
+            write_breakdown_csv(query_plan, Path(args.breakdown_csv))
+            print(f"✓ Wall time breakdown saved to: {args.breakdown_csv}", file=sys.stderr)
+        if args.flamegraph:
+            from flamegraph import export_flamegraphs
+            for path in export_flamegraphs([(input_path.stem, query_plan)], args.flamegraph, args.flame_weight):
+                print(f"✓ Flame graph saved to: {path}", file=sys.stderr)
+        if args.trace:
+            from chrome_trace import build_trace
+            with open(args.trace, "w") as f:
+                json.dump(build_trace(query_plan, input_path.stem), f)
+            print(f"✓ Chrome trace saved to: {args.trace}", file=sys.stderr)
     except IOError as e:
         print(f"Error: Failed to write output file: {e}", file=sys.stderr)
         sys.exit(1)
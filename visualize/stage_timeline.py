@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Stage and task Gantt timeline of a Presto query.
+
+The visualizer stacks stages vertically, which hides whether they overlap or
+run back to back and how long each waits before its first task starts. This
+module reads the task createTime/firstStartTime/lastEndTime of every stage
+(pipeline first start/last end as a fallback) and renders them as inline SVG:
+
+- one row per stage: a light bar from the first task being created to the
+  first task starting (scheduling wait), a dark bar from first start to last
+  end, and one thin line per task underneath showing the task spread,
+- stage edges (sender stage -> receiving stage) with their overlap in seconds;
+  a negative overlap is a gap where the receiver ran after the sender ended,
+- hash joins with the window of their build and probe pipelines; a probe that
+  only starts after its build ended is flagged as serialized.
+
+Used by query_plan_visualize.py --timeline; standalone:
+
+    python stage_timeline.py query.json -o timeline.svg
+"""
+
+import argparse
+import html
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from critical_path import collect_pipeline_times
+from plan_graph import PlanGraph
+from presto_stats import load_stages, parse_timestamp, format_time, read_json
+
+SVG_WIDTH = 1100
+LABEL_WIDTH = 90
+STAGE_BAR_HEIGHT = 10
+TASK_LINE_SPACING = 3
+MAX_TASK_LINES = 32
+
+
+def _stage_sort_key(stage_id):
+    return (0, stage_id) if isinstance(stage_id, int) else (1, str(stage_id))
+
+
+def collect_timeline(query_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Per stage and task start/end times in seconds since the query was created."""
+    pipeline_times = collect_pipeline_times(query_info)
+    stages = []
+    for stage in load_stages(query_info):
+        tasks = []
+        for task in stage.tasks:
+            end = task.last_end if task.last_end is not None else task.end
+            if task.first_start is None or end is None:
+                continue
+            tasks.append({"node": task.node, "create": task.create if task.create is not None else task.first_start,
+                          "start": task.first_start, "end": end})
+        if not tasks:
+            windows = [t for (s, _), t in pipeline_times.items() if s == stage.stage_id]
+            if not windows:
+                continue
+            tasks = [{"node": "", "create": w[0], "start": w[0], "end": w[1]} for w in windows]
+        stages.append({
+            "stage": stage.stage_id,
+            "create": min(t["create"] for t in tasks),
+            "start": min(t["start"] for t in tasks),
+            "end": max(t["end"] for t in tasks),
+            "tasks": sorted(tasks, key=lambda t: t["start"]),
+        })
+    stages.sort(key=lambda s: _stage_sort_key(s["stage"]))
+
+    query_stats = query_info.get("queryStats", {})
+    origin = parse_timestamp(query_stats.get("createTime"))
+    if origin is None:
+        origin = min((s["create"] for s in stages), default=0.0)
+    for s in stages:
+        for t in s["tasks"]:
+            for field in ("create", "start", "end"):
+                t[field] -= origin
+        for field in ("create", "start", "end"):
+            s[field] -= origin
+        s["wait"] = s["start"] - s["create"]
+
+    graph = PlanGraph(query_info)
+    by_id = {s["stage"]: s for s in stages}
+    edges = []
+    for src_stage, receivers in sorted(graph.receivers.items(), key=lambda kv: _stage_sort_key(kv[0])):
+        for dst_stage in dict.fromkeys(recv for recv, _ in receivers):
+            if src_stage in by_id and dst_stage in by_id and src_stage != dst_stage:
+                src, dst = by_id[src_stage], by_id[dst_stage]
+                edges.append({"src_stage": src_stage, "dst_stage": dst_stage,
+                              "overlap_s": min(src["end"], dst["end"]) - max(src["start"], dst["start"])})
+
+    joins = []
+    for (stage_id, node_id), ops in sorted(graph.node_ops.items(), key=lambda kv: (_stage_sort_key(kv[0][0]), kv[0][1])):
+        build = [(stage_id, op.pipeline) for op in ops if op.operator_type.endswith("HashJoinBuild")]
+        probe = [(stage_id, op.pipeline) for op in ops if op.operator_type.endswith("HashJoinProbe")]
+        build = [pipeline_times[k] for k in build if k in pipeline_times]
+        probe = [pipeline_times[k] for k in probe if k in pipeline_times]
+        if not build or not probe:
+            continue
+        build_window = (min(w[0] for w in build) - origin, max(w[1] for w in build) - origin)
+        probe_window = (min(w[0] for w in probe) - origin, max(w[1] for w in probe) - origin)
+        overlap = min(build_window[1], probe_window[1]) - max(build_window[0], probe_window[0])
+        joins.append({"stage": stage_id, "plan_node_id": node_id, "build": build_window, "probe": probe_window,
+                      "overlap_s": overlap, "serialized": overlap <= 0})
+
+    return {
+        "elapsed_s": max((s["end"] for s in stages), default=0.0),
+        "stages": stages,
+        "edges": edges,
+        "joins": joins,
+    }
+
+
+def timeline_svg(timeline: Dict[str, Any]) -> str:
+    """Inline SVG Gantt chart of stages and their tasks."""
+    span = timeline["elapsed_s"] or 1.0
+    scale = (SVG_WIDTH - LABEL_WIDTH - 10) / span
+
+    def x(t):
+        return LABEL_WIDTH + max(t, 0.0) * scale
+
+    parts = []
+    y = 20
+    for s in timeline["stages"]:
+        tasks = s["tasks"][:MAX_TASK_LINES]
+        row_height = STAGE_BAR_HEIGHT + 4 + len(tasks) * TASK_LINE_SPACING
+        parts.append(f'<a href="#stage-{s["stage"]}"><text x="4" y="{y + STAGE_BAR_HEIGHT - 1}" font-size="11">'
+                     f'Stage {s["stage"]}</text></a>')
+        parts.append(f'<rect x="{x(s["create"]):.1f}" y="{y}" width="{max((s["start"] - s["create"]) * scale, 0.5):.1f}" '
+                     f'height="{STAGE_BAR_HEIGHT}" fill="#d6eaf8"><title>Stage {s["stage"]} waiting '
+                     f'{format_time(s["wait"] * 1e9)}</title></rect>')
+        parts.append(f'<rect x="{x(s["start"]):.1f}" y="{y}" width="{max((s["end"] - s["start"]) * scale, 0.5):.1f}" '
+                     f'height="{STAGE_BAR_HEIGHT}" fill="#3498db"><title>Stage {s["stage"]}: '
+                     f'{s["start"]:.3f}s - {s["end"]:.3f}s ({len(s["tasks"])} tasks)</title></rect>')
+        for i, t in enumerate(tasks):
+            ty = y + STAGE_BAR_HEIGHT + 4 + i * TASK_LINE_SPACING
+            parts.append(f'<line x1="{x(t["start"]):.1f}" y1="{ty}" x2="{max(x(t["end"]), x(t["start"]) + 0.5):.1f}" '
+                         f'y2="{ty}" stroke="#7f8c8d" stroke-width="2"><title>{html.escape(t["node"])}: '
+                         f'{t["start"]:.3f}s - {t["end"]:.3f}s</title></line>')
+        y += row_height + 8
+
+    ticks = []
+    for i in range(11):
+        t = span * i / 10
+        ticks.append(f'<line x1="{x(t):.1f}" y1="12" x2="{x(t):.1f}" y2="{y}" stroke="#eee"/>'
+                     f'<text x="{x(t):.1f}" y="10" font-size="9" text-anchor="middle">{t:.2f}s</text>')
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{y}" '
+            f'font-family="monospace">{"".join(ticks)}{"".join(parts)}</svg>')
+
+
+def timeline_html(timeline: Dict[str, Any]) -> str:
+    """Summary section for the visualizer header."""
+    edge_rows = ""
+    for e in timeline["edges"]:
+        relation = "overlap" if e["overlap_s"] > 0 else "gap"
+        edge_rows += (f'<tr><td><a href="#stage-{e["src_stage"]}">Stage {e["src_stage"]}</a> &rarr; '
+                      f'<a href="#stage-{e["dst_stage"]}">Stage {e["dst_stage"]}</a></td>'
+                      f'<td style="text-align: right;">{abs(e["overlap_s"]):.3f}s</td><td>{relation}</td></tr>\n')
+    join_rows = ""
+    for j in timeline["joins"]:
+        pipelining = "serialized" if j["serialized"] else f'{j["overlap_s"]:.3f}s overlap'
+        join_rows += (f'<tr><td><a href="#stage-{j["stage"]}">Stage {j["stage"]}</a> node {html.escape(str(j["plan_node_id"]))}</td>'
+                      f'<td style="text-align: right;">{j["build"][0]:.3f}s - {j["build"][1]:.3f}s</td>'
+                      f'<td style="text-align: right;">{j["probe"][0]:.3f}s - {j["probe"][1]:.3f}s</td>'
+                      f'<td>{pipelining}</td></tr>\n')
+    return f"""
+            <div class="operator-summary stage-timeline">
+                <div class="operator-summary-title">Stage Timeline ({timeline['elapsed_s']:.3f}s)</div>
+                {timeline_svg(timeline)}
+                <table class="operator-summary-table">
+                    <thead><tr><th>Stage Edge</th><th style="text-align: right;">Overlap / Gap</th><th></th></tr></thead>
+                    <tbody>
+{edge_rows}                    </tbody>
+                </table>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Hash Join</th><th style="text-align: right;">Build</th>
+                        <th style="text-align: right;">Probe</th><th>Pipelining</th></tr></thead>
+                    <tbody>
+{join_rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage and task Gantt timeline of a query")
+    parser.add_argument("input", help="Path to query plan JSON file")
+    parser.add_argument("-o", "--output", help="Write the timeline as a standalone SVG file")
+    args = parser.parse_args()
+
+    timeline = collect_timeline(read_json(args.input))
+    if not timeline["stages"]:
+        print("ERROR: no task or pipeline timestamps in query info", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'Stage':>5} {'Tasks':>5} {'Created':>9} {'Started':>9} {'Ended':>9} {'Wait':>10} {'Task spread':>11}")
+    for s in timeline["stages"]:
+        spread = max(t["end"] for t in s["tasks"]) - min(t["end"] for t in s["tasks"])
+        print(f"{str(s['stage']):>5} {len(s['tasks']):>5} {s['create']:>8.3f}s {s['start']:>8.3f}s {s['end']:>8.3f}s "
+              f"{format_time(s['wait'] * 1e9):>10} {spread:>10.3f}s")
+    for e in timeline["edges"]:
+        relation = "overlap" if e["overlap_s"] > 0 else "gap"
+        print(f"  stage {e['src_stage']} -> {e['dst_stage']}: {abs(e['overlap_s']):.3f}s {relation}")
+    for j in timeline["joins"]:
+        if j["serialized"]:
+            print(f"  join stage {j['stage']} node {j['plan_node_id']}: probe starts {-j['overlap_s']:.3f}s "
+                  f"after build ends (serialized)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(timeline_svg(timeline))
+        print(f"✓ Wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Per-stage task skew and straggler detection.
+
+The stage-level latestAttemptExecutionInfo.stats hide individual tasks, so
+one slow worker out of 8 is invisible in the normal report. This module reads
+every task of every stage (elapsed time, raw input rows/bytes, node) and
+computes per stage the max/median ratio and coefficient of variation of task
+elapsed time and input rows.
+
+A straggler is a task whose elapsed time is at least --threshold times the
+stage median. It is attributed to data skew when its input rows are also at
+least threshold times the median (a hot join/aggregation partition), and to
+the task or node otherwise (a slow GPU call, a busy worker).
+
+Used by query_plan_visualize.py --skew; standalone with CSV output:
+
+    python task_skew.py query.json -o skew
+"""
+
+import argparse
+import csv
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from presto_stats import load_stages, format_time, format_rows, format_data_size, read_json
+
+DEFAULT_THRESHOLD = 1.5
+
+
+def _spread(values: List[float]) -> Dict[str, float]:
+    median = statistics.median(values)
+    mean = statistics.mean(values)
+    return {
+        "median": median,
+        "max": max(values),
+        "max_over_median": max(values) / median if median else None,
+        "cv": statistics.pstdev(values) / mean if mean else 0.0,
+    }
+
+
+def analyze_skew(query_info: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """One entry per stage with skew metrics, its tasks and its stragglers."""
+    stages = []
+    for stage in load_stages(query_info):
+        tasks = [{
+            "task_id": task.task_id,
+            "node": task.node,
+            "elapsed_ns": task.elapsed_ns,
+            "input_rows": task.raw_input_rows,
+            "input_bytes": task.raw_input_bytes,
+        } for task in stage.tasks]
+        if not tasks:
+            continue
+
+        elapsed = _spread([t["elapsed_ns"] for t in tasks])
+        rows = _spread([t["input_rows"] for t in tasks])
+        stragglers = []
+        for t in tasks:
+            if not elapsed["median"] or t["elapsed_ns"] < threshold * elapsed["median"]:
+                continue
+            data_skew = rows["median"] and t["input_rows"] >= threshold * rows["median"]
+            stragglers.append(dict(t,
+                                   slowdown=t["elapsed_ns"] / elapsed["median"],
+                                   cause="data skew" if data_skew else "slow task/node"))
+        stages.append({
+            "stage": stage.stage_id,
+            "tasks": tasks,
+            "elapsed": elapsed,
+            "rows": rows,
+            "stragglers": sorted(stragglers, key=lambda s: -s["slowdown"]),
+        })
+    stages.sort(key=lambda s: (0, s["stage"]) if isinstance(s["stage"], int) else (1, str(s["stage"])))
+    return stages
+
+
+def _ratio(value) -> str:
+    return f"{value:.2f}x" if value is not None else "N/A"
+
+
+def skew_html(stages: List[Dict[str, Any]]) -> str:
+    """Summary section for the visualizer header."""
+    rows = ""
+    for s in stages:
+        stragglers = "<br>".join(
+            f'{t["node"]}: {format_time(t["elapsed_ns"])} ({t["slowdown"]:.1f}x, {t["cause"]})' for t in s["stragglers"]
+        ) or "&mdash;"
+        rows += (f'<tr><td><a href="#stage-{s["stage"]}">Stage {s["stage"]}</a></td>'
+                 f'<td style="text-align: center;">{len(s["tasks"])}</td>'
+                 f'<td style="text-align: right;">{format_time(s["elapsed"]["median"])} / {format_time(s["elapsed"]["max"])}</td>'
+                 f'<td style="text-align: right;">{_ratio(s["elapsed"]["max_over_median"])}</td>'
+                 f'<td style="text-align: right;">{s["elapsed"]["cv"]:.2f}</td>'
+                 f'<td style="text-align: right;">{format_rows(s["rows"]["median"])} / {format_rows(s["rows"]["max"])}</td>'
+                 f'<td style="text-align: right;">{_ratio(s["rows"]["max_over_median"])}</td>'
+                 f'<td>{stragglers}</td></tr>\n')
+    return f"""
+            <div class="operator-summary task-skew">
+                <div class="operator-summary-title">Task Skew &amp; Stragglers</div>
+                <table class="operator-summary-table">
+                    <thead><tr><th>Stage</th><th style="text-align: center;">Tasks</th>
+                        <th style="text-align: right;">Elapsed Median / Max</th><th style="text-align: right;">Max/Median</th>
+                        <th style="text-align: right;">CV</th><th style="text-align: right;">Input Rows Median / Max</th>
+                        <th style="text-align: right;">Max/Median</th><th>Stragglers</th></tr></thead>
+                    <tbody>
+{rows}                    </tbody>
+                </table>
+            </div>"""
+
+
+def write_skew_csv(stages: List[Dict[str, Any]], output_path: Path) -> None:
+    """One row per task with its stage's skew metrics and straggler verdict."""
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["stage", "task_id", "node", "elapsed_ms", "input_rows", "input_bytes",
+                         "stage_elapsed_max_over_median", "stage_elapsed_cv", "stage_rows_max_over_median",
+                         "straggler", "cause"])
+        for s in stages:
+            causes = {t["task_id"]: t["cause"] for t in s["stragglers"]}
+            for t in s["tasks"]:
+                writer.writerow([s["stage"], t["task_id"], t["node"], f"{t['elapsed_ns'] / 1e6:.3f}",
+                                 t["input_rows"], t["input_bytes"], _ratio(s["elapsed"]["max_over_median"]).rstrip("x"),
+                                 f"{s['elapsed']['cv']:.3f}", _ratio(s["rows"]["max_over_median"]).rstrip("x"),
+                                 "yes" if t["task_id"] in causes else "no", causes.get(t["task_id"], "")])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage task skew and straggler detection")
+    parser.add_argument("input", help="Path to query plan JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Straggler threshold as a multiple of the stage median (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("-o", "--output-prefix", help="Write <prefix>_tasks.csv")
+    args = parser.parse_args()
+
+    stages = analyze_skew(read_json(args.input), args.threshold)
+
+    print(f"{'Stage':>5} {'Tasks':>5} {'Median':>10} {'Max':>10} {'Max/Med':>8} {'CV':>5} {'Rows Max/Med':>12}")
+    for s in stages:
+        print(f"{str(s['stage']):>5} {len(s['tasks']):>5} {format_time(s['elapsed']['median']):>10} "
+              f"{format_time(s['elapsed']['max']):>10} {_ratio(s['elapsed']['max_over_median']):>8} "
+              f"{s['elapsed']['cv']:>5.2f} {_ratio(s['rows']['max_over_median']):>12}")
+        for t in s["stragglers"]:
+            print(f"      straggler {t['task_id']} on {t['node']}: {format_time(t['elapsed_ns'])} "
+                  f"({t['slowdown']:.1f}x median, {format_data_size(t['input_bytes'])} input) -> {t['cause']}")
+
+    if args.output_prefix:
+        write_skew_csv(stages, Path(f"{args.output_prefix}_tasks.csv"))
+        print(f"✓ Wrote {args.output_prefix}_tasks.csv", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()